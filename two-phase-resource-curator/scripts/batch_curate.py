@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+Batch Curator
+Curates many GitHub repositories and subreddits in one process. Targets are
+fetched concurrently over the shared keep-alive session (one TLS handshake
+per host, one rate budget), each target is ranked independently with the
+same filter_resources / filter_posts logic as the single-target scripts,
+and everything is written to one combined report with per-target timings.
+"""
+
+import sys
+import json
+import time
+import sqlite3
+import argparse
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from datetime import datetime, timezone
+from typing import List, Dict, Optional
+
+import http_client
+import filter_github
+import filter_reddit
+from history_store import HistoryStore, add_history_arguments
+
+def parse_manifest(path: str) -> List[Dict]:
+    """Read targets from a manifest: one GitHub URL, Reddit URL or r/subreddit per line (# comments)"""
+    targets = []
+    seen = set()
+    with open(path) as f:
+        for line_no, line in enumerate(f, 1):
+            entry = line.split('#', 1)[0].strip()
+            if not entry:
+                continue
+            target = parse_target(entry)
+            if target is None:
+                raise ValueError(f"{path}:{line_no}: unrecognised target '{entry}'")
+            if target['source'] in seen:
+                continue
+            seen.add(target['source'])
+            targets.append(target)
+    return targets
+
+def parse_target(entry: str) -> Optional[Dict]:
+    """Classify one manifest entry as a GitHub repository, subreddit or Reddit URL"""
+    if 'github.com/' in entry:
+        owner, repo = filter_github.parse_github_url('https://github.com/' + entry.split('github.com/', 1)[1])
+        return {'platform': 'github', 'source': f'{owner}/{repo}', 'owner': owner, 'repo': repo}
+    if entry.startswith(('r/', '/r/')):
+        subreddit = entry.strip('/').split('/')[1]
+        return {'platform': 'reddit', 'source': f'r/{subreddit}', 'subreddit': subreddit}
+    if 'reddit.com/' in entry:
+        path = entry.split('reddit.com/', 1)[1].strip('/').split('/')
+        if len(path) == 2 and path[0] == 'r':
+            return {'platform': 'reddit', 'source': f'r/{path[1]}', 'subreddit': path[1]}
+        return {'platform': 'reddit', 'source': entry, 'url': entry}
+    return None
+
+def fetch_target(target: Dict, args) -> Dict:
+    """Fetch the raw collection for one target (runs in a fetch thread)"""
+    started = time.perf_counter()
+    if target['platform'] == 'github':
+        metadata = filter_github.get_repo_metadata(target['owner'], target['repo'], args.token)
+        ref = metadata.get('default_branch') or 'HEAD'
+        items = filter_github.get_repo_files_from_tree(target['owner'], target['repo'], '', args.token, args.max_depth, ref)
+    else:
+        metadata = None
+        if target.get('url'):
+            data = filter_reddit.fetch_reddit_data(target['url'])
+            items = [child['data'] for child in data[0]['data']['children']] if isinstance(data, list) and data else []
+        else:
+            # Past one listing's cap, harvest several listings as filter_reddit does
+            listings = filter_reddit.selected_listings(args)
+            if listings:
+                items = filter_reddit.harvest_subreddit_posts(target['subreddit'], args.limit, listings)
+            else:
+                items = filter_reddit.parse_subreddit_posts(target['subreddit'], args.limit)
+    return {'items': items, 'metadata': metadata, 'fetch_seconds': time.perf_counter() - started}
+
+def rank_target(platform: str, items: List[Dict], metadata: Optional[Dict], repo_ranks: Optional[Dict] = None) -> Dict:
+    """Rank one target's collection (module-level so it can run in a worker process)"""
+    started = time.perf_counter()
+    if platform == 'github':
+        filtered, all_data = filter_github.filter_resources(items, metadata, filter_github.GITHUB_WEIGHTS, repo_ranks)
+        scored = all_data['all_sizes'] if filtered else []
+        cutoff = filter_github.determine_cutoff_percentile(len(items))
+        weights = filter_github.GITHUB_WEIGHTS
+    else:
+        filtered, all_data = filter_reddit.filter_posts(items, filter_reddit.REDDIT_WEIGHTS)
+        scored = all_data.get('all_scores', [])
+        cutoff = filter_reddit.determine_cutoff_percentile(len(items))
+        weights = filter_reddit.REDDIT_WEIGHTS
+    return {
+        'filtered': filtered,
+        'scored_count': len(scored),
+        'cutoff': cutoff,
+        'weights': weights,
+        'rank_seconds': time.perf_counter() - started,
+    }
+
+def target_report(target: Dict, fetched: Dict, ranked: Dict, max_resources: int) -> Dict:
+    """Per-target section of the combined report"""
+    original = len(fetched['items'])
+    filtered = ranked['filtered']
+    report = {
+        'platform': target['platform'],
+        'source': target['source'],
+        'status': 'ok',
+        'original_count': original,
+        'filtered_count': len(filtered),
+        'reduction': f"{((original - len(filtered)) / original * 100):.1f}%" if original > 0 else "0%",
+        'cutoff_percentile_used': ranked['cutoff'],
+        'weights_used': ranked['weights'],
+        'timings': {
+            'fetch_seconds': round(fetched['fetch_seconds'], 3),
+            'rank_seconds': round(ranked['rank_seconds'], 3),
+        },
+        'resources': filtered[:max_resources],
+    }
+    metadata = fetched['metadata']
+    if metadata is not None:
+        report['repo_metadata'] = {
+            'stars': metadata.get('stargazers_count'),
+            'forks': metadata.get('forks_count'),
+            'last_updated': metadata.get('updated_at'),
+            'description': metadata.get('description'),
+        }
+    if fetched.get('repo_ranks') is not None:
+        report['batch_percentiles'] = fetched['repo_ranks']
+    return report
+
+def error_report(target: Dict, stage: str, error: Exception, timings: Dict) -> Dict:
+    """Per-target section for a target that failed; the rest of the batch still completes"""
+    return {
+        'platform': target['platform'],
+        'source': target['source'],
+        'status': 'error',
+        'error': f"{stage}: {error}",
+        'timings': {key: round(value, 3) for key, value in timings.items()},
+    }
+
+def run_batch(targets: List[Dict], args, history: Optional[HistoryStore] = None) -> List[Dict]:
+    """Fetch all targets concurrently and rank each one as soon as its fetch completes
+    
+    With --cross-repo, GitHub targets are held back until every repository
+    has been fetched, so stars/forks can be ranked against the whole batch.
+    Each ranked target is also appended to the history store, if given.
+    """
+    reports = {}
+    # Workers start lazily, by which time fetch threads hold locks (HTTP pool,
+    # rate budget) that a forked child would inherit stuck; start them clean instead
+    start_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    rank_pool = ProcessPoolExecutor(max_workers=args.processes, mp_context=multiprocessing.get_context(start_method)) if args.processes > 1 else None
+    ranks = {}
+    deferred = []
+    
+    def report(i: int, fetched: Dict, ranked: Dict):
+        reports[i] = target_report(targets[i], fetched, ranked, args.max_resources)
+        if history is not None:
+            try:
+                history.record_run(targets[i]['platform'], targets[i]['source'], ranked['filtered'], ranked['cutoff'],
+                                   ranked['weights'], len(fetched['items']), ranked['scored_count'])
+            except sqlite3.Error as e:
+                print(f"⚠️  {targets[i]['source']}: history not recorded ({e})")
+    
+    def rank(i: int, fetched: Dict):
+        target = targets[i]
+        if rank_pool is not None:
+            future = rank_pool.submit(rank_target, target['platform'], fetched['items'], fetched['metadata'], fetched.get('repo_ranks'))
+            ranks[future] = (i, fetched)
+            return
+        try:
+            ranked = rank_target(target['platform'], fetched['items'], fetched['metadata'], fetched.get('repo_ranks'))
+            report(i, fetched, ranked)
+        except Exception as e:
+            reports[i] = error_report(target, 'rank', e, {'fetch_seconds': fetched['fetch_seconds']})
+    
+    with ThreadPoolExecutor(max_workers=max(args.workers, 1)) as fetch_pool:
+        fetches = {fetch_pool.submit(fetch_target, target, args): i for i, target in enumerate(targets)}
+        for future in as_completed(fetches):
+            i = fetches[future]
+            target = targets[i]
+            try:
+                fetched = future.result()
+            except Exception as e:
+                print(f"❌ {target['source']}: fetch failed ({e})")
+                reports[i] = error_report(target, 'fetch', e, {})
+                continue
+            print(f"📥 {target['source']}: {len(fetched['items'])} items in {fetched['fetch_seconds']:.2f}s")
+            if args.cross_repo and target['platform'] == 'github':
+                deferred.append((i, fetched))
+            else:
+                rank(i, fetched)
+    
+    if deferred:
+        # Per-repo percentiles are computed once for the batch, not per file
+        batch_ranks = filter_github.repo_percentiles({targets[i]['source']: fetched['metadata'] for i, fetched in deferred})
+        print(f"⭐ Ranking stars/forks across {len(batch_ranks)} repositories")
+        for i, fetched in deferred:
+            fetched['repo_ranks'] = batch_ranks[targets[i]['source']]
+            rank(i, fetched)
+    
+    if rank_pool is not None:
+        with rank_pool:
+            for future in as_completed(ranks):
+                i, fetched = ranks[future]
+                try:
+                    report(i, fetched, future.result())
+                except Exception as e:
+                    reports[i] = error_report(targets[i], 'rank', e, {'fetch_seconds': fetched['fetch_seconds']})
+    
+    return [reports[i] for i in range(len(targets))]
+
+def main():
+    parser = argparse.ArgumentParser(description='Curate many GitHub repositories and subreddits in one process')
+    parser.add_argument('manifest', help='File with one GitHub URL, Reddit URL or r/subreddit per line (# comments allowed)')
+    parser.add_argument('--output', default='curated_batch.json', help='Combined report path')
+    parser.add_argument('--token', help='GitHub API token (recommended for rate limits)')
+    parser.add_argument('--max-depth', type=int, help='Max directory depth to scan in each repository (default: unlimited)')
+    parser.add_argument('--limit', type=int, default=1000, help='Maximum posts to fetch per subreddit')
+    parser.add_argument('--listings', help='Comma-separated subreddit listings to harvest and merge by post ID, as in filter_reddit.py '
+                                           f'(default: top:all, or several listings when --limit is above {filter_reddit.LISTING_CAP})')
+    parser.add_argument('--workers', type=int, default=8, help='Targets fetched concurrently')
+    parser.add_argument('--processes', type=int, default=1,
+                        help='Worker processes for ranking (default 1 = rank in this process; use the core count for large batches)')
+    parser.add_argument('--rate', type=float, help='Global request budget in requests/second, shared by all targets (default: unlimited)')
+    parser.add_argument('--cross-repo', action='store_true',
+                        help='Percentile-rank stars/forks across all repositories in the batch instead of per repository')
+    parser.add_argument('--max-resources', type=int, default=500, help='Resources kept per target in the report')
+    http_client.add_cache_arguments(parser)
+    add_history_arguments(parser)
+    
+    args = parser.parse_args()
+    http_client.configure(pool_size=max(args.workers, 1), rate=args.rate)
+    try:
+        http_client.configure_cache_from_args(args)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    
+    try:
+        filter_reddit.selected_listings(args)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    
+    try:
+        targets = parse_manifest(args.manifest)
+    except (OSError, ValueError) as e:
+        print(f"Error reading manifest: {e}")
+        sys.exit(1)
+    
+    if not targets:
+        print("⚠️  Manifest contains no targets.")
+        sys.exit(0)
+    
+    print(f"📋 {len(targets)} targets ({args.workers} fetch workers, {args.processes} ranking processes)")
+    
+    history = None
+    if args.history:
+        try:
+            history = HistoryStore(args.history)
+        except sqlite3.Error as e:
+            print(f"Error opening history store: {e}")
+            sys.exit(1)
+    
+    started = time.perf_counter()
+    reports = run_batch(targets, args, history)
+    elapsed = time.perf_counter() - started
+    if history is not None:
+        history.close()
+    
+    succeeded = [r for r in reports if r['status'] == 'ok']
+    output = {
+        'platform': 'batch',
+        'generated_at': datetime.now(timezone.utc).isoformat(),
+        'filtering_method': 'statistical_percentile',
+        'cross_repo_ranking': args.cross_repo,
+        'target_count': len(targets),
+        'succeeded': len(succeeded),
+        'failed': len(reports) - len(succeeded),
+        'total_seconds': round(elapsed, 3),
+        'targets': reports,
+        'next_steps': 'Review filtered lists, or request Phase 2 for deep analysis'
+    }
+    
+    with open(args.output, 'w') as f:
+        json.dump(output, f, indent=2)
+    
+    print(f"\n✅ Batch complete in {elapsed:.2f}s")
+    for report in reports:
+        if report['status'] == 'ok':
+            timings = report['timings']
+            print(f"   {report['source']}: {report['filtered_count']}/{report['original_count']} kept "
+                  f"(fetch {timings['fetch_seconds']:.2f}s, rank {timings['rank_seconds']:.2f}s)")
+        else:
+            print(f"   {report['source']}: ❌ {report['error']}")
+    print(f"💾 Output saved to: {args.output}")
+    
+    if len(succeeded) < len(reports):
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
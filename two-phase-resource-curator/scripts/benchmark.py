@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""
+Curator Benchmarks
+Times the fetch, rank and serialize stages separately on synthetic GitHub
+trees and Reddit listings (100 to 100k items) served from a local stub HTTP
+server, and writes throughput and peak RSS per stage to a JSON results file.
+Compare against a previous results file with --baseline to catch regressions.
+"""
+
+import sys
+import os
+import gc
+import json
+import time
+import random
+import hashlib
+import argparse
+import platform
+import tempfile
+import multiprocessing
+from datetime import datetime, timedelta, timezone
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from typing import List, Dict, Callable, Optional
+
+import http_client
+import filter_github
+import filter_reddit
+from ranking import np
+
+DEFAULT_SIZES = [100, 1000, 10000, 100000]
+FILES_PER_DIR = 50        # Synthetic repos: 50 files per leaf directory, 50 leaves per top-level directory
+OWNER, REPO, SUBREDDIT = 'bench', 'synthetic', 'bench'
+
+def synthetic_files(n: int, seed: int = 0) -> List[Dict]:
+    """Contents-API style file items laid out two directories deep"""
+    rng = random.Random(seed)
+    files = []
+    for i in range(n):
+        leaf = i // FILES_PER_DIR
+        path = f'd{leaf // FILES_PER_DIR:04d}/s{leaf % FILES_PER_DIR:02d}/workflow_{i:06d}.json'
+        files.append({
+            'name': path.rsplit('/', 1)[-1],
+            'path': path,
+            'sha': hashlib.sha1(path.encode()).hexdigest(),
+            'size': int(rng.lognormvariate(8, 1.2)),
+            'type': 'file',
+            'url': f'https://api.github.com/repos/{OWNER}/{REPO}/contents/{path}',
+            'html_url': f'https://github.com/{OWNER}/{REPO}/blob/main/{path}',
+            'git_url': None,
+            'download_url': f'https://raw.githubusercontent.com/{OWNER}/{REPO}/main/{path}',
+        })
+    return files
+
+def synthetic_posts(n: int, seed: int = 0) -> List[Dict]:
+    """Reddit listing posts with heavy-tailed scores, ordered like top.json"""
+    rng = random.Random(seed)
+    now = time.time()
+    posts = []
+    for i in range(n):
+        posts.append({
+            'id': f'b{i}',
+            'name': f't3_b{i}',
+            'title': f'Synthetic post {i}',
+            'permalink': f'/r/{SUBREDDIT}/comments/b{i}/',
+            'url': f'https://example.com/{i}',
+            'score': int(rng.paretovariate(1.2) * 10),
+            'num_comments': int(rng.paretovariate(1.5) * 3),
+            'upvote_ratio': round(rng.uniform(0.5, 1.0), 2),
+            'created_utc': now - rng.uniform(0, 4 * 365 * 86400),
+            'author': f'user{i % 997}',
+            'subreddit': SUBREDDIT,
+            'selftext': 'x' * 200,
+        })
+    posts.sort(key=lambda p: p['score'], reverse=True)
+    return posts
+
+def repo_metadata() -> Dict:
+    """Metadata for the synthetic repository"""
+    updated = datetime.now(timezone.utc) - timedelta(days=10)
+    return {'stargazers_count': 120, 'forks_count': 14, 'default_branch': 'main',
+            'updated_at': updated.strftime('%Y-%m-%dT%H:%M:%SZ'), 'description': 'synthetic'}
+
+class StubData:
+    """Pre-serialized responses for the stub server"""
+
+    def __init__(self, files: List[Dict], posts: List[Dict]):
+        dirs = {'': []}
+        for item in files:
+            parts = item['path'].split('/')
+            # Register each ancestor directory in its parent's listing the first time it is seen
+            for depth in range(1, len(parts)):
+                dir_path = '/'.join(parts[:depth])
+                if dir_path not in dirs:
+                    dirs[dir_path] = []
+                    dirs['/'.join(parts[:depth - 1])].append(
+                        {'name': parts[depth - 1], 'path': dir_path, 'type': 'dir', 'sha': '', 'size': 0})
+            dirs['/'.join(parts[:-1])].append(item)
+        self.contents = {path: json.dumps(listing).encode() for path, listing in dirs.items()}
+
+        tree = [{'path': path, 'type': 'tree', 'mode': '040000', 'sha': hashlib.sha1(path.encode()).hexdigest()}
+                for path in sorted(dirs) if path]
+        tree += [{'path': f['path'], 'type': 'blob', 'mode': '100644', 'sha': f['sha'], 'size': f['size']} for f in files]
+        self.tree = json.dumps({'sha': 'root', 'tree': tree, 'truncated': False}).encode()
+        self.metadata = json.dumps(repo_metadata()).encode()
+
+        self.pages = {}
+        for start in range(0, len(posts), 100):
+            page = posts[start:start + 100]
+            after = page[-1]['name'] if start + 100 < len(posts) else None
+            cursor = posts[start - 1]['name'] if start else None
+            body = {'data': {'children': [{'kind': 't3', 'data': p} for p in page], 'after': after}}
+            self.pages[cursor] = json.dumps(body).encode()
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Serves the GitHub Contents/Trees and Reddit listing endpoints from StubData"""
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True   # Headers and body go out in separate writes
+    data: Optional[StubData] = None
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        path = url.path
+        contents_prefix = f'/repos/{OWNER}/{REPO}/contents/'
+        body = None
+        if path.startswith(contents_prefix):
+            body = self.data.contents.get(path[len(contents_prefix):].strip('/'))
+        elif path.startswith(f'/repos/{OWNER}/{REPO}/git/trees/'):
+            body = self.data.tree
+        elif path == f'/repos/{OWNER}/{REPO}':
+            body = self.data.metadata
+        elif path == f'/r/{SUBREDDIT}/top.json':
+            body = self.data.pages.get(parse_qs(url.query).get('after', [None])[0])
+
+        status = 200 if body is not None else 404
+        body = body if body is not None else b'{}'
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+def serve_stub(data: StubData, port_sender) -> None:
+    """Stub server process: report the free localhost port picked, then serve until terminated"""
+    handler = type('BoundStubHandler', (StubHandler,), {'data': data})
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server.daemon_threads = True
+    port_sender.send(server.server_port)
+    port_sender.close()
+    server.serve_forever()
+
+def start_stub_server(data: StubData) -> tuple:
+    """Start the stub server in a spawned process; returns (process, base URL)
+
+    Serving from threads of this process would leave them running while
+    run_isolated forks, and a fork only copies the forking thread (a lock
+    held by a server thread stays locked in the child forever).
+    """
+    context = multiprocessing.get_context('spawn')
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(target=serve_stub, args=(data, sender), daemon=True)
+    process.start()
+    sender.close()
+    port = receiver.recv()
+    return process, f'http://127.0.0.1:{port}'
+
+def stop_stub_server(process) -> None:
+    process.terminate()
+    process.join()
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process in MB (None where unsupported)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+def time_stage(setup: Callable[[], object], run: Callable[[object], int]) -> Dict:
+    """Prepare a stage's input (untimed), then measure wall time, items processed and peak RSS"""
+    prepared = setup()
+    gc.collect()
+    started = time.perf_counter()
+    items = run(prepared)
+    seconds = time.perf_counter() - started
+    return {'seconds': seconds, 'items': items, 'peak_rss_mb': peak_rss_mb()}
+
+def run_isolated(setup: Callable[[], object], run: Callable[[object], int]) -> Dict:
+    """Run a stage in a forked child so its peak RSS is not inflated by earlier stages"""
+    if 'fork' not in multiprocessing.get_all_start_methods():
+        return time_stage(setup, run)
+
+    context = multiprocessing.get_context('fork')
+    receiver, sender = context.Pipe(duplex=False)
+
+    def child():
+        try:
+            sender.send(time_stage(setup, run))
+        except BaseException as e:
+            sender.send({'error': f'{type(e).__name__}: {e}'})
+
+    process = context.Process(target=child)
+    process.start()
+    # Only the child writes: closing our copy lets recv() see EOF if it dies
+    sender.close()
+    try:
+        result = receiver.recv()
+    except EOFError:
+        result = None
+    process.join()
+    if result is None:
+        # Killed before it could report (e.g. by the OOM killer)
+        result = {'error': f'worker exited with code {process.exitcode}'}
+    return result
+
+def build_stages(n: int, files: List[Dict], posts: List[Dict], workers: int) -> Dict[str, tuple]:
+    """Stage name -> (setup, run): setup builds the input untimed, run returns the items processed"""
+    metadata = repo_metadata()
+
+    def nothing():
+        return None
+
+    def copy_files():
+        return [dict(f) for f in files]
+
+    def ranked_output():
+        filtered, _ = filter_github.filter_resources(copy_files(), metadata, filter_github.GITHUB_WEIGHTS)
+        kept, _ = filter_reddit.filter_posts(posts, filter_reddit.REDDIT_WEIGHTS)
+        return [{'platform': 'github', 'resources': filtered}, {'platform': 'reddit', 'resources': kept}]
+
+    def github_rank(resources):
+        filter_github.filter_resources(resources, metadata, filter_github.GITHUB_WEIGHTS)
+        return n
+
+    def reddit_rank(_):
+        filter_reddit.filter_posts(posts, filter_reddit.REDDIT_WEIGHTS)
+        return n
+
+    def json_write(outputs):
+        with tempfile.TemporaryFile('w') as f:
+            for output in outputs:
+                json.dump(output, f, indent=2)
+        return sum(len(output['resources']) for output in outputs)
+
+    return {
+        'github_crawl_serial': (nothing, lambda _: len(filter_github.get_repo_files(OWNER, REPO, max_depth=3))),
+        'github_crawl_concurrent': (nothing, lambda _: len(filter_github.get_repo_files_concurrent(OWNER, REPO, max_depth=3, max_workers=workers))),
+        'github_tree': (nothing, lambda _: len(filter_github.get_repo_files_from_tree(OWNER, REPO, ref='main'))),
+        'reddit_fetch': (nothing, lambda _: len(filter_reddit.parse_subreddit_posts(SUBREDDIT, limit=n))),
+        'github_rank': (copy_files, github_rank),
+        'reddit_rank': (nothing, reddit_rank),
+        'json_write': (ranked_output, json_write),
+    }
+
+def compare_to_baseline(results: List[Dict], baseline_path: str, threshold: float) -> List[str]:
+    """Stages that got slower than threshold x their baseline time"""
+    with open(baseline_path) as f:
+        baseline = {(r['stage'], r['size']): r for r in json.load(f).get('results', []) if 'seconds' in r}
+
+    regressions = []
+    for result in results:
+        previous = baseline.get((result['stage'], result['size']))
+        if not previous or 'seconds' not in result:
+            continue
+        # Ignore sub-10ms stages: timer noise dominates
+        if result['seconds'] > max(previous['seconds'] * threshold, 0.01):
+            regressions.append(f"{result['stage']} @ {result['size']}: {previous['seconds']:.3f}s -> {result['seconds']:.3f}s")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark fetch, rank and serialize stages on synthetic collections')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='Collection sizes to benchmark')
+    parser.add_argument('--stages', nargs='+', help='Only run these stages (default: all)')
+    parser.add_argument('--repeat', type=int, default=1, help='Runs per stage; the fastest is reported')
+    parser.add_argument('--workers', type=int, default=8, help='Workers for the concurrent contents crawl')
+    parser.add_argument('--max-serial-crawl', type=int, default=10000,
+                        help='Skip the serial contents crawl above this size (it is the slow baseline)')
+    parser.add_argument('--output', default='benchmark_results.json', help='Results file')
+    parser.add_argument('--baseline', help='Previous results file; exit 1 if any stage regressed')
+    parser.add_argument('--threshold', type=float, default=1.25, help='Slowdown factor counted as a regression')
+
+    args = parser.parse_args()
+    http_client.configure(pool_size=max(args.workers, 1))
+    http_client.disable_cache()
+
+    results = []
+    for n in sorted(args.sizes):
+        print(f"\n📦 Size {n}: generating synthetic data...")
+        files = synthetic_files(n)
+        posts = synthetic_posts(n)
+        server, base_url = start_stub_server(StubData(files, posts))
+        filter_github.GITHUB_API_URL = base_url
+        filter_reddit.REDDIT_BASE_URL = base_url
+
+        for stage, (setup, run) in build_stages(n, files, posts, args.workers).items():
+            if args.stages and stage not in args.stages:
+                continue
+            if stage == 'github_crawl_serial' and n > args.max_serial_crawl:
+                continue
+
+            runs = [run_isolated(setup, run) for _ in range(max(args.repeat, 1))]
+            failed = [r for r in runs if 'error' in r]
+            if failed:
+                print(f"   ❌ {stage}: {failed[0]['error']}")
+                results.append({'stage': stage, 'size': n, 'error': failed[0]['error']})
+                continue
+
+            best = min(runs, key=lambda r: r['seconds'])
+            result = {
+                'stage': stage,
+                'size': n,
+                'seconds': round(best['seconds'], 4),
+                'items': best['items'],
+                'items_per_second': round(best['items'] / best['seconds'], 1) if best['seconds'] > 0 else None,
+                'peak_rss_mb': max((r['peak_rss_mb'] or 0) for r in runs) or None,
+            }
+            results.append(result)
+            print(f"   {stage:<24} {result['seconds']:>9.3f}s  {result['items_per_second'] or 0:>12,.0f} items/s  peak RSS {result['peak_rss_mb']} MB")
+
+        stop_stub_server(server)
+
+    output = {
+        'generated_at': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np is not None,
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(output, f, indent=2)
+    print(f"\n💾 Results saved to: {args.output}")
+
+    if args.baseline:
+        regressions = compare_to_baseline(results, args.baseline, args.threshold)
+        if regressions:
+            print(f"\n⚠️  {len(regressions)} stage(s) slower than {args.threshold}x baseline:")
+            for line in regressions:
+                print(f"   {line}")
+            sys.exit(1)
+        print(f"✅ No regressions against {args.baseline}")
+
+if __name__ == '__main__':
+    main()
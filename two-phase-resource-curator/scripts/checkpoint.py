@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Crawl Checkpoints
+Records completed and still-pending work of a long crawl (directory paths for
+GitHub, listing cursors for Reddit) so an interrupted run resumes where it
+stopped instead of starting over. The same file format also carries state
+between runs for incremental re-curation (--state-file).
+"""
+
+import json
+import os
+
+class CrawlCheckpoint:
+    """JSON checkpoint file for one crawl target
+
+    Small, frequently replaced state goes through update(). Results that
+    only accumulate (one listing per crawled directory) go through record(),
+    which appends them to a journal next to the checkpoint, so each save
+    costs only what changed rather than the whole crawl so far.
+    """
+
+    def __init__(self, path: str, target: str, save_every: int = 25):
+        self.path = path
+        self.journal_path = path + '.journal'
+        self.target = target
+        self.save_every = save_every
+        self.unsaved = 0
+        self.state = {}
+        self.journaled = set()
+        self.journal = None
+        self.resumed = False
+
+        if os.path.exists(path):
+            with open(path) as f:
+                saved = json.load(f)
+            # Only resume a checkpoint written for the same target
+            if saved.get('target') == target:
+                self.state = saved.get('state', {})
+                self.resumed = True
+        self._replay_journal()
+
+    def _replay_journal(self):
+        """Merge journaled results back into a resumed state; any other journal is stale and removed"""
+        if not os.path.exists(self.journal_path):
+            return
+        entries = []
+        if self.resumed:
+            with open(self.journal_path) as f:
+                header = f.readline()
+                if header.endswith('\n') and json.loads(header).get('target') == self.target:
+                    entries = f.readlines()
+        if not entries:
+            os.remove(self.journal_path)
+        for line in entries:
+            if not line.endswith('\n'):
+                break  # Cut off mid-write: everything before it is intact
+            key, name, value = json.loads(line)
+            self.state.setdefault(key, {})[name] = value
+            self.journaled.add(key)
+
+    def update(self, **changes):
+        """Merge changes into the state, saving periodically"""
+        self.state.update(changes)
+        self.unsaved += 1
+        if self.unsaved >= self.save_every:
+            self.save()
+
+    def record(self, key: str, name: str, value):
+        """Add one completed result as state[key][name], appending it to the journal"""
+        self.state.setdefault(key, {})[name] = value
+        self.journaled.add(key)
+        if self.journal is None:
+            new = not os.path.exists(self.journal_path)
+            self.journal = open(self.journal_path, 'a')
+            if new:
+                self.journal.write(json.dumps({'target': self.target}) + '\n')
+        self.journal.write(json.dumps([key, name, value], separators=(',', ':')) + '\n')
+
+    def save(self):
+        """Flush the journal and atomically write the rest of the state to disk"""
+        if self.journal is not None:
+            self.journal.flush()
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            state = {key: value for key, value in self.state.items() if key not in self.journaled}
+            json.dump({'target': self.target, 'state': state}, f)
+        os.replace(tmp_path, self.path)
+        self.unsaved = 0
+
+    def clear(self):
+        """Remove the checkpoint once the crawl has completed"""
+        self.state = {}
+        self.journaled = set()
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+        for path in (self.path, self.journal_path):
+            if os.path.exists(path):
+                os.remove(path)
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+Columnar Snapshots
+A collection saved as one file per field in a NAME.cols directory instead
+of one JSON document: numeric fields are NumPy .npy arrays (written here
+without NumPy), text fields are a UTF-8 blob plus an .npy offsets table,
+and a small manifest.json lists the columns. Loading memory-maps the files,
+so even a 100k-item collection opens instantly and analysis touches only
+the columns it reads. Columns come back as numpy memmaps when NumPy is
+installed and as zero-copy memoryviews otherwise.
+
+    snapshot = load_columns('sub.cols')
+    scores = snapshot.column('score')             # nothing else is read
+    titles = snapshot.strings('title')
+"""
+
+import os
+import sys
+import ast
+import json
+import mmap
+import struct
+from array import array
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Sequence
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional - columns are then plain memoryviews over the mapped files
+    np = None
+
+COLUMNS_FORMAT = 'two-phase-curator-columns'
+COLUMNS_VERSION = 1
+COLUMNS_SUFFIX = '.cols'
+MANIFEST_FILE = 'manifest.json'
+
+NPY_MAGIC = b'\x93NUMPY\x01\x00'
+NPY_ALIGN = 64
+
+# Column type -> (npy descr, array/memoryview typecode)
+NUMERIC_TYPES = {'int': ('<i8', 'q'), 'float': ('<f8', 'd'), 'bool': ('|b1', '?')}
+
+# Per-row mask values for columns that are not always present
+PRESENT, NULL, ABSENT = 0, 1, 2
+
+def is_column_path(path: str) -> bool:
+    """True for a columnar snapshot path (a directory named *.cols)"""
+    return path.rstrip('/\\').endswith(COLUMNS_SUFFIX)
+
+def write_npy(path: str, values: array, descr: str):
+    """Write a 1-D array as a version 1.0 .npy file (64-byte aligned data, as NumPy writes it)"""
+    header = f"{{'descr': '{descr}', 'fortran_order': False, 'shape': ({len(values)},), }}"
+    padding = NPY_ALIGN - (len(NPY_MAGIC) + 2 + len(header) + 1) % NPY_ALIGN
+    header = (header + ' ' * (padding % NPY_ALIGN) + '\n').encode('latin1')
+    if sys.byteorder == 'big' and values.itemsize > 1:
+        values = array(values.typecode, values)
+        values.byteswap()
+    with open(path, 'wb') as f:
+        f.write(NPY_MAGIC + struct.pack('<H', len(header)) + header)
+        values.tofile(f)
+
+def map_npy(path: str, typecode: str):
+    """Memory-map a .npy file written by write_npy: a numpy memmap, or a memoryview without NumPy"""
+    if np is not None:
+        return np.load(path, mmap_mode='r')
+    with open(path, 'rb') as f:
+        prefix = f.read(len(NPY_MAGIC) + 2)
+        if prefix[:6] != NPY_MAGIC[:6]:
+            raise ValueError(f"{path} is not a .npy file")
+        offset = len(prefix) + struct.unpack('<H', prefix[-2:])[0]
+        header = ast.literal_eval(f.read(offset - len(prefix)).decode('latin1'))
+        if header['fortran_order'] or len(header['shape']) != 1:
+            raise ValueError(f"{path}: only 1-D columns are supported")
+        if header['shape'][0] == 0:
+            return memoryview(array(typecode))
+        if sys.byteorder == 'big' and header['descr'][0] == '<':
+            values = array(typecode, f.read())  # No zero-copy view of little-endian data here
+            values.byteswap()
+            return memoryview(values)
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return memoryview(mapped)[offset:].cast(typecode)
+
+class StringColumn:
+    """Memory-mapped text column: values are decoded only when read"""
+
+    def __init__(self, offsets, blob: memoryview):
+        self.offsets = offsets
+        self.blob = blob
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index: int) -> str:
+        return bytes(self.blob[int(self.offsets[index]):int(self.offsets[index + 1])]).decode('utf-8')
+
+    def __iter__(self) -> Iterator[str]:
+        for index in range(len(self)):
+            yield self[index]
+
+def map_blob(path: str) -> memoryview:
+    """Memory-map a whole file as bytes (an empty file cannot be mapped)"""
+    if os.path.getsize(path) == 0:
+        return memoryview(b'')
+    with open(path, 'rb') as f:
+        return memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+def column_type(values: Sequence) -> str:
+    """Storage type for a field's present, non-null values"""
+    kinds = {type(value) for value in values}
+    if not kinds:
+        return 'null'
+    if kinds == {bool}:
+        return 'bool'
+    if kinds == {int}:
+        return 'int'
+    if kinds <= {int, float}:
+        return 'float'
+    if kinds == {str}:
+        return 'str'
+    if kinds == {dict}:
+        return 'struct'
+    return 'json'  # Lists and mixed types: stored as JSON text
+
+def plan_columns(records: List[Dict], prefix: str = '') -> List[Dict]:
+    """Column specs for the fields of records, in first-seen order (dict fields become struct columns)"""
+    names = {}
+    for record in records:
+        for name in record:
+            names.setdefault(name, None)
+    specs = []
+    for name in names:
+        raw = [record.get(name) for record in records]
+        mask = array('B', (ABSENT if name not in record else NULL if record[name] is None else PRESENT for record in records))
+        kind = column_type([value for value in raw if value is not None])
+        ints = None
+        if kind == 'float' and any(type(value) is int for value in raw):
+            if all(abs(value) <= 2 ** 53 for value in raw if type(value) is int):
+                ints = array('B', (type(value) is int for value in raw))  # Which rows to turn back into ints
+            else:
+                kind = 'json'  # Larger ints would lose digits as float64
+        spec = {'name': name, 'file': prefix + name, 'type': kind, 'values': raw}
+        if any(mask):
+            spec['mask'] = mask
+        if ints is not None:
+            spec['ints'] = ints
+        if kind == 'struct':
+            spec['fields'] = plan_columns([value if isinstance(value, dict) else {} for value in raw], f'{prefix}{name}.')
+        specs.append(spec)
+    return specs
+
+def write_columns(directory: str, specs: List[Dict]) -> List[Dict]:
+    """Write each column's files and return the manifest entries"""
+    entries = []
+    for spec in specs:
+        entry = {'name': spec['name'], 'file': spec['file'], 'type': spec['type']}
+        base = os.path.join(directory, spec['file'])
+        if 'mask' in spec:
+            write_npy(base + '.mask.npy', spec['mask'], '|u1')
+            entry['mask'] = True
+        kind = spec['type']
+        if kind in NUMERIC_TYPES:
+            descr, typecode = NUMERIC_TYPES[kind]
+            fill = float('nan') if kind == 'float' else 0
+            typecode = 'B' if kind == 'bool' else typecode  # array has no bool type; NumPy reads b1 from 0/1 bytes
+            write_npy(base + '.npy', array(typecode, (fill if value is None else value for value in spec['values'])), descr)
+            if 'ints' in spec:
+                write_npy(base + '.ints.npy', spec['ints'], '|b1')
+                entry['ints'] = True
+        elif kind in ('str', 'json'):
+            offsets = array('q', [0])
+            with open(base + '.utf8', 'wb') as f:
+                for value in spec['values']:
+                    if value is not None:
+                        f.write((value if kind == 'str' else json.dumps(value, separators=(',', ':'))).encode('utf-8'))
+                    offsets.append(f.tell())
+            write_npy(base + '.offsets.npy', offsets, '<i8')
+        elif kind == 'struct':
+            entry['fields'] = write_columns(directory, spec['fields'])
+        entries.append(entry)
+    return entries
+
+def save_columns(path: str, platform: str, source: str, items: List[Dict], **extra):
+    """Write items as a columnar snapshot directory (plus metadata such as repo_metadata)"""
+    os.makedirs(path, exist_ok=True)
+    manifest_path = os.path.join(path, MANIFEST_FILE)
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)  # Overwriting: never leave the old manifest describing half-written columns
+    columns = write_columns(path, plan_columns(items))
+    manifest = {
+        'format': COLUMNS_FORMAT,
+        'version': COLUMNS_VERSION,
+        'platform': platform,
+        'source': source,
+        'fetched_at': datetime.now(timezone.utc).isoformat(),
+        **extra,
+        'count': len(items),
+        'columns': columns,
+    }
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=2)  # Written last: a directory without it is an unfinished write
+
+class ColumnSnapshot:
+    """An opened columnar snapshot; each column is mapped on first use"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, MANIFEST_FILE)) as f:
+            self.manifest = json.load(f)
+        if self.manifest.get('format') != COLUMNS_FORMAT:
+            raise ValueError(f"{path} is not a columnar curator snapshot")
+        self.entries = {}
+        self._index(self.manifest['columns'])
+        self.mapped = {}
+
+    def _index(self, entries: List[Dict]):
+        for entry in entries:
+            self.entries[entry['file']] = entry
+            self._index(entry.get('fields', []))
+
+    def __len__(self) -> int:
+        return self.manifest['count']
+
+    @property
+    def names(self) -> List[str]:
+        """Every column name, nested struct fields as parent.child"""
+        return list(self.entries)
+
+    def _map(self, file: str, suffix: str, typecode: str):
+        key = file + suffix
+        if key not in self.mapped:
+            self.mapped[key] = map_npy(os.path.join(self.path, key), typecode)
+        return self.mapped[key]
+
+    def _entry(self, name: str) -> Dict:
+        if name not in self.entries:
+            raise KeyError(f"No column '{name}' in {self.path} (columns: {', '.join(self.entries)})")
+        return self.entries[name]
+
+    def column(self, name: str):
+        """A numeric column (NaN marks missing floats; see mask() for the rest)"""
+        entry = self._entry(name)
+        if entry['type'] not in NUMERIC_TYPES:
+            raise TypeError(f"Column '{name}' holds {entry['type']} values; use strings() or records()")
+        return self._map(entry['file'], '.npy', NUMERIC_TYPES[entry['type']][1])
+
+    def strings(self, name: str) -> StringColumn:
+        """A text column, decoded value by value (JSON columns yield their JSON text)"""
+        entry = self._entry(name)
+        if entry['type'] not in ('str', 'json'):
+            raise TypeError(f"Column '{name}' holds {entry['type']} values; use column()")
+        blob = entry['file'] + '.utf8'
+        if blob not in self.mapped:
+            self.mapped[blob] = map_blob(os.path.join(self.path, blob))
+        return StringColumn(self._map(entry['file'], '.offsets.npy', 'q'), self.mapped[blob])
+
+    def mask(self, name: str) -> Optional[Sequence[int]]:
+        """Per-row 0 (value), 1 (null) or 2 (field absent); None when every row has a value"""
+        entry = self._entry(name)
+        return self._map(entry['file'], '.mask.npy', 'B') if entry.get('mask') else None
+
+    def values(self, name: str) -> List:
+        """A whole column as Python values, None where null"""
+        entry = self._entry(name)
+        kind = entry['type']
+        if kind in NUMERIC_TYPES:
+            values = self.column(name).tolist()
+            if entry.get('ints'):
+                ints = self._map(entry['file'], '.ints.npy', '?').tolist()
+                values = [int(value) if flag else value for value, flag in zip(values, ints)]
+        elif kind in ('str', 'json'):
+            column = self.strings(name)
+            data = bytes(column.blob)  # One copy, then slicing bytes is far cheaper than per-value mapped reads
+            offsets = column.offsets.tolist()
+            values = [data[start:end].decode('utf-8') for start, end in zip(offsets, offsets[1:])]
+            if kind == 'json':
+                values = [json.loads(text) if text else None for text in values]
+        else:
+            values = [None] * len(self)
+        mask = self.mask(name)
+        if mask is not None:
+            values = [None if flag else value for value, flag in zip(values, mask.tolist())]
+        return values
+
+    def records(self) -> List[Dict]:
+        """Rebuild the saved records exactly (reads every column)"""
+        records = [{} for _ in range(len(self))]
+        self._fill(records, self.manifest['columns'])
+        return records
+
+    def _fill(self, records: List[Dict], entries: List[Dict]):
+        for entry in entries:
+            name = entry['name']
+            mask = self.mask(entry['file'])
+            if entry['type'] == 'struct':
+                values = [{} for _ in records]
+                self._fill(values, entry.get('fields', []))
+            else:
+                values = self.values(entry['file'])
+            if mask is None:
+                for record, value in zip(records, values):
+                    record[name] = value
+                continue
+            for record, value, flag in zip(records, values, mask.tolist()):
+                if flag != ABSENT:
+                    record[name] = None if flag == NULL else value
+
+def load_columns(path: str) -> ColumnSnapshot:
+    """Open a columnar snapshot; no column data is read until asked for"""
+    return ColumnSnapshot(path)
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Columnar Record Buffer
+Bounded-memory storage for large collections: the numeric metrics that get
+ranked live in typed arrays (8 bytes per value), while the rest of each
+projected record is spilled to a temporary file and only read back for the
+records that survive the cutoff.
+"""
+
+import json
+import tempfile
+from array import array
+from typing import Dict, Iterator, Sequence
+
+class ColumnBuffer:
+    """Append-only store of projected records with in-memory numeric columns"""
+
+    def __init__(self, numeric_fields: Sequence[str]):
+        self.columns = {field: array('d') for field in numeric_fields}
+        self.offsets = array('q')
+        self.spill = tempfile.TemporaryFile()
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def append(self, record: Dict):
+        """Add one record: numeric fields to their columns, the full record to the spill file"""
+        for field, column in self.columns.items():
+            column.append(float(record.get(field) or 0))
+        self.offsets.append(self.spill.tell())
+        self.spill.write(json.dumps(record, separators=(',', ':')).encode() + b'\n')
+
+    def column(self, field: str) -> array:
+        """Numeric column, aligned with record indices"""
+        return self.columns[field]
+
+    def record(self, index: int) -> Dict:
+        """Read one record back from the spill file"""
+        end = self.spill.tell()
+        self.spill.seek(self.offsets[index])
+        line = self.spill.readline()
+        self.spill.seek(end)
+        return json.loads(line)
+
+    def records(self, indices: Sequence[int]) -> Iterator[Dict]:
+        """Read records back in the given order"""
+        for index in indices:
+            yield self.record(index)
+
+    def close(self):
+        self.spill.close()
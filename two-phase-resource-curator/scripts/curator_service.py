@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Curator Service
+Long-running curation daemon over a local HTTP port or Unix socket. Imports,
+the pooled keep-alive session and the response cache stay warm between
+requests; fetched and ranked collections are kept in memory for --ttl
+seconds, so a repeat query answers in milliseconds; and identical requests
+arriving while a target is being fetched share that one fetch instead of
+crawling it again. Ranking is the same filter_resources / filter_posts
+logic as the CLIs (via batch_curate).
+
+Usage:
+    python scripts/curator_service.py --port 8765 [--token TOKEN]
+    python scripts/curator_service.py --socket /tmp/curator.sock
+
+    curl 'http://127.0.0.1:8765/curate?target=https://github.com/owner/repo'
+    curl --unix-socket /tmp/curator.sock 'http://localhost/curate?target=r/n8n&limit=500'
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import socketserver
+from collections import OrderedDict
+from concurrent.futures import Future
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Hashable, Optional
+from urllib.parse import parse_qs, urlparse
+
+import http_client
+from batch_curate import fetch_target, parse_target, rank_target, target_report
+from metrics import get_metrics
+
+DEFAULT_PORT = 8765
+DEFAULT_TTL = 300          # Seconds a fetched collection is served from memory
+DEFAULT_MAX_ENTRIES = 64   # Collections kept in memory (least recently used evicted first)
+
+class SingleFlight:
+    """One computation per key at a time: concurrent callers for a key share its result"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.in_flight: Dict[Hashable, Future] = {}
+
+    def run(self, key: Hashable, compute: Callable[[], object]) -> tuple:
+        """(result, shared): shared is True when another caller's computation was reused"""
+        with self.lock:
+            future = self.in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self.in_flight[key] = Future()
+        if not leader:
+            return future.result(), True
+        try:
+            result = compute()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self.lock:
+                del self.in_flight[key]
+        future.set_result(result)
+        return result, False
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire ttl seconds after they were stored"""
+
+    def __init__(self, ttl: float = DEFAULT_TTL, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, key: Hashable) -> Optional[Dict]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if time.time() - entry['stored_at'] > self.ttl:
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry
+
+    def put(self, key: Hashable, value: Dict) -> Dict:
+        entry = dict(value, stored_at=time.time())
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return entry
+
+class Curator:
+    """Fetch-rank pipeline with an in-memory collection cache and request coalescing"""
+
+    def __init__(self, token: Optional[str] = None, ttl: float = DEFAULT_TTL, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.token = token
+        self.cache = TTLCache(ttl, max_entries)
+        self.flights = SingleFlight()
+        self.started = time.time()
+        self.counts = {'requests': 0, 'hit': 0, 'miss': 0, 'coalesced': 0, 'error': 0}
+        self.lock = threading.Lock()
+
+    def count(self, outcome: str):
+        with self.lock:
+            self.counts[outcome] += 1
+
+    def curate(self, entry: str, limit: int = 1000, max_depth: Optional[int] = None, max_resources: int = 500, refresh: bool = False) -> Dict:
+        """Report for one target, in batch_curate's per-target format plus a 'service' section
+
+        Raises ValueError for an unrecognised target and http_client.FetchError
+        when fetching fails.
+        """
+        started = time.perf_counter()
+        self.count('requests')
+        target = parse_target(entry)
+        if target is None:
+            raise ValueError(f"Unrecognised target '{entry}' (expected a GitHub URL, Reddit URL or r/subreddit)")
+        key = (target['source'], limit if target['platform'] == 'reddit' else max_depth)
+
+        outcome = 'hit'
+        cached = None if refresh else self.cache.get(key)
+        if cached is None:
+            try:
+                cached, shared = self.flights.run(key, lambda: self.load(target, limit, max_depth, key))
+            except Exception:
+                self.count('error')
+                raise
+            outcome = 'coalesced' if shared else 'miss'
+        self.count(outcome)
+
+        report = target_report(target, cached['fetched'], cached['ranked'], max_resources)
+        report['service'] = {
+            'cache': outcome,
+            'fetched_at': datetime.fromtimestamp(cached['stored_at'], timezone.utc).isoformat(),
+            'age_seconds': round(time.time() - cached['stored_at'], 3),
+            'elapsed_ms': round((time.perf_counter() - started) * 1000, 2),
+        }
+        return report
+
+    def load(self, target: Dict, limit: int, max_depth: Optional[int], key: Hashable) -> Dict:
+        """Fetch and rank a target, then keep it in memory for the TTL"""
+        options = argparse.Namespace(token=self.token, limit=limit, max_depth=max_depth, listings=None)
+        try:
+            fetched = fetch_target(target, options)
+        except http_client.FetchError:
+            raise
+        except Exception as e:  # The GitHub fetch reports API errors as plain exceptions
+            raise http_client.FetchError(str(e)) from e
+        ranked = rank_target(target['platform'], fetched['items'], fetched['metadata'])
+        return self.cache.put(key, {'fetched': fetched, 'ranked': ranked})
+
+    def health(self) -> Dict:
+        http = get_metrics().to_dict()['http']
+        with self.lock:
+            counts = dict(self.counts)
+        return {
+            'status': 'ok',
+            'uptime_seconds': round(time.time() - self.started, 1),
+            'cached_collections': len(self.cache),
+            'ttl_seconds': self.cache.ttl,
+            'requests': counts,
+            'http': {'requests': http['requests'], 'bytes': http['bytes'], 'cache': http['cache']},
+        }
+
+class CuratorHandler(BaseHTTPRequestHandler):
+    """GET /curate?target=...[&limit=&max_depth=&max_resources=&refresh=1] and GET /health"""
+
+    protocol_version = 'HTTP/1.1'
+    curator: Curator = None
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        if url.path == '/health':
+            return self.send_json(200, self.curator.health())
+        if url.path != '/curate':
+            return self.send_json(404, {'error': f'Unknown endpoint {url.path} (use /curate or /health)'})
+        if not query.get('target'):
+            return self.send_json(400, {'error': 'Missing target parameter'})
+
+        try:
+            report = self.curator.curate(
+                query['target'],
+                limit=int(query.get('limit', 1000)),
+                max_depth=int(query['max_depth']) if query.get('max_depth') else None,
+                max_resources=int(query.get('max_resources', 500)),
+                refresh=query.get('refresh') in ('1', 'true', 'yes'),
+            )
+        except ValueError as e:
+            return self.send_json(400, {'error': str(e)})
+        except http_client.FetchError as e:
+            return self.send_json(502, {'error': f'Fetch failed: {e}'})
+        except Exception as e:
+            return self.send_json(500, {'error': f'{type(e).__name__}: {e}'})
+        print(f"{'⚡' if report['service']['cache'] != 'miss' else '📥'} {report['source']}: {report['service']['cache']} "
+              f"in {report['service']['elapsed_ms']:.1f} ms")
+        self.send_json(200, report)
+
+    def send_json(self, status: int, body: Dict):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass  # One summary line per curation is printed instead; Unix-socket peers have no address
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def get_request(self):
+        request, _ = super().get_request()
+        return request, ('unix', 0)  # BaseHTTPRequestHandler expects a (host, port) peer
+
+def make_server(curator: Curator, host: str = '127.0.0.1', port: int = DEFAULT_PORT, socket_path: Optional[str] = None):
+    """HTTP server bound to host:port, or to a Unix socket when socket_path is given"""
+    handler = type('BoundCuratorHandler', (CuratorHandler,), {'curator': curator})
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)  # Left behind by a previous run that was killed
+        return ThreadingUnixHTTPServer(socket_path, handler)
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve curation requests from a long-running process with warm caches')
+    parser.add_argument('--host', default='127.0.0.1', help='Interface to listen on (default: localhost only)')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f'TCP port (default: {DEFAULT_PORT})')
+    parser.add_argument('--socket', help='Listen on this Unix socket instead of TCP')
+    parser.add_argument('--token', help='GitHub API token (recommended for rate limits)')
+    parser.add_argument('--ttl', type=float, default=DEFAULT_TTL, help='Seconds a fetched collection is reused before refetching (default: 300)')
+    parser.add_argument('--max-entries', type=int, default=DEFAULT_MAX_ENTRIES, help='Collections kept in memory (default: 64)')
+    parser.add_argument('--pool-size', type=int, default=32, help='Keep-alive connections per host')
+    parser.add_argument('--rate', type=float, help='Global request budget in requests/second (default: unlimited)')
+    http_client.add_cache_arguments(parser)
+
+    args = parser.parse_args()
+    http_client.configure(pool_size=max(args.pool_size, 1), rate=args.rate)
+    try:
+        http_client.configure_cache_from_args(args)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    curator = Curator(args.token, args.ttl, args.max_entries)
+    try:
+        server = make_server(curator, args.host, args.port, args.socket)
+    except OSError as e:
+        print(f"Error: cannot listen on {args.socket or f'{args.host}:{args.port}'}: {e}")
+        sys.exit(1)
+
+    where = f"unix:{args.socket}" if args.socket else f"http://{args.host}:{server.server_address[1]}"
+    print(f"🚀 Curator service listening on {where} (TTL {args.ttl:.0f}s)", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Shutting down")
+    finally:
+        server.server_close()
+        if args.socket and os.path.exists(args.socket):
+            os.remove(args.socket)
+        http_client.disable_archive()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Duplicate Collapsing
+Groups copies of the same resource before ranking so only one
+representative per group is scored and kept:
+- exact duplicates share a key for free (GitHub blob sha, Reddit
+  crosspost parent or link URL)
+- near-duplicates are found by MinHash over word shingles with LSH banding,
+  so only items that collide in some band are ever compared (sub-quadratic)
+"""
+
+import re
+import random
+import hashlib
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+from urllib.parse import urlsplit
+
+from ranking import np
+
+NUM_PERM = 64
+DEFAULT_THRESHOLD = 0.8
+SHINGLE_SIZE = 3
+MAX_SHINGLES = 20000  # Enough to tell templates apart; bounds the cost of huge files
+
+_masks = [random.Random(seed).getrandbits(64) for seed in range(NUM_PERM)]
+_mask_array = np.array(_masks, dtype=np.uint64) if np is not None else None
+
+class UnionFind:
+    """Disjoint sets over item indices 0..n-1"""
+
+    def __init__(self, n: int):
+        self.parent = list(range(n))
+
+    def find(self, i: int) -> int:
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, i: int, j: int):
+        root_i, root_j = self.find(i), self.find(j)
+        if root_i != root_j:
+            self.parent[max(root_i, root_j)] = min(root_i, root_j)
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> set:
+    """Word n-grams of lowercased text (the words themselves for very short texts)"""
+    words = re.findall(r'\w+', text.lower())
+    if len(words) <= size:
+        return {' '.join(words)} if words else set()
+    return {' '.join(words[i:i + size]) for i in range(min(len(words) - size + 1, MAX_SHINGLES))}
+
+def minhash_signature(tokens: Iterable[str]) -> tuple:
+    """NUM_PERM minimums of the token hashes, each XORed with a different random mask"""
+    hashes = [int.from_bytes(hashlib.blake2b(token.encode(), digest_size=8).digest(), 'little') for token in tokens]
+    if not hashes:
+        return ()
+    if _mask_array is not None:
+        column = np.array(hashes, dtype=np.uint64)
+        return tuple((column[:, None] ^ _mask_array[None, :]).min(axis=0).tolist())
+    return tuple(min([h ^ mask for h in hashes]) for mask in _masks)
+
+def band_layout(threshold: float) -> tuple:
+    """(bands, rows) with bands * rows = NUM_PERM whose LSH threshold (1/b)^(1/r) is closest to threshold"""
+    layouts = [(NUM_PERM // rows, rows) for rows in range(1, NUM_PERM + 1) if NUM_PERM % rows == 0]
+    return min(layouts, key=lambda layout: abs((1 / layout[0]) ** (1 / layout[1]) - threshold))
+
+def similarity(a: tuple, b: tuple) -> float:
+    """Estimated Jaccard similarity of two signatures"""
+    return sum(x == y for x, y in zip(a, b)) / NUM_PERM
+
+def merge_near_duplicates(sets: UnionFind, signatures: Sequence[tuple], threshold: float = DEFAULT_THRESHOLD):
+    """Union items whose signatures collide in an LSH band and agree on at least threshold of positions
+
+    Only items sharing a bucket are compared, and members already joined
+    to an item are skipped with a union-find lookup instead of a signature
+    comparison, so n copies of one template cost O(n) comparisons. Every
+    other member is still compared, so an item that matches members of two
+    different groups joins both.
+    """
+    bands, rows = band_layout(threshold)
+    for band in range(bands):
+        buckets = defaultdict(list)
+        for i, signature in enumerate(signatures):
+            if signature:
+                buckets[signature[band * rows:(band + 1) * rows]].append(i)
+        for members in buckets.values():
+            for position, i in enumerate(members):
+                for j in members[:position]:
+                    if sets.find(i) == sets.find(j):
+                        continue
+                    if similarity(signatures[i], signatures[j]) >= threshold:
+                        sets.union(i, j)
+
+def cluster(n: int, keys: Sequence[Sequence[str]] = (), signatures: Optional[Sequence[tuple]] = None, threshold: float = DEFAULT_THRESHOLD) -> List[List[int]]:
+    """Group item indices that share any exact key or are near-duplicates; singletons included"""
+    sets = UnionFind(n)
+    first_with_key = {}
+    for i, item_keys in enumerate(keys):
+        for key in item_keys:
+            if key in first_with_key:
+                sets.union(first_with_key[key], i)
+            else:
+                first_with_key[key] = i
+    if signatures is not None:
+        merge_near_duplicates(sets, signatures, threshold)
+
+    groups = defaultdict(list)
+    for i in range(n):
+        groups[sets.find(i)].append(i)
+    return list(groups.values())
+
+def collapse(items: List[Dict], groups: List[List[int]], preference: Callable[[Dict], tuple], label: Callable[[Dict], str]) -> List[Dict]:
+    """One representative per group (the smallest preference key), annotated with the group size
+
+    Representatives of groups with copies get 'cluster_size' and
+    'duplicates' (labels of the other members). Members that are already
+    representatives of an earlier collapse bring their own copies along.
+    Order follows the first member of each group.
+    """
+    representatives = []
+    for group in sorted(groups, key=lambda g: g[0]):
+        members = [items[i] for i in group]
+        representative = min(members, key=preference)
+        if len(members) > 1:
+            duplicates = list(representative.get('duplicates', []))
+            for member in members:
+                if member is not representative:
+                    duplicates += [label(member)] + member.get('duplicates', [])
+            representative['cluster_size'] = sum(member.get('cluster_size', 1) for member in members)
+            representative['duplicates'] = duplicates
+        representatives.append(representative)
+    return representatives
+
+def normalize_url(url: str) -> str:
+    """Canonical form of a link URL: no scheme, www., fragment, tracking parameters or trailing slash"""
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    query = '&'.join(pair for pair in parts.query.split('&') if pair and not pair.startswith('utm_'))
+    return host + parts.path.rstrip('/') + ('?' + query if query else '')
+
+def add_dedup_arguments(parser):
+    """Add --dedup / --dedup-threshold options to a filter CLI"""
+    parser.add_argument('--dedup', choices=['none', 'exact', 'near'], default='none',
+                        help='Collapse duplicates before ranking: exact (shared sha/URL) or near (also MinHash similarity)')
+    parser.add_argument('--dedup-threshold', type=float, default=DEFAULT_THRESHOLD, help='Jaccard similarity for near-duplicates (default: 0.8)')
@@ -9,11 +9,32 @@ import sys
 import os
 import json
 import argparse
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from datetime import datetime
-from typing import List, Dict, Optional
-import requests
+from array import array
+from typing import Callable, List, Dict, Iterable, Iterator, Optional, TextIO
 import statistics
 
+from checkpoint import CrawlCheckpoint
+from column_snapshot import save_columns
+from columnar import ColumnBuffer
+from commit_dates import BATCH_SIZE as COMMIT_DATE_BATCH, annotate_commit_dates
+from dedup import DEFAULT_THRESHOLD, add_dedup_arguments, cluster, collapse, minhash_signature, shingles
+from history_store import add_history_arguments, record_output
+from http_cache import add_cache_arguments
+from metrics import get_metrics, add_metrics_arguments, write_on_exit, profiled
+from prefetch import DEFAULT_MAX_BYTES, BlobStore, add_prefetch_arguments, prefetch_resources, run_prefetch
+from ranking import SortedColumn, percentile, percentile_rank
+from sketch import DEFAULT_ERROR, DEFAULT_WARMUP, QuantileSketch, add_sketch_arguments
+from snapshot import lazy_import, load_snapshot, save_snapshot, add_snapshot_arguments, apply_weight_overrides, cutoff_function
+
+# Network stack is only loaded once a fetch happens, so --from-snapshot runs stay offline
+http_client = lazy_import('http_client')
+
+# API base URL (override to point at a GitHub Enterprise host or a local mock server)
+GITHUB_API_URL = os.environ.get('GITHUB_API_URL', 'https://api.github.com').rstrip('/')
+
 # Platform-specific metric weights
 GITHUB_WEIGHTS = {
     'recency': 0.40,     # Tech moves fast
@@ -22,25 +43,11 @@ GITHUB_WEIGHTS = {
     'file_size': 0.10,   # Quality check
 }
 
-def percentile(data: List[float], p: int) -> float:
-    """Calculate percentile of dataset"""
-    if not data:
-        return 0
-    sorted_data = sorted(data)
-    index = (len(sorted_data) - 1) * p / 100
-    floor = int(index)
-    ceil = floor + 1
-    if ceil >= len(sorted_data):
-        return sorted_data[-1]
-    return sorted_data[floor] + (sorted_data[ceil] - sorted_data[floor]) * (index - floor)
-
-def percentile_rank(value: float, data: List[float]) -> float:
-    """Calculate what percentile a value is in dataset (0-100)"""
-    if not data or value is None:
-        return 0
-    count_below = sum(1 for x in data if x < value)
-    count_equal = sum(1 for x in data if x == value)
-    return ((count_below + 0.5 * count_equal) / len(data)) * 100
+# Filename fragments that mark obvious non-workflow files
+SKIP_FILE_PATTERNS = ['.md', 'license', '.txt', '.gitignore', '.yml', '.yaml', 'readme']
+
+# File fields kept when records are projected for streaming output
+FILE_FIELDS = ('name', 'path', 'sha', 'size', 'type', 'url', 'html_url', 'git_url', 'download_url', 'last_commit_date')
 
 def parse_github_url(url: str) -> tuple:
     """Extract owner and repo from GitHub URL"""
@@ -49,8 +56,14 @@ def parse_github_url(url: str) -> tuple:
         return parts[0], parts[1]
     raise ValueError(f"Invalid GitHub URL: {url}")
 
-def get_repo_metadata(owner: str, repo: str, token: Optional[str] = None) -> Dict:
-    """Fetch repository metadata from GitHub API"""
+def github_graphql_url() -> str:
+    """GraphQL endpoint next to GITHUB_API_URL (GitHub Enterprise serves it at /api/graphql, not /api/v3/graphql)"""
+    if GITHUB_API_URL.endswith('/api/v3'):
+        return GITHUB_API_URL[:-len('/v3')] + '/graphql'
+    return f'{GITHUB_API_URL}/graphql'
+
+def github_headers(token: Optional[str] = None) -> Dict:
+    """Build GitHub API request headers"""
     headers = {'Accept': 'application/vnd.github.v3+json'}
     
     # Check for token in order of priority:
@@ -63,8 +76,19 @@ def get_repo_metadata(owner: str, repo: str, token: Optional[str] = None) -> Dic
     if token:
         headers['Authorization'] = f'token {token}'
     
-    url = f'https://api.github.com/repos/{owner}/{repo}'
-    response = requests.get(url, headers=headers)
+    return headers
+
+def is_skipped_file(name: str) -> bool:
+    """Skip obvious non-workflow files (docs, licenses, config)"""
+    name = name.lower()
+    return any(skip in name for skip in SKIP_FILE_PATTERNS)
+
+def get_repo_metadata(owner: str, repo: str, token: Optional[str] = None) -> Dict:
+    """Fetch repository metadata from GitHub API"""
+    headers = github_headers(token)
+    
+    url = f'{GITHUB_API_URL}/repos/{owner}/{repo}'
+    response = http_client.get(url, headers=headers)
     
     if response.status_code != 200:
         raise Exception(f"GitHub API error: {response.status_code} - {response.text}")
@@ -76,20 +100,10 @@ def get_repo_files(owner: str, repo: str, path: str = '', token: Optional[str] =
     if current_depth >= max_depth:
         return []
     
-    headers = {'Accept': 'application/vnd.github.v3+json'}
-    
-    # Check for token in order of priority:
-    # 1. Explicitly passed token argument
-    # 2. GITHUB_PUB_TOKEN10F26 environment variable (expires May 11, 2026)
-    # 3. GITHUB_TOKEN environment variable (fallback)
-    if not token:
-        token = os.environ.get('GITHUB_PUB_TOKEN10F26') or os.environ.get('GITHUB_TOKEN')
-    
-    if token:
-        headers['Authorization'] = f'token {token}'
+    headers = github_headers(token)
     
-    url = f'https://api.github.com/repos/{owner}/{repo}/contents/{path}'
-    response = requests.get(url, headers=headers)
+    url = f'{GITHUB_API_URL}/repos/{owner}/{repo}/contents/{path}'
+    response = http_client.get(url, headers=headers)
     
     if response.status_code != 200:
         return []
@@ -102,8 +116,7 @@ def get_repo_files(owner: str, repo: str, path: str = '', token: Optional[str] =
     for item in contents:
         if item['type'] == 'file':
             # Skip obvious non-workflow files
-            name = item.get('name', '').lower()
-            if not any(skip in name for skip in ['.md', 'license', '.txt', '.gitignore', '.yml', '.yaml', 'readme']):
+            if not is_skipped_file(item.get('name', '')):
                 files.append(item)
         elif item['type'] == 'dir' and current_depth < max_depth - 1:
             # Recursively get files from subdirectories
@@ -111,6 +124,229 @@ def get_repo_files(owner: str, repo: str, path: str = '', token: Optional[str] =
     
     return files
 
+def get_repo_files_concurrent(owner: str, repo: str, path: str = '', token: Optional[str] = None, max_depth: int = 3, max_workers: int = 8, checkpoint: Optional[CrawlCheckpoint] = None) -> List[Dict]:
+    """Crawl directories concurrently (same file list and order as get_repo_files)
+
+    With a checkpoint, fetched listings and still-pending directories are
+    recorded so a crawl interrupted by rate limits resumes where it stopped.
+    """
+    if max_depth <= 0:
+        return []
+
+    headers = github_headers(token)
+
+    def fetch_listing(dir_path: str) -> List[Dict]:
+        url = f'{GITHUB_API_URL}/repos/{owner}/{repo}/contents/{dir_path}'
+        response = http_client.get(url, headers=headers)
+        if response.status_code != 200:
+            return []
+        contents = response.json()
+        return contents if isinstance(contents, list) else []
+
+    listings = {}
+    queue = [(path, 0)]
+    if checkpoint is not None and checkpoint.resumed:
+        listings = checkpoint.state.get('listings', {})
+        queue = [tuple(item) for item in checkpoint.state.get('pending', [])]
+
+    # Fetch every directory listing, submitting subdirectories as soon as
+    # their parent listing arrives so siblings are fetched in parallel
+    pool = ThreadPoolExecutor(max_workers=max_workers)
+    pending = {pool.submit(fetch_listing, dir_path): (dir_path, depth) for dir_path, depth in queue}
+    try:
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                dir_path, depth = pending[future]
+                listings[dir_path] = future.result()
+                del pending[future]
+                if checkpoint is not None:
+                    checkpoint.record('listings', dir_path, listings[dir_path])  # Appended, never rewritten
+                if depth < max_depth - 1:
+                    for item in listings[dir_path]:
+                        if item['type'] == 'dir':
+                            pending[pool.submit(fetch_listing, item['path'])] = (item['path'], depth + 1)
+            if checkpoint is not None:
+                checkpoint.update(pending=list(pending.values()))
+    except BaseException:
+        # Don't wait for in-flight requests: one may be sleeping out a long rate-limit reset
+        pool.shutdown(wait=False, cancel_futures=True)
+        if checkpoint is not None:
+            checkpoint.update(pending=list(pending.values()))
+            checkpoint.save()
+        raise
+    pool.shutdown()
+
+    # Assemble in the serial crawl's depth-first order
+    def collect(dir_path: str, depth: int) -> List[Dict]:
+        files = []
+        for item in listings.get(dir_path, []):
+            if item['type'] == 'file':
+                if not is_skipped_file(item.get('name', '')):
+                    files.append(item)
+            elif item['type'] == 'dir' and depth < max_depth - 1:
+                files.extend(collect(item['path'], depth + 1))
+        return files
+
+    return collect(path, 0)
+
+def fetch_tree(owner: str, repo: str, tree_sha: str, headers: Dict, recursive: bool = True) -> Optional[Dict]:
+    """Fetch one Git Trees API object (None on error)"""
+    url = f'{GITHUB_API_URL}/repos/{owner}/{repo}/git/trees/{tree_sha}'
+    params = {'recursive': 1} if recursive else None
+    response = http_client.get(url, headers=headers, params=params)
+
+    if response.status_code != 200:
+        return None
+
+    return response.json()
+
+def get_repo_tree(owner: str, repo: str, ref: str = 'HEAD', token: Optional[str] = None) -> List[Dict]:
+    """Get every tree entry in the repo with a single recursive Git Trees API call"""
+    headers = github_headers(token)
+
+    data = fetch_tree(owner, repo, ref, headers)
+    if data is None:
+        return []
+
+    if not data.get('truncated'):
+        return data.get('tree', [])
+
+    # GitHub caps recursive trees (~100k entries / 7 MB) and marks them truncated.
+    # Fall back to fetching subtrees separately: each is tried recursively first,
+    # and only split further (one level at a time) if it is itself truncated.
+    entries = []
+    pending = [('', data['sha'], False)]
+    while pending:
+        prefix, sha, recursive = pending.pop()
+        subtree = fetch_tree(owner, repo, sha, headers, recursive=recursive)
+        if subtree is None:
+            continue
+
+        if recursive and subtree.get('truncated'):
+            pending.append((prefix, sha, False))
+            continue
+
+        for entry in subtree.get('tree', []):
+            entry = dict(entry, path=prefix + entry['path'])
+            entries.append(entry)
+            if not recursive and entry['type'] == 'tree':
+                pending.append((entry['path'] + '/', entry['sha'], True))
+
+    return entries
+
+def tree_entry_to_file(entry: Dict, owner: str, repo: str, ref: str) -> Dict:
+    """Shape a Git Trees blob entry like a Contents API file item"""
+    path = entry['path']
+    return {
+        'name': path.rsplit('/', 1)[-1],
+        'path': path,
+        'sha': entry.get('sha'),
+        'size': entry.get('size', 0),
+        'type': 'file',
+        'url': f'{GITHUB_API_URL}/repos/{owner}/{repo}/contents/{path}?ref={ref}',
+        'html_url': f'https://github.com/{owner}/{repo}/blob/{ref}/{path}',
+        'git_url': entry.get('url'),
+        'download_url': f'https://raw.githubusercontent.com/{owner}/{repo}/{ref}/{path}',
+    }
+
+def get_repo_files_from_tree(owner: str, repo: str, path: str = '', token: Optional[str] = None, max_depth: Optional[int] = None, ref: str = 'HEAD') -> List[Dict]:
+    """Get files from the full repo tree (same skip rules and depth semantics as get_repo_files)"""
+    entries = get_repo_tree(owner, repo, ref, token)
+    return select_tree_files(entries, owner, repo, path, max_depth, ref)
+
+def select_tree_files(entries: List[Dict], owner: str, repo: str, path: str = '', max_depth: Optional[int] = None, ref: str = 'HEAD') -> List[Dict]:
+    """Apply the path, depth and skip-name filters to in-memory tree entries"""
+    return list(iter_tree_files(entries, owner, repo, path, max_depth, ref))
+
+def iter_tree_files(entries: Iterable[Dict], owner: str, repo: str, path: str = '', max_depth: Optional[int] = None, ref: str = 'HEAD') -> Iterator[Dict]:
+    """Lazily yield the tree entries that pass the path, depth and skip-name filters"""
+    prefix = path.strip('/') + '/' if path.strip('/') else ''
+
+    for entry in entries:
+        # Only regular files (skip directories, submodules and symlinks)
+        if entry.get('type') != 'blob' or entry.get('mode') == '120000':
+            continue
+        if not entry['path'].startswith(prefix):
+            continue
+
+        # Depth relative to the scanned path: files directly in it are depth 0
+        depth = entry['path'][len(prefix):].count('/')
+        if max_depth is not None and depth >= max_depth:
+            continue
+
+        if not is_skipped_file(entry['path'].rsplit('/', 1)[-1]):
+            yield tree_entry_to_file(entry, owner, repo, ref)
+
+def refresh_repo_tree(owner: str, repo: str, ref: str = 'HEAD', token: Optional[str] = None, previous: Optional[Dict] = None) -> Dict:
+    """Bring a stored repo tree up to date, fetching only subtrees whose SHA changed
+
+    `previous` is the dict returned by the last run ({'trees': {dir: sha},
+    'blobs': {path: {sha, size, mode}}}). Git tree SHAs are content hashes, so an
+    unchanged SHA means the whole subtree is unchanged and is reused as-is.
+    Without previous state the tree is fetched in one recursive request.
+    """
+    headers = github_headers(token)
+    old_trees = (previous or {}).get('trees', {})
+    old_blobs = (previous or {}).get('blobs', {})
+    old_tree_paths = sorted(old_trees)
+    old_blob_paths = sorted(old_blobs)
+
+    trees = {}
+    blobs = {}
+    stats = {'requests': 0, 'reused_trees': 0, 'changed_files': 0}
+
+    def reuse(dir_path: str):
+        """Copy an unchanged subtree from the previous state"""
+        prefix = dir_path + '/' if dir_path else ''
+        trees[dir_path] = old_trees[dir_path]
+        for paths, source, target in ((old_tree_paths, old_trees, trees), (old_blob_paths, old_blobs, blobs)):
+            start = bisect_left(paths, prefix)
+            end = bisect_left(paths, prefix + '\uffff')
+            for key in paths[start:end]:
+                target[key] = source[key]
+        stats['reused_trees'] += 1
+
+    # Directories we already know are listed one level at a time so their
+    # children can be compared by SHA; new directories are fetched recursively
+    pending = [('', ref, '' not in old_trees)]
+    while pending:
+        dir_path, sha, recursive = pending.pop()
+        data = fetch_tree(owner, repo, sha, headers, recursive=recursive)
+        stats['requests'] += 1
+        if data is None:
+            raise http_client.FetchError(f"Could not fetch tree {dir_path or '/'} of {owner}/{repo}")
+
+        if dir_path in old_trees and data['sha'] == old_trees[dir_path]:
+            reuse(dir_path)
+            continue
+        if recursive and data.get('truncated'):
+            pending.append((dir_path, sha, False))
+            continue
+
+        trees[dir_path] = data['sha']
+        prefix = dir_path + '/' if dir_path else ''
+        for entry in data.get('tree', []):
+            path = prefix + entry['path']
+            if entry['type'] == 'tree':
+                if recursive:
+                    trees[path] = entry['sha']
+                elif old_trees.get(path) == entry['sha']:
+                    reuse(path)
+                else:
+                    pending.append((path, entry['sha'], path not in old_trees))
+            elif entry['type'] == 'blob':
+                blobs[path] = {'sha': entry['sha'], 'size': entry.get('size', 0), 'mode': entry.get('mode')}
+                previous_blob = old_blobs.get(path)
+                if previous_blob is None or previous_blob['sha'] != entry['sha']:
+                    stats['changed_files'] += 1
+
+    return {'sha': trees.get(''), 'trees': trees, 'blobs': blobs, 'stats': stats}
+
+def tree_state_entries(tree_state: Dict) -> List[Dict]:
+    """Turn stored tree state back into Git Trees API style blob entries"""
+    return [dict(blob, path=path, type='blob') for path, blob in tree_state['blobs'].items()]
+
 def calculate_recency_score(updated_at_str: str) -> float:
     """Calculate recency score (0-100) based on age"""
     updated_at = datetime.fromisoformat(updated_at_str.replace('Z', '+00:00'))
@@ -130,21 +366,39 @@ def calculate_recency_score(updated_at_str: str) -> float:
     else:
         return max(0, 25 - (days_old - 730) / 365 * 10)
 
-def calculate_composite_score(resource: Dict, all_data: Dict, repo_metadata: Dict, weights: Dict) -> float:
-    """Calculate composite percentile score using statistical ranking"""
+def file_updated_at(resource: Dict, repo_metadata: Dict) -> Optional[str]:
+    """The file's last commit date when known (--file-recency), else the repository's updated_at"""
+    return resource.get('last_commit_date') or repo_metadata.get('updated_at')
+
+def calculate_composite_score(resource: Dict, all_data: Dict, repo_metadata: Dict, weights: Dict, repo_ranks: Optional[Dict] = None,
+                              recency: Optional[float] = None) -> float:
+    """Calculate composite percentile score using statistical ranking
+
+    repo_ranks holds precomputed repo-level 'stars'/'forks' percentiles
+    (see repo_percentiles); without it they are ranked against all_data.
+    recency is a precomputed recency score for callers that keep it in a
+    column instead of on the resource.
+    """
     scores = {}
     
     # Stars percentile
-    stars = repo_metadata.get('stargazers_count', 0)
-    scores['stars'] = percentile_rank(stars, all_data['all_stars'])
+    if repo_ranks is not None:
+        scores['stars'] = repo_ranks['stars']
+    else:
+        stars = repo_metadata.get('stargazers_count', 0)
+        scores['stars'] = percentile_rank(stars, all_data['all_stars'])
     
     # Recency score (absolute, not relative - recency matters universally)
-    recency_score = calculate_recency_score(repo_metadata.get('updated_at', '2020-01-01'))
-    scores['recency'] = recency_score
+    if recency is None:
+        recency = calculate_recency_score(file_updated_at(resource, repo_metadata) or '2020-01-01')
+    scores['recency'] = recency
     
     # Forks percentile
-    forks = repo_metadata.get('forks_count', 0)
-    scores['forks'] = percentile_rank(forks, all_data['all_forks'])
+    if repo_ranks is not None:
+        scores['forks'] = repo_ranks['forks']
+    else:
+        forks = repo_metadata.get('forks_count', 0)
+        scores['forks'] = percentile_rank(forks, all_data['all_forks'])
     
     # File size percentile (within this collection)
     file_size = resource.get('size', 0)
@@ -155,6 +409,24 @@ def calculate_composite_score(resource: Dict, all_data: Dict, repo_metadata: Dic
     
     return round(composite, 2), scores
 
+def repo_percentiles(repos: Dict[str, Dict]) -> Dict[str, Dict]:
+    """Percentile-rank each repository's stars and forks against every repository in the batch
+
+    repos maps a key (e.g. 'owner/repo') to its metadata. Each column is
+    sorted once, so the whole batch costs O(R log R) however many files
+    the repositories hold.
+    """
+    keys = list(repos)
+    stars = SortedColumn([repos[key].get('stargazers_count', 0) for key in keys])
+    forks = SortedColumn([repos[key].get('forks_count', 0) for key in keys])
+    return {
+        key: {
+            'stars': stars.rank(repos[key].get('stargazers_count', 0)),
+            'forks': forks.rank(repos[key].get('forks_count', 0)),
+        }
+        for key in keys
+    }
+
 def determine_cutoff_percentile(collection_size: int) -> int:
     """Determine what percentile to use as cutoff based on collection size"""
     if collection_size <= 100:
@@ -168,8 +440,55 @@ def determine_cutoff_percentile(collection_size: int) -> int:
     else:
         return 85  # Keep top 15% (strict for huge collections)
 
-def filter_resources(resources: List[Dict], repo_metadata: Dict, weights: Dict) -> tuple:
-    """Statistical filtering using percentile ranking"""
+def is_substantive_file(resource: Dict) -> bool:
+    """Basic sanity filter: skip trivial files and obvious test/example/demo files"""
+    name = resource.get('name', '').lower()
+    size = resource.get('size', 0)
+    
+    # Skip if: too small (<500 bytes) OR obvious test/example/demo file
+    if size < 500:
+        return False
+    if any(skip in name for skip in ['test', 'example', 'demo', 'sample', '.min.', 'backup']):
+        return False
+    return True
+
+def project_file(resource: Dict) -> Dict:
+    """Keep only the file fields used for scoring and output"""
+    return {field: resource[field] for field in FILE_FIELDS if field in resource}
+
+def dedup_files(resources: List[Dict], store: Optional[BlobStore] = None, headers: Optional[Dict] = None, threshold: float = DEFAULT_THRESHOLD, workers: int = 8, max_bytes: int = DEFAULT_MAX_BYTES) -> List[Dict]:
+    """Collapse files with identical blob shas and (with a store) near-identical contents
+
+    Copies share a sha, so exact duplicates cost nothing. For near-duplicates
+    the substantive files are prefetched into the content-addressed store
+    (blobs already there are not downloaded again) and compared by MinHash,
+    so pass only the files worth downloading (the ranked survivors). The
+    representative is the shallowest path; it carries 'cluster_size' and
+    the other paths.
+    """
+    signatures = None
+    if store is not None:
+        by_resource = {}
+        substantive = [resource for resource in resources if is_substantive_file(resource)]
+        for resource in prefetch_resources(substantive, store, headers, workers, max_bytes):
+            # Only needed here: the annotation must not reach the output
+            annotation = resource.pop('prefetch')
+            if annotation.get('local_path') and not annotation.get('binary'):
+                with open(annotation['local_path'], 'rb') as f:
+                    by_resource[id(resource)] = minhash_signature(shingles(f.read().decode('utf-8', 'replace')))
+        signatures = [by_resource.get(id(resource), ()) for resource in resources]
+    groups = cluster(len(resources), [[resource['sha']] if resource.get('sha') else [] for resource in resources], signatures, threshold)
+    return collapse(resources, groups,
+                    preference=lambda resource: (resource.get('path', '').count('/'), len(resource.get('path', '')), resource.get('path', '')),
+                    label=lambda resource: resource.get('path'))
+
+def filter_resources(resources: List[Dict], repo_metadata: Dict, weights: Dict, repo_ranks: Optional[Dict] = None, cutoff_rule: Optional[Callable[[int], float]] = None) -> tuple:
+    """Statistical filtering using percentile ranking
+
+    Pass repo_ranks (from repo_percentiles) to score stars/forks against a
+    batch of repositories instead of this repository alone, and cutoff_rule
+    to replace determine_cutoff_percentile.
+    """
     
     # Collect all metric values for statistical analysis
     all_stars = [repo_metadata.get('stargazers_count', 0)] * len(resources)  # Repo-level, same for all files
@@ -177,19 +496,8 @@ def filter_resources(resources: List[Dict], repo_metadata: Dict, weights: Dict)
     all_sizes = [r.get('size', 0) for r in resources]
     
     # Basic sanity filtering first (avoid completely trivial files)
-    basic_filtered = []
-    for resource in resources:
-        # Skip files that are obviously not valuable
-        name = resource.get('name', '').lower()
-        size = resource.get('size', 0)
-        
-        # Skip if: too small (<500 bytes) OR obvious test/example/demo file
-        if size < 500:
-            continue
-        if any(skip in name for skip in ['test', 'example', 'demo', 'sample', '.min.', 'backup']):
-            continue
-            
-        basic_filtered.append(resource)
+    basic_filtered = [resource for resource in resources if is_substantive_file(resource)]
+    get_metrics().record_items('github.substantive', len(resources), len(basic_filtered))
     
     if not basic_filtered:
         return [], {'all_stars': all_stars, 'all_forks': all_forks, 'all_sizes': all_sizes}
@@ -203,47 +511,224 @@ def filter_resources(resources: List[Dict], repo_metadata: Dict, weights: Dict)
         'all_sizes': all_sizes,
     }
     
+    # Repo-level ranks are the same for every file: compute them once
+    # (alone, a repository sits at the 50th percentile of its own column)
+    if repo_ranks is None:
+        repo_ranks = repo_percentiles({'repo': repo_metadata})['repo']
+    
+    # Sort the file-level column once so every rank lookup is a binary search
+    rank_data = {'all_sizes': SortedColumn(all_sizes)}
+    
     # Calculate composite scores
     scored_resources = []
     for resource in basic_filtered:
-        composite, breakdowns = calculate_composite_score(resource, all_data, repo_metadata, weights)
+        composite, breakdowns = calculate_composite_score(resource, rank_data, repo_metadata, weights, repo_ranks)
         
         resource['composite_score'] = composite
         resource['score_breakdown'] = breakdowns
         resource['stars'] = repo_metadata.get('stargazers_count')
         resource['forks'] = repo_metadata.get('forks_count')
-        resource['last_updated'] = repo_metadata.get('updated_at')
+        resource['last_updated'] = file_updated_at(resource, repo_metadata)
         
         scored_resources.append(resource)
     
     # Determine cutoff
-    cutoff_percentile = determine_cutoff_percentile(len(basic_filtered))
+    cutoff_percentile = (cutoff_rule or determine_cutoff_percentile)(len(basic_filtered))
     
     # Filter by cutoff
     filtered = [r for r in scored_resources if r['composite_score'] >= cutoff_percentile]
+    get_metrics().record_items('github.cutoff', len(basic_filtered), len(filtered))
     
     # Sort by composite score descending
     filtered.sort(key=lambda x: x['composite_score'], reverse=True)
     
     return filtered, all_data
 
-def main():
-    parser = argparse.ArgumentParser(description='Filter GitHub resources using statistical percentiles')
-    parser.add_argument('--url', required=True, help='GitHub repository URL')
-    parser.add_argument('--token', help='GitHub API token (recommended for rate limits)')
-    parser.add_argument('--output', default='filtered_github.json', help='Output file path')
-    parser.add_argument('--max-depth', type=int, default=3, help='Max directory depth to scan')
+def filter_resources_streaming(resources: Iterable[Dict], repo_metadata: Dict, weights: Dict, out: TextIO, repo_ranks: Optional[Dict] = None, cutoff_rule: Optional[Callable[[int], float]] = None) -> Dict:
+    """Bounded-memory filter_resources: kept files are written to `out` as JSONL
+
+    Files are projected to their scored fields as they arrive and buffered
+    column-wise, ranked on the columns, and only survivors are read back.
+    Produces the same records, scores and order as filter_resources.
+    """
+    buffer = ColumnBuffer(['size'])
+    recencies = array('d')
+    original_count = 0
+    all_file_sizes = array('d')
+    for resource in resources:
+        original_count += 1
+        all_file_sizes.append(resource.get('size', 0))
+        if is_substantive_file(resource):
+            buffer.append(project_file(resource))
+            recencies.append(calculate_recency_score(file_updated_at(resource, repo_metadata) or '2020-01-01'))
+    
+    # Stars/forks are repo-level constants: rank them once, not per file
+    if repo_ranks is None:
+        repo_ranks = repo_percentiles({'repo': repo_metadata})['repo']
+    sizes = buffer.column('size')
+    rank_data = {'all_sizes': SortedColumn(sizes)}
+    
+    composites = array('d')
+    for size, recency in zip(sizes, recencies):
+        composites.append(calculate_composite_score({'size': size}, rank_data, repo_metadata, weights, repo_ranks, recency)[0])
+    
+    cutoff_percentile = (cutoff_rule or determine_cutoff_percentile)(len(buffer))
+    kept = [i for i in range(len(buffer)) if composites[i] >= cutoff_percentile]
+    get_metrics().record_items('github.substantive', original_count, len(buffer))
+    get_metrics().record_items('github.cutoff', len(buffer), len(kept))
+    kept.sort(key=lambda i: composites[i], reverse=True)
+    
+    for resource in buffer.records(kept):
+        composite, breakdowns = calculate_composite_score(resource, rank_data, repo_metadata, weights, repo_ranks)
+        resource['composite_score'] = composite
+        resource['score_breakdown'] = breakdowns
+        resource['stars'] = repo_metadata.get('stargazers_count')
+        resource['forks'] = repo_metadata.get('forks_count')
+        resource['last_updated'] = file_updated_at(resource, repo_metadata)
+        out.write(json.dumps(resource) + '\n')
     
-    args = parser.parse_args()
+    summary = {
+        'original_count': original_count,
+        'filtered_count': len(kept),
+        'cutoff_percentile_used': cutoff_percentile,
+        'statistics': {
+            'file_size_median': statistics.median(all_file_sizes) if all_file_sizes else 0,
+            'file_size_p75': percentile(list(all_file_sizes), 75),
+            'file_size_p90': percentile(list(all_file_sizes), 90),
+        },
+    }
+    buffer.close()
+    return summary
+
+def filter_resources_sketch(resources: Iterable[Dict], repo_metadata: Dict, weights: Dict, out: TextIO, error: float = DEFAULT_ERROR, warmup: int = DEFAULT_WARMUP, repo_ranks: Optional[Dict] = None, cutoff_rule: Optional[Callable[[int], float]] = None, exact_path: Optional[str] = None) -> Dict:
+    """Constant-memory approximate filter: each file is scored and written to `out` as it arrives
+
+    File sizes are ranked against a quantile sketch of every substantive
+    file seen so far, and the cutoff follows the running collection size.
+    The first `warmup` substantive files are held back until the sketch has
+    that many values. Kept files are in arrival order, not score order.
+    With exact_path, substantive files are also spilled to disk and the
+    exact filter_resources_streaming result is written there at the end.
+    """
+    if repo_ranks is None:
+        repo_ranks = repo_percentiles({'repo': repo_metadata})['repo']
+    sketches = {'all_sizes': QuantileSketch.for_error(error)}
+    all_file_sizes = QuantileSketch.for_error(error)
+    cutoff_rule = cutoff_rule or determine_cutoff_percentile
+    exact = ColumnBuffer([]) if exact_path else None
+    held = []
+    original_count = 0
+    valid_count = 0
+    kept_count = 0
+    
+    def emit(resource: Dict):
+        nonlocal kept_count
+        composite, breakdowns = calculate_composite_score(resource, sketches, repo_metadata, weights, repo_ranks)
+        if composite >= cutoff_rule(valid_count):
+            resource['composite_score'] = composite
+            resource['score_breakdown'] = breakdowns
+            resource['stars'] = repo_metadata.get('stargazers_count')
+            resource['forks'] = repo_metadata.get('forks_count')
+            resource['last_updated'] = file_updated_at(resource, repo_metadata)
+            out.write(json.dumps(resource) + '\n')
+            out.flush()
+            kept_count += 1
     
-    # Parse URL
+    for resource in resources:
+        original_count += 1
+        all_file_sizes.update(resource.get('size', 0))
+        if not is_substantive_file(resource):
+            continue
+        resource = project_file(resource)
+        valid_count += 1
+        sketches['all_sizes'].update(resource.get('size', 0))
+        if exact is not None:
+            exact.append(resource)
+        if held is None:
+            emit(resource)
+            continue
+        held.append(resource)
+        if len(held) >= warmup:
+            for held_resource in held:
+                emit(held_resource)
+            held = None
+    for held_resource in held or []:
+        emit(held_resource)
+    
+    get_metrics().record_items('github.substantive', original_count, valid_count)
+    get_metrics().record_items('github.cutoff', valid_count, kept_count)
+    summary = {
+        'original_count': original_count,
+        'filtered_count': kept_count,
+        'cutoff_percentile_used': cutoff_rule(valid_count),
+        'statistics': {
+            'file_size_median': all_file_sizes.percentile(50),
+            'file_size_p75': all_file_sizes.percentile(75),
+            'file_size_p90': all_file_sizes.percentile(90),
+        },
+    }
+    if exact is not None:
+        with open(exact_path, 'w') as f:
+            summary['exact'] = filter_resources_streaming(exact.records(range(len(exact))), repo_metadata, weights, f, repo_ranks, cutoff_rule)
+        exact.close()
+    return summary
+
+def write_streaming_output(files: Iterable[Dict], repo_metadata: Dict, repository: str, args, weights: Dict = GITHUB_WEIGHTS, cutoff_rule: Optional[Callable[[int], float]] = None) -> None:
+    """Rank with filter_resources_streaming, writing kept files as JSONL plus a .meta.json summary"""
+    print(f"\n🔍 Streaming percentile-based ranking to {args.output}...")
     try:
-        owner, repo = parse_github_url(args.url)
-    except ValueError as e:
-        print(f"Error: {e}")
+        with open(args.output, 'w') as f:
+            if args.ranking == 'sketch':
+                summary = filter_resources_sketch(files, repo_metadata, weights, f, args.sketch_error, args.sketch_warmup, cutoff_rule=cutoff_rule, exact_path=args.exact_output)
+            else:
+                summary = filter_resources_streaming(files, repo_metadata, weights, f, cutoff_rule=cutoff_rule)
+    except http_client.FetchError as e:
+        # --file-recency dates files lazily while they are ranked
+        print(f"Error fetching commit dates: {e}")
         sys.exit(1)
     
+    original_count = summary['original_count']
+    filtered_count = summary['filtered_count']
+    meta = {
+        'original_count': original_count,
+        'filtered_count': filtered_count,
+        'reduction': f"{((original_count - filtered_count) / original_count * 100):.1f}%" if original_count > 0 else "0%",
+        'platform': 'github',
+        'repository': repository,
+        'filtering_method': 'statistical_percentile',
+        'cutoff_percentile_used': summary['cutoff_percentile_used'],
+        'weights_used': weights,
+        'repo_metadata': {
+            'stars': repo_metadata.get('stargazers_count'),
+            'forks': repo_metadata.get('forks_count'),
+            'last_updated': repo_metadata.get('updated_at'),
+            'description': repo_metadata.get('description'),
+        },
+        'statistics': summary['statistics'],
+        'format': 'jsonl',
+        'resources_file': args.output,
+    }
+    if args.ranking == 'sketch':
+        meta['filtering_method'] = 'streaming_sketch_percentile'
+        meta['sketch_error'] = args.sketch_error
+        if 'exact' in summary:
+            meta['exact'] = dict(summary['exact'], resources_file=args.exact_output)
+    with open(f'{args.output}.meta.json', 'w') as f:
+        json.dump(meta, f, indent=2)
+    
+    print(f"\n✅ Filtering complete!")
+    print(f"📊 Original: {original_count} files")
+    print(f"📊 Filtered: {filtered_count} files ({meta['reduction']} reduction)")
+    print(f"📊 Cutoff: {summary['cutoff_percentile_used']}th percentile")
+    print(f"💾 Output saved to: {args.output} (summary: {args.output}.meta.json)")
+    if 'exact' in summary:
+        print(f"🎯 Exact pass: {summary['exact']['filtered_count']} files at the {summary['exact']['cutoff_percentile_used']}th percentile, saved to {args.exact_output}")
+
+def fetch_repository(owner: str, repo: str, args) -> tuple:
+    """Fetch repo metadata and the file listing selected by the CLI options, exiting on errors"""
+    metrics = get_metrics()
     print(f"📊 Fetching repository metadata for {owner}/{repo}...")
+    metrics.begin('metadata')
     
     # Get repo metadata
     try:
@@ -255,8 +740,147 @@ def main():
     print(f"⭐ Repository: {repo_metadata.get('stargazers_count', 0)} stars, {repo_metadata.get('forks_count', 0)} forks")
     
     # Get all files
-    print(f"📂 Fetching repository files (max depth: {args.max_depth})...")
-    files = get_repo_files(owner, repo, '', args.token, args.max_depth)
+    metrics.begin('listing')
+    if args.listing == 'tree':
+        depth_label = args.max_depth if args.max_depth is not None else 'unlimited'
+        print(f"📂 Fetching repository tree (max depth: {depth_label})...")
+        ref = repo_metadata.get('default_branch') or 'HEAD'
+        try:
+            if args.state_file:
+                state = CrawlCheckpoint(args.state_file, f'github:{owner}/{repo}:{ref}')
+                tree_state = refresh_repo_tree(owner, repo, ref, args.token, state.state if state.resumed else None)
+                stats = tree_state.pop('stats')
+                state.update(**tree_state)
+                state.save()
+                print(f"♻️  Incremental: {stats['requests']} tree requests, {stats['changed_files']} new/changed files, {stats['reused_trees']} unchanged subtrees reused")
+                files = select_tree_files(tree_state_entries(tree_state), owner, repo, args.path, args.max_depth, ref)
+            elif args.format == 'jsonl':
+                files = iter_tree_files(get_repo_tree(owner, repo, ref, args.token), owner, repo, args.path, args.max_depth, ref)
+            else:
+                files = get_repo_files_from_tree(owner, repo, args.path, args.token, args.max_depth, ref)
+        except http_client.FetchError as e:
+            print(f"Error fetching repository tree: {e}")
+            sys.exit(1)
+    elif args.state_file:
+        print("Error: --state-file requires --listing tree")
+        sys.exit(1)
+    else:
+        max_depth = args.max_depth if args.max_depth is not None else 3
+        checkpoint = CrawlCheckpoint(args.resume_file or f'{args.output}.resume.json',
+                                     f'github:{owner}/{repo}:{args.path}:{max_depth}')
+        if checkpoint.resumed:
+            print(f"♻️  Resuming crawl from {checkpoint.path} ({len(checkpoint.state.get('pending', []))} directories pending)")
+        print(f"📂 Fetching repository files (max depth: {max_depth}, workers: {args.workers})...")
+        try:
+            files = get_repo_files_concurrent(owner, repo, args.path, args.token, max_depth, max(args.workers, 1), checkpoint)
+        except http_client.FetchError as e:
+            http_client.abandon_waits()
+            print(f"Error fetching repository files: {e}")
+            print(f"💾 Progress saved to {checkpoint.path} - rerun the same command to resume")
+            sys.exit(1)
+        checkpoint.clear()
+    
+    if args.file_recency:
+        # Only substantive files are ranked, so only they cost a path in a query
+        ref = repo_metadata.get('default_branch') or 'HEAD'
+        print(f"🕒 Fetching last-commit dates per file ({COMMIT_DATE_BATCH} paths per GraphQL query, {args.workers} at a time)...")
+        metrics.begin('commit_dates')
+        files = annotate_commit_dates(files, github_graphql_url(), owner, repo, ref, github_headers(args.token),
+                                      wanted=is_substantive_file, workers=max(args.workers, 1))
+        if args.format != 'jsonl':
+            try:
+                files = list(files)
+            except http_client.FetchError as e:
+                print(f"Error fetching commit dates: {e}")
+                sys.exit(1)
+            print(f"   {sum(1 for f in files if f.get('last_commit_date'))} files dated")
+    
+    return repo_metadata, files
+
+def main():
+    parser = argparse.ArgumentParser(description='Filter GitHub resources using statistical percentiles')
+    parser.add_argument('--url', help='GitHub repository URL (not needed with --from-snapshot)')
+    parser.add_argument('--token', help='GitHub API token (recommended for rate limits)')
+    parser.add_argument('--output', default='filtered_github.json', help='Output file path')
+    parser.add_argument('--format', choices=['json', 'jsonl'], default='json',
+                        help='json: one document with the top 500; jsonl: stream every kept file, one per line (bounded memory)')
+    parser.add_argument('--max-depth', type=int, help='Max directory depth to scan (default: unlimited for tree listing, 3 for contents crawl)')
+    parser.add_argument('--listing', choices=['tree', 'contents'], default='tree',
+                        help='tree: whole repo in one Git Trees API call; contents: per-directory Contents API crawl')
+    parser.add_argument('--path', default='', help='Only scan this subdirectory of the repository')
+    parser.add_argument('--workers', type=int, default=8, help='Concurrent directory fetches for the contents crawl (1 = serial)')
+    parser.add_argument('--rate', type=float, help='Global request budget in requests/second (default: unlimited)')
+    parser.add_argument('--resume-file', help='Checkpoint for resuming an interrupted contents crawl (default: OUTPUT.resume.json)')
+    parser.add_argument('--state-file', help='Incremental mode: reuse this state file and only fetch subtrees changed since the last run')
+    parser.add_argument('--file-recency', action='store_true',
+                        help=f'Score recency per file from its last commit (GraphQL, one request per {COMMIT_DATE_BATCH} files; needs --token)')
+    add_cache_arguments(parser)
+    add_snapshot_arguments(parser)
+    parser.add_argument('--prefetch', action='store_true', help='Download the kept files into the local blob store for Phase 2')
+    add_prefetch_arguments(parser)
+    add_sketch_arguments(parser)
+    add_dedup_arguments(parser)
+    add_history_arguments(parser)
+    add_metrics_arguments(parser)
+    
+    args = parser.parse_args()
+    if args.ranking == 'sketch' and args.format != 'jsonl':
+        parser.error('--ranking sketch emits files as they arrive and needs --format jsonl')
+    if args.dedup != 'none' and args.format == 'jsonl':
+        parser.error('--dedup compares whole collections and needs --format json')
+    if args.history and args.format == 'jsonl':
+        parser.error('--history records whole runs and needs --format json')
+    if args.save_columns and args.format == 'jsonl':
+        parser.error('--save-columns writes whole runs and needs --format json')
+    if not args.url and not args.from_snapshot:
+        parser.error('one of --url or --from-snapshot is required')
+    if args.file_recency and not args.token and not args.from_snapshot and not args.replay:
+        parser.error("--file-recency needs --token (GitHub's GraphQL API has no anonymous access)")
+    try:
+        weights = apply_weight_overrides(GITHUB_WEIGHTS, args.weight)
+        cutoff_rule = cutoff_function(args, determine_cutoff_percentile)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    write_on_exit(args.metrics)
+    metrics = get_metrics()
+    
+    if args.from_snapshot:
+        try:
+            snapshot = load_snapshot(args.from_snapshot, 'github')
+        except (OSError, ValueError) as e:
+            print(f"Error loading snapshot: {e}")
+            sys.exit(1)
+        owner, repo = snapshot['source'].split('/', 1)
+        repo_metadata, files = snapshot['repo_metadata'], snapshot['items']
+        print(f"📦 Re-ranking snapshot of {owner}/{repo} ({len(files)} files, fetched {snapshot['fetched_at']})")
+    else:
+        try:
+            owner, repo = parse_github_url(args.url)
+        except ValueError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        http_client.configure(pool_size=max(args.workers, 1), rate=args.rate)
+        try:
+            http_client.configure_cache_from_args(args)
+        except (OSError, ValueError) as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        repo_metadata, files = fetch_repository(owner, repo, args)
+        if args.save_snapshot:
+            files = list(files)
+            save_snapshot(args.save_snapshot, 'github', f'{owner}/{repo}', files, repo_metadata=repo_metadata)
+            print(f"💾 Snapshot saved to {args.save_snapshot}")
+    
+    if args.format == 'jsonl':
+        # Listing is lazy here, so this stage also covers consuming it
+        metrics.begin('ranking')
+        with profiled(args.profile):
+            write_streaming_output(files, repo_metadata, f'{owner}/{repo}', args, weights, cutoff_rule)
+        if args.prefetch:
+            run_prefetch(args.output, args, github_headers(args.token))
+        metrics.finish()
+        return
     
     print(f"✅ Found {len(files)} files in repository")
     
@@ -269,13 +893,43 @@ def main():
     all_sizes = [f.get('size', 0) for f in files]
     print(f"   File sizes: median={statistics.median(all_sizes)}, p75={percentile(all_sizes, 75)}, p90={percentile(all_sizes, 90)}")
     
+    # Collapse copies (same blob sha, free) so each cluster is ranked once
+    ranked = files
+    deduplication = None
+    if args.dedup != 'none':
+        print(f"\n🧬 Collapsing identical files...")
+        metrics.begin('dedup')
+        ranked = dedup_files(files)
+        metrics.record_items('github.dedup', len(files), len(ranked))
+        deduplication = {'mode': args.dedup, 'clusters': sum(1 for f in ranked if f.get('cluster_size')), 'removed': len(files) - len(ranked)}
+        print(f"   {deduplication['removed']} duplicates collapsed into {deduplication['clusters']} clusters")
+    
     # Filter resources
     print(f"\n🔍 Filtering using percentile-based ranking...")
-    filtered, all_data = filter_resources(files, repo_metadata, GITHUB_WEIGHTS)
-    
-    cutoff_used = determine_cutoff_percentile(len(files))
+    metrics.begin('ranking')
+    with profiled(args.profile):
+        filtered, all_data = filter_resources(ranked, repo_metadata, weights, cutoff_rule=cutoff_rule)
+    
+    cutoff_used = cutoff_rule(len(ranked))
+    
+    # Near-duplicates need file contents: download only the files that were kept
+    if args.dedup == 'near' and filtered:
+        print(f"\n🧬 Collapsing near-duplicates among the {len(filtered)} kept files...")
+        metrics.begin('dedup')
+        sizes = {id(f): f.get('cluster_size', 1) for f in filtered}
+        kept = dedup_files(filtered, BlobStore(args.prefetch_store), github_headers(args.token), args.dedup_threshold,
+                           args.prefetch_workers, args.prefetch_max_bytes)
+        kept.sort(key=lambda x: x['composite_score'], reverse=True)
+        metrics.record_items('github.dedup.near', len(filtered), len(kept))
+        merged = sum(1 for f in kept if f.get('cluster_size', 1) > sizes[id(f)])
+        # Exact clusters among the kept files may have been merged into bigger ones
+        deduplication['clusters'] += sum(1 for f in kept if f.get('cluster_size')) - sum(1 for size in sizes.values() if size > 1)
+        deduplication['removed'] += len(filtered) - len(kept)
+        print(f"   {len(filtered) - len(kept)} near-duplicates merged into {merged} kept files")
+        filtered = kept
     
     # Prepare output
+    metrics.begin('output')
     output = {
         'original_count': len(files),
         'filtered_count': len(filtered),
@@ -284,7 +938,7 @@ def main():
         'repository': f"{owner}/{repo}",
         'filtering_method': 'statistical_percentile',
         'cutoff_percentile_used': cutoff_used,
-        'weights_used': GITHUB_WEIGHTS,
+        'weights_used': weights,
         'repo_metadata': {
             'stars': repo_metadata.get('stargazers_count'),
             'forks': repo_metadata.get('forks_count'),
@@ -299,16 +953,26 @@ def main():
         'resources': filtered[:500],  # Limit to top 500
         'next_steps': 'Review filtered list, or request Phase 2 for deep analysis'
     }
+    if deduplication:
+        output['deduplication'] = deduplication
     
     # Save to file
     with open(args.output, 'w') as f:
         json.dump(output, f, indent=2)
+    if args.history:
+        metrics.begin('history')
+        record_output(args.history, output, filtered, len(all_data['all_sizes']) if filtered else None)
+    if args.save_columns:
+        save_columns(args.save_columns, 'github', f"{owner}/{repo}", filtered, cutoff_percentile_used=cutoff_used, weights_used=weights)
+    metrics.finish()
     
     print(f"\n✅ Filtering complete!")
     print(f"📊 Original: {len(files)} files")
     print(f"📊 Filtered: {len(filtered)} files ({output['reduction']} reduction)")
     print(f"📊 Cutoff: {cutoff_used}th percentile")
     print(f"💾 Output saved to: {args.output}")
+    if args.save_columns:
+        print(f"💾 Kept items saved as columns to: {args.save_columns}")
     
     if len(filtered) > 0:
         print(f"\n🏆 Top 5 resources by composite score:")
@@ -316,6 +980,10 @@ def main():
             print(f"{i}. {resource['name']}")
             print(f"   Score: {resource['composite_score']:.1f}/100 | Size: {resource['size']} bytes")
             print(f"   Breakdown: recency={resource['score_breakdown']['recency']:.0f}, stars={resource['score_breakdown']['stars']:.0f}, size={resource['score_breakdown']['file_size']:.0f}")
+    
+    if args.prefetch:
+        run_prefetch(args.output, args, github_headers(args.token))
+        metrics.finish()
 
 if __name__ == '__main__':
     main()
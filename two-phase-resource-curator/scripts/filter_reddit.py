@@ -6,13 +6,36 @@ Adapts to any subreddit size and engagement level.
 """
 
 import sys
+import os
 import json
 import argparse
+import queue
+import threading
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import List, Dict
-import requests
+from array import array
+from typing import Callable, List, Dict, Iterable, Iterator, Optional, Sequence, TextIO
 import statistics
 
+from checkpoint import CrawlCheckpoint
+from column_snapshot import save_columns
+from columnar import ColumnBuffer
+from dedup import DEFAULT_THRESHOLD, add_dedup_arguments, cluster, collapse, minhash_signature, normalize_url, shingles
+from history_store import add_history_arguments, record_output
+from http_cache import add_cache_arguments
+from metrics import get_metrics, add_metrics_arguments, write_on_exit, profiled
+from ranking import SortedColumn, percentile, percentile_rank
+from sketch import DEFAULT_ERROR, DEFAULT_WARMUP, QuantileSketch, add_sketch_arguments
+from snapshot import lazy_import, load_snapshot, save_snapshot, add_snapshot_arguments, apply_weight_overrides, cutoff_function
+
+# Network stack is only loaded once a fetch happens, so --from-snapshot runs stay offline
+http_client = lazy_import('http_client')
+
+# Base URL for subreddit listings (override to point at a local mock server)
+REDDIT_BASE_URL = os.environ.get('REDDIT_BASE_URL', 'https://www.reddit.com').rstrip('/')
+
 # Platform-specific metric weights for Reddit
 REDDIT_WEIGHTS = {
     'score': 0.40,       # Upvotes are strong signal
@@ -21,69 +44,359 @@ REDDIT_WEIGHTS = {
     'ratio': 0.10,       # Polarizing ≠ bad, but consider
 }
 
-def percentile(data: List[float], p: int) -> float:
-    """Calculate percentile of dataset"""
-    if not data:
-        return 0
-    sorted_data = sorted(data)
-    index = (len(sorted_data) - 1) * p / 100
-    floor = int(index)
-    ceil = floor + 1
-    if ceil >= len(sorted_data):
-        return sorted_data[-1]
-    return sorted_data[floor] + (sorted_data[ceil] - sorted_data[floor]) * (index - floor)
-
-def percentile_rank(value: float, data: List[float]) -> float:
-    """Calculate what percentile a value is in dataset (0-100)"""
-    if not data or value is None:
-        return 0
-    count_below = sum(1 for x in data if x < value)
-    count_equal = sum(1 for x in data if x == value)
-    return ((count_below + 0.5 * count_equal) / len(data)) * 100
+# Comment-mode weights (no upvote ratio on comments; replies stand in for discussion)
+COMMENT_WEIGHTS = {
+    'score': 0.50,       # Upvotes within the thread
+    'replies': 0.30,     # Direct replies a comment drew
+    'recency': 0.20,     # Mostly constant within one thread
+}
+
+# Reddit stops paging any one listing after about this many posts
+LISTING_CAP = 1000
+
+# Listing pages are never served from the response cache without revalidating:
+# scores move by the minute and a reused page would be silently out of date
+LISTING_MAX_AGE = 0
+
+# Listings harvested together when --limit is above LISTING_CAP: each reaches different posts
+HARVEST_LISTINGS = ('top:all', 'top:year', 'top:month', 'top:week', 'top:day', 'new', 'hot')
+SORTED_LISTINGS = ('top', 'controversial')
+TIME_WINDOWS = ('hour', 'day', 'week', 'month', 'year', 'all')
+UNSORTED_LISTINGS = ('new', 'hot', 'rising')
+
+# morechildren accepts at most 100 comment IDs per request
+MORECHILDREN_BATCH = 100
+
+# Comment fields kept while flattening a thread (drops body_html, awards, etc.)
+COMMENT_FIELDS = ('id', 'name', 'parent_id', 'author', 'body', 'score', 'created_utc', 'permalink', 'depth', 'stickied')
+
+# Post fields kept when storing collections between runs
+POST_FIELDS = ('id', 'name', 'title', 'selftext', 'permalink', 'url', 'score', 'num_comments', 'upvote_ratio',
+               'created_utc', 'author', 'subreddit', 'removed_by_category', 'crosspost_parent', 'is_self')
 
 def fetch_reddit_data(url: str) -> Dict:
     """Fetch Reddit data using JSON endpoint (no auth needed)"""
     json_url = url.rstrip('/') + '.json' if not url.endswith('.json') else url
     headers = {'User-Agent': 'ResourceCurator/2.0'}
-    response = requests.get(json_url, headers=headers)
+    response = http_client.get(json_url, headers=headers)
     
     if response.status_code != 200:
-        raise Exception(f"Reddit API error: {response.status_code}")
+        raise http_client.FetchError(f"Reddit API error: {response.status_code}")
     
     return response.json()
 
-def parse_subreddit_posts(subreddit: str, limit: int = 1000, time_filter: str = 'all') -> List[Dict]:
-    """Fetch posts from subreddit"""
-    posts = []
-    after = None
+def iter_listing_pages(subreddit: str, listing: str = 'top', params: Optional[Dict] = None, after: Optional[str] = None) -> Iterator[tuple]:
+    """Yield (posts, after) for each 100-post page of a subreddit listing"""
     headers = {'User-Agent': 'ResourceCurator/2.0'}
+    url = f'{REDDIT_BASE_URL}/r/{subreddit}/{listing}.json'
     
-    while len(posts) < limit:
-        params = {'limit': 100, 't': time_filter}
+    while True:
+        page_params = dict(params or {}, limit=100)
         if after:
-            params['after'] = after
+            page_params['after'] = after
         
-        url = f'https://www.reddit.com/r/{subreddit}/top.json'
-        response = requests.get(url, headers=headers, params=params)
+        response = http_client.get(url, headers=headers, params=page_params, max_age=LISTING_MAX_AGE)
         
         if response.status_code != 200:
-            break
+            raise http_client.FetchError(f"Reddit API error: {response.status_code}")
         
         data = response.json()
         children = data.get('data', {}).get('children', [])
+        after = data.get('data', {}).get('after')
         
-        if not children:
-            break
-        
-        for child in children:
-            posts.append(child['data'])
+        yield [child['data'] for child in children], after
         
-        after = data.get('data', {}).get('after')
-        if not after:
-            break
+        if not children or not after:
+            return
+
+def parse_subreddit_posts(subreddit: str, limit: int = 1000, time_filter: str = 'all', checkpoint: Optional[CrawlCheckpoint] = None) -> List[Dict]:
+    """Fetch posts from subreddit
+
+    Error statuses raise instead of returning a silently truncated listing.
+    With a checkpoint, fetched posts and the `after` cursor are recorded so
+    an interrupted crawl resumes from the next page.
+    """
+    posts = []
+    after = None
+    
+    if checkpoint is not None and checkpoint.resumed:
+        posts = checkpoint.state.get('posts', [])
+        after = checkpoint.state.get('after')
+        # No cursor after at least one recorded page means the listing ended;
+        # a crawl that failed on its first page recorded nothing and starts over
+        if 'after' in checkpoint.state and not after:
+            return posts[:limit]
+    
+    if len(posts) >= limit:
+        return posts[:limit]
+    
+    try:
+        for page, after in iter_listing_pages(subreddit, 'top', {'t': time_filter}, after):
+            posts.extend(page)
+            if checkpoint is not None:
+                checkpoint.update(posts=posts, after=after)
+            if len(posts) >= limit:
+                break
+    except BaseException:
+        if checkpoint is not None:
+            checkpoint.save()
+        raise
     
     return posts[:limit]
 
+def iter_subreddit_posts(subreddit: str, limit: int = 1000, time_filter: str = 'all') -> Iterator[Dict]:
+    """Yield posts page by page without holding the whole listing in memory"""
+    count = 0
+    for page, _ in iter_listing_pages(subreddit, 'top', {'t': time_filter}):
+        for post in page:
+            if count >= limit:
+                return
+            count += 1
+            yield post
+
+def parse_listing_spec(spec: str) -> tuple:
+    """'top:week' -> ('top', {'t': 'week'}); 'new' -> ('new', {})"""
+    listing, sep, window = spec.strip().partition(':')
+    if listing in SORTED_LISTINGS and (not sep or window in TIME_WINDOWS):
+        return listing, {'t': window or 'all'}
+    if listing in UNSORTED_LISTINGS and not sep:
+        return listing, {}
+    raise ValueError(f"Invalid listing '{spec}' (expected new, hot, rising or top/controversial:{'|'.join(TIME_WINDOWS)})")
+
+def harvest_listing_pages(subreddit: str, listings: Sequence[str], cursors: Optional[Dict] = None) -> Iterator[tuple]:
+    """Yield (listing, posts, after) pages from several listings paged concurrently
+
+    One thread pages each listing (resuming from cursors[listing] if given)
+    and pages are handed over as they arrive, so the wall time is that of
+    the longest listing rather than the sum. The first fetch error is
+    raised here; closing the generator stops every thread after its
+    current page.
+    """
+    pages = queue.Queue()
+    stop = threading.Event()
+    
+    def crawl(spec: str):
+        listing, params = parse_listing_spec(spec)
+        try:
+            for posts, after in iter_listing_pages(subreddit, listing, params, (cursors or {}).get(spec)):
+                pages.put((spec, posts, after))
+                if stop.is_set():
+                    break
+        except Exception as e:
+            pages.put((spec, e, None))
+        finally:
+            pages.put((spec, None, None))
+    
+    running = len(listings)
+    with ThreadPoolExecutor(max_workers=max(running, 1)) as pool:
+        for spec in listings:
+            pool.submit(crawl, spec)
+        try:
+            while running:
+                spec, posts, after = pages.get()
+                if posts is None:
+                    running -= 1
+                elif isinstance(posts, Exception):
+                    raise posts
+                else:
+                    yield spec, posts, after
+        finally:
+            stop.set()
+
+def harvest_subreddit_posts(subreddit: str, limit: int, listings: Sequence[str] = HARVEST_LISTINGS, checkpoint: Optional[CrawlCheckpoint] = None) -> List[Dict]:
+    """Fetch posts from several listings at once, merged by post ID
+
+    Every listing stops after about LISTING_CAP posts, but top over each
+    time window, new and hot reach different posts, so their union covers
+    a large subreddit far beyond one listing in about the time of the
+    slowest one. Every listing is paged to its end; a post seen in several
+    listings is kept once, as seen by the earliest listing in `listings`,
+    and the merged posts are sorted by listing then page position before
+    being cut to `limit`, so which posts are kept does not depend on which
+    thread finished first. How many distinct posts each listing added is
+    recorded in the run metrics as reddit.harvest.LISTING. With a
+    checkpoint, the merged posts, where each was seen and each listing's
+    cursor are recorded so an interrupted harvest resumes every listing
+    where it stopped.
+    """
+    merged = {}
+    origin = {}
+    cursors = {}
+    positions = Counter()
+    
+    if checkpoint is not None and checkpoint.resumed:
+        for post, seen_at in zip(checkpoint.state.get('posts', []), checkpoint.state.get('origins', [])):
+            merged[post['id']] = post
+            origin[post['id']] = tuple(seen_at)
+        cursors = checkpoint.state.get('cursors', {})
+        positions.update(checkpoint.state.get('positions', {}))
+    
+    # A listing with a None cursor was paged to its end before the interruption
+    pending = [spec for spec in listings if cursors.get(spec, True)]
+    rank = {spec: index for index, spec in enumerate(listings)}
+    fetched = Counter()
+    added = Counter()
+    metrics = get_metrics()
+    
+    try:
+        if pending:
+            for spec, page, after in harvest_listing_pages(subreddit, pending, cursors):
+                for post in page:
+                    position = (rank[spec], positions[spec])
+                    positions[spec] += 1
+                    fetched[spec] += 1
+                    if post['id'] not in merged:
+                        added[spec] += 1
+                    elif origin[post['id']] < position:
+                        continue
+                    merged[post['id']] = post
+                    origin[post['id']] = position
+                # iter_listing_pages stops after an empty page even if it has a cursor
+                cursors[spec] = after if page else None
+                if checkpoint is not None:
+                    checkpoint.update(posts=list(merged.values()), origins=[origin[post_id] for post_id in merged],
+                                      cursors=cursors, positions=dict(positions))
+    except BaseException:
+        if checkpoint is not None:
+            checkpoint.save()
+        raise
+    finally:
+        for spec in pending:
+            metrics.record_items(f'reddit.harvest.{spec}', fetched[spec], added[spec])
+    
+    return sorted(merged.values(), key=lambda post: origin[post['id']])[:limit]
+
+def iter_harvested_posts(subreddit: str, limit: int, listings: Sequence[str] = HARVEST_LISTINGS) -> Iterator[Dict]:
+    """Yield each distinct post once, in the same order as harvest_subreddit_posts
+
+    Pages of the earliest listing still being paged are yielded as they
+    arrive; later listings' pages are held until every listing before them
+    has ended, so the first `limit` posts never depend on thread timing.
+    """
+    rank = {spec: index for index, spec in enumerate(listings)}
+    held = [[] for _ in listings]
+    ended = [False] * len(listings)
+    current = 0
+    seen = set()
+    for spec, page, after in harvest_listing_pages(subreddit, listings):
+        index = rank[spec]
+        held[index].append(page)
+        # iter_listing_pages stops after an empty page or the page without a cursor
+        ended[index] = not page or not after
+        while current < len(listings):
+            for post in (post for held_page in held[current] for post in held_page):
+                if post['id'] in seen:
+                    continue
+                if len(seen) >= limit:
+                    return
+                seen.add(post['id'])
+                yield post
+            held[current] = []
+            if not ended[current]:
+                break
+            current += 1
+
+def project_post(post: Dict) -> Dict:
+    """Keep only the fields used for filtering, scoring and output"""
+    return {field: post.get(field) for field in POST_FIELDS if field in post}
+
+def project_comment(comment: Dict) -> Dict:
+    """Keep only the comment fields used for scoring and output"""
+    return {field: comment.get(field) for field in COMMENT_FIELDS if field in comment}
+
+def flatten_comment_tree(children: List[Dict], depth: int = 0) -> tuple:
+    """Flatten a nested comment listing into (comments, more_stubs) without recursion
+
+    An explicit stack replaces recursion, so arbitrarily deep threads never
+    hit the recursion limit. Comments come out in display (pre-)order,
+    projected as they are visited; `more` stubs are returned for expansion.
+    """
+    comments = []
+    stubs = []
+    stack = [(child, depth) for child in reversed(children)]
+    
+    while stack:
+        thing, level = stack.pop()
+        data = thing.get('data', {})
+        if thing.get('kind') == 'more':
+            stubs.append(data)
+            continue
+        if thing.get('kind') != 't1':
+            continue
+        
+        comment = project_comment(data)
+        comment['depth'] = data.get('depth', level)
+        comments.append(comment)
+        
+        replies = data.get('replies')
+        if isinstance(replies, dict):
+            nested = replies.get('data', {}).get('children', [])
+            stack.extend((child, level + 1) for child in reversed(nested))
+    
+    return comments, stubs
+
+def fetch_more_children(link_id: str, ids: List[str]) -> List[Dict]:
+    """Expand up to MORECHILDREN_BATCH collapsed comments in one request"""
+    headers = {'User-Agent': 'ResourceCurator/2.0'}
+    params = {'api_type': 'json', 'link_id': link_id, 'children': ','.join(ids), 'limit_children': 'false'}
+    response = http_client.get(f'{REDDIT_BASE_URL}/api/morechildren.json', headers=headers, params=params)
+    
+    if response.status_code != 200:
+        raise http_client.FetchError(f"Reddit API error: {response.status_code}")
+    
+    return response.json().get('json', {}).get('data', {}).get('things', [])
+
+def fetch_continued_thread(post_id: str, comment_id: str) -> List[Dict]:
+    """Fetch a "continue this thread" subtree (a `more` stub with no child IDs)"""
+    data = fetch_reddit_data(f'{REDDIT_BASE_URL}/comments/{post_id}/_/{comment_id}')
+    return data[1]['data']['children'] if isinstance(data, list) and len(data) > 1 else []
+
+def fetch_comment_tree(url: str, max_comments: Optional[int] = None, workers: int = 4) -> tuple:
+    """Fetch a post and its whole comment tree as (post, flat comment list)
+
+    Collapsed `more` stubs are expanded breadth-first through morechildren
+    in batches of MORECHILDREN_BATCH IDs, several batches in parallel. Only
+    projected comments are kept, so memory stays proportional to the
+    comment count rather than to the raw API responses.
+    """
+    data = fetch_reddit_data(url)
+    if not isinstance(data, list) or len(data) < 2:
+        raise http_client.FetchError("Not a Reddit post URL (no comment listing in response)")
+    
+    post = data[0]['data']['children'][0]['data']
+    comments, stubs = flatten_comment_tree(data[1]['data']['children'])
+    del data
+    seen = {comment['id'] for comment in comments}
+    
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as pool:
+        while stubs and (max_comments is None or len(comments) < max_comments):
+            ids = [cid for stub in stubs for cid in stub.get('children', []) if cid not in seen]
+            continued = [stub['parent_id'].split('_', 1)[1] for stub in stubs
+                         if not stub.get('children') and stub.get('parent_id', '').startswith('t1_')]
+            
+            jobs = [pool.submit(fetch_more_children, post['name'], ids[i:i + MORECHILDREN_BATCH])
+                    for i in range(0, len(ids), MORECHILDREN_BATCH)]
+            jobs += [pool.submit(fetch_continued_thread, post['id'], cid) for cid in continued]
+            
+            stubs = []
+            for job in jobs:
+                batch, more = flatten_comment_tree(job.result())
+                stubs.extend(more)
+                for comment in batch:
+                    if comment['id'] not in seen:
+                        seen.add(comment['id'])
+                        comments.append(comment)
+    
+    if max_comments is not None:
+        comments = comments[:max_comments]
+    
+    # Direct reply counts, now that every expanded comment is known
+    reply_counts = Counter(comment.get('parent_id') for comment in comments)
+    for comment in comments:
+        comment['num_replies'] = reply_counts.get(comment.get('name'), 0)
+    
+    return post, comments
+
 def calculate_recency_score(created_utc: float) -> float:
     """Calculate recency score (0-100) based on age"""
     created_date = datetime.fromtimestamp(created_utc)
@@ -138,21 +451,65 @@ def determine_cutoff_percentile(collection_size: int) -> int:
     else:
         return 75
 
-def filter_posts(posts: List[Dict], weights: Dict) -> tuple:
-    """Statistical filtering using percentile ranking"""
+def is_valid_post(post: Dict) -> bool:
+    """Basic sanity filter: skip deleted, removed, or obviously spam posts"""
+    if post.get('removed_by_category'):
+        return False
+    if post.get('author') == '[deleted]':
+        return False
+    # Must have at least some engagement
+    if post.get('score', 0) < 1 and post.get('num_comments', 0) < 1:
+        return False
+    return True
+
+def simplify_post(post: Dict, composite: float, breakdowns: Dict) -> Dict:
+    """Output record for a scored post"""
+    created_utc = post.get('created_utc', 0)
+    created_date = datetime.fromtimestamp(created_utc)
+    days_old = (datetime.now() - created_date).days
+    
+    return {
+        'title': post.get('title'),
+        'url': f"https://reddit.com{post.get('permalink')}",
+        'score': post.get('score'),
+        'upvote_ratio': post.get('upvote_ratio'),
+        'num_comments': post.get('num_comments'),
+        'created_date': created_date.strftime('%Y-%m-%d'),
+        'days_old': days_old,
+        'author': post.get('author'),
+        'subreddit': post.get('subreddit'),
+        'composite_score': composite,
+        'score_breakdown': breakdowns,
+        **({'cluster_size': post['cluster_size'], 'duplicates': post['duplicates']} if post.get('cluster_size') else {}),
+    }
+
+def post_dedup_keys(post: Dict) -> List[str]:
+    """Exact-duplicate keys: a crosspost shares its parent's fullname, a link post its normalized URL"""
+    keys = [post[field] for field in ('name', 'crosspost_parent') if post.get(field)]
+    if post.get('url') and not post.get('is_self'):
+        keys.append('url:' + normalize_url(post['url']))
+    return keys
+
+def dedup_posts(posts: List[Dict], near: bool = False, threshold: float = DEFAULT_THRESHOLD) -> List[Dict]:
+    """Collapse crossposts, reposts of the same link and (with near) near-identical titles/bodies
+
+    The representative is the original post (not a crosspost) with the
+    highest score; it carries 'cluster_size' and the other permalinks.
+    """
+    signatures = None
+    if near:
+        signatures = [minhash_signature(shingles(f"{post.get('title') or ''} {post.get('selftext') or ''}")) for post in posts]
+    groups = cluster(len(posts), [post_dedup_keys(post) for post in posts], signatures, threshold)
+    return collapse(posts, groups,
+                    preference=lambda post: (bool(post.get('crosspost_parent')), -(post.get('score') or 0)),
+                    label=lambda post: post.get('permalink') or post.get('id'))
+
+def filter_posts(posts: List[Dict], weights: Dict, cutoff_rule: Optional[Callable[[int], float]] = None) -> tuple:
+    """Statistical filtering using percentile ranking (cutoff_rule replaces determine_cutoff_percentile)"""
     
     # Basic sanity filter first
-    basic_filtered = []
-    for post in posts:
-        # Skip if: deleted, removed, or obviously spam
-        if post.get('removed_by_category'):
-            continue
-        if post.get('author') == '[deleted]':
-            continue
-        # Must have at least some engagement
-        if post.get('score', 0) < 1 and post.get('num_comments', 0) < 1:
-            continue
-        basic_filtered.append(post)
+    basic_filtered = [post for post in posts if is_valid_post(post)]
+    get_metrics().record_items('reddit.valid', len(posts), len(basic_filtered))
     
     if not basic_filtered:
         return [], {}
@@ -166,66 +523,477 @@ def filter_posts(posts: List[Dict], weights: Dict) -> tuple:
         'all_comments': all_comments,
     }
     
+    # Sort each metric column once so every rank lookup is a binary search
+    rank_data = {key: SortedColumn(values) for key, values in all_data.items()}
+    
     # Calculate composite scores
     scored_posts = []
     for post in basic_filtered:
-        composite, breakdowns = calculate_composite_score(post, all_data, weights)
-        
-        created_utc = post.get('created_utc', 0)
-        created_date = datetime.fromtimestamp(created_utc)
-        days_old = (datetime.now() - created_date).days
-        
-        simplified_post = {
-            'title': post.get('title'),
-            'url': f"https://reddit.com{post.get('permalink')}",
-            'score': post.get('score'),
-            'upvote_ratio': post.get('upvote_ratio'),
-            'num_comments': post.get('num_comments'),
-            'created_date': created_date.strftime('%Y-%m-%d'),
-            'days_old': days_old,
-            'author': post.get('author'),
-            'subreddit': post.get('subreddit'),
-            'composite_score': composite,
-            'score_breakdown': breakdowns,
-        }
-        
-        scored_posts.append(simplified_post)
+        composite, breakdowns = calculate_composite_score(post, rank_data, weights)
+        scored_posts.append(simplify_post(post, composite, breakdowns))
     
     # Determine cutoff
-    cutoff_percentile = determine_cutoff_percentile(len(basic_filtered))
+    cutoff_percentile = (cutoff_rule or determine_cutoff_percentile)(len(basic_filtered))
     
     # Filter by cutoff
     filtered = [p for p in scored_posts if p['composite_score'] >= cutoff_percentile]
+    get_metrics().record_items('reddit.cutoff', len(basic_filtered), len(filtered))
     
     # Sort by composite score descending
     filtered.sort(key=lambda x: x['composite_score'], reverse=True)
     
     return filtered, all_data
 
-def main():
-    parser = argparse.ArgumentParser(description='Filter Reddit posts using statistical percentiles')
-    parser.add_argument('--subreddit', help='Subreddit name (without r/)')
-    parser.add_argument('--url', help='Reddit post or subreddit URL')
-    parser.add_argument('--limit', type=int, default=1000, help='Maximum posts to fetch')
-    parser.add_argument('--output', default='filtered_reddit.json', help='Output file path')
+def calculate_comment_score(comment: Dict, all_data: Dict, weights: Dict) -> tuple:
+    """Calculate composite percentile score for a comment within its thread"""
+    scores = {}
     
-    args = parser.parse_args()
+    # Score/upvotes percentile
+    scores['score'] = percentile_rank(comment.get('score', 0), all_data['all_scores'])
+    
+    # Direct replies percentile
+    scores['replies'] = percentile_rank(comment.get('num_replies', 0), all_data['all_replies'])
+    
+    # Recency score (absolute)
+    scores['recency'] = calculate_recency_score(comment.get('created_utc', 0))
+    
+    # Weighted composite
+    composite = sum(scores[metric] * weights[metric] for metric in weights.keys())
+    
+    return round(composite, 2), scores
+
+def is_valid_comment(comment: Dict) -> bool:
+    """Basic sanity filter: skip deleted, removed and empty comments"""
+    if comment.get('author') == '[deleted]':
+        return False
+    body = (comment.get('body') or '').strip()
+    if not body or body in ('[deleted]', '[removed]'):
+        return False
+    return True
+
+def simplify_comment(comment: Dict, composite: float, breakdowns: Dict) -> Dict:
+    """Output record for a scored comment"""
+    created_date = datetime.fromtimestamp(comment.get('created_utc', 0))
+    days_old = (datetime.now() - created_date).days
+    
+    return {
+        'body': comment.get('body'),
+        'url': f"https://reddit.com{comment.get('permalink')}",
+        'score': comment.get('score'),
+        'num_replies': comment.get('num_replies'),
+        'depth': comment.get('depth'),
+        'created_date': created_date.strftime('%Y-%m-%d'),
+        'days_old': days_old,
+        'author': comment.get('author'),
+        'composite_score': composite,
+        'score_breakdown': breakdowns,
+    }
+
+def filter_comments(comments: List[Dict], weights: Dict) -> tuple:
+    """Statistical filtering of a flattened comment tree using percentile ranking"""
+    
+    # Basic sanity filter first
+    basic_filtered = [comment for comment in comments if is_valid_comment(comment)]
+    get_metrics().record_items('reddit.comments.valid', len(comments), len(basic_filtered))
+    
+    if not basic_filtered:
+        return [], {}
+    
+    all_data = {
+        'all_scores': [c.get('score', 0) for c in basic_filtered],
+        'all_replies': [c.get('num_replies', 0) for c in basic_filtered],
+    }
+    
+    # Sort each metric column once so every rank lookup is a binary search
+    rank_data = {key: SortedColumn(values) for key, values in all_data.items()}
+    
+    scored_comments = []
+    for comment in basic_filtered:
+        composite, breakdowns = calculate_comment_score(comment, rank_data, weights)
+        scored_comments.append(simplify_comment(comment, composite, breakdowns))
+    
+    cutoff_percentile = determine_cutoff_percentile(len(basic_filtered))
+    filtered = [c for c in scored_comments if c['composite_score'] >= cutoff_percentile]
+    get_metrics().record_items('reddit.comments.cutoff', len(basic_filtered), len(filtered))
+    filtered.sort(key=lambda x: x['composite_score'], reverse=True)
+    
+    return filtered, all_data
+
+def filter_posts_streaming(posts: Iterable[Dict], weights: Dict, out: TextIO, cutoff_rule: Optional[Callable[[int], float]] = None) -> Dict:
+    """Bounded-memory filter_posts: kept posts are written to `out` as JSONL
+
+    Posts are projected to their scored fields as they arrive and buffered
+    column-wise, ranked on the columns, and only survivors are read back.
+    Produces the same records, scores and order as filter_posts.
+    """
+    buffer = ColumnBuffer(['score', 'num_comments', 'upvote_ratio', 'created_utc'])
+    original_count = 0
+    for post in posts:
+        original_count += 1
+        if is_valid_post(post):
+            buffer.append(project_post(post))
+    
+    scores = buffer.column('score')
+    comments = buffer.column('num_comments')
+    ratios = buffer.column('upvote_ratio')
+    created = buffer.column('created_utc')
+    rank_data = {'all_scores': SortedColumn(scores), 'all_comments': SortedColumn(comments)}
+    
+    # Composite for every post, computed from the columns alone
+    composites = array('d')
+    for i in range(len(buffer)):
+        metrics = {'score': scores[i], 'num_comments': comments[i], 'upvote_ratio': ratios[i], 'created_utc': created[i]}
+        composites.append(calculate_composite_score(metrics, rank_data, weights)[0])
+    
+    cutoff_percentile = (cutoff_rule or determine_cutoff_percentile)(len(buffer))
+    kept = [i for i in range(len(buffer)) if composites[i] >= cutoff_percentile]
+    get_metrics().record_items('reddit.valid', original_count, len(buffer))
+    get_metrics().record_items('reddit.cutoff', len(buffer), len(kept))
+    kept.sort(key=lambda i: composites[i], reverse=True)
+    
+    for post in buffer.records(kept):
+        composite, breakdowns = calculate_composite_score(post, rank_data, weights)
+        out.write(json.dumps(simplify_post(post, composite, breakdowns)) + '\n')
+    
+    # The columns hold floats; counts go back to ints so the statistics match filter_posts
+    all_scores = [int(value) for value in scores]
+    all_comments = [int(value) for value in comments]
+    summary = {
+        'original_count': original_count,
+        'filtered_count': len(kept),
+        'cutoff_percentile_used': cutoff_percentile,
+        'statistics': {
+            'score_median': statistics.median(all_scores) if all_scores else 0,
+            'score_p75': percentile(all_scores, 75) if all_scores else 0,
+            'comments_median': statistics.median(all_comments) if all_comments else 0,
+        },
+    }
+    buffer.close()
+    return summary
+
+def filter_posts_sketch(posts: Iterable[Dict], weights: Dict, out: TextIO, error: float = DEFAULT_ERROR, warmup: int = DEFAULT_WARMUP, cutoff_rule: Optional[Callable[[int], float]] = None, exact_path: Optional[str] = None) -> Dict:
+    """Constant-memory approximate filter: each post is scored and written to `out` as it arrives
+
+    Score and comment percentiles come from quantile sketches of every valid
+    post seen so far, and the cutoff follows the running collection size.
+    The first `warmup` valid posts are held back until the sketches have
+    that many values. Kept posts are in arrival order, not score order.
+    With exact_path, valid posts are also spilled to disk and the exact
+    filter_posts_streaming result is written there when the stream ends.
+    """
+    sketches = {'all_scores': QuantileSketch.for_error(error), 'all_comments': QuantileSketch.for_error(error)}
+    cutoff_rule = cutoff_rule or determine_cutoff_percentile
+    exact = ColumnBuffer([]) if exact_path else None
+    held = []
+    original_count = 0
+    valid_count = 0
+    kept_count = 0
+    
+    def emit(post: Dict):
+        nonlocal kept_count
+        composite, breakdowns = calculate_composite_score(post, sketches, weights)
+        if composite >= cutoff_rule(valid_count):
+            out.write(json.dumps(simplify_post(post, composite, breakdowns)) + '\n')
+            out.flush()
+            kept_count += 1
+    
+    for post in posts:
+        original_count += 1
+        if not is_valid_post(post):
+            continue
+        post = project_post(post)
+        valid_count += 1
+        sketches['all_scores'].update(post.get('score', 0))
+        sketches['all_comments'].update(post.get('num_comments', 0))
+        if exact is not None:
+            exact.append(post)
+        if held is None:
+            emit(post)
+            continue
+        held.append(post)
+        if len(held) >= warmup:
+            for held_post in held:
+                emit(held_post)
+            held = None
+    for held_post in held or []:
+        emit(held_post)
+    
+    get_metrics().record_items('reddit.valid', original_count, valid_count)
+    get_metrics().record_items('reddit.cutoff', valid_count, kept_count)
+    summary = {
+        'original_count': original_count,
+        'filtered_count': kept_count,
+        'cutoff_percentile_used': cutoff_rule(valid_count),
+        'statistics': {
+            'score_median': sketches['all_scores'].percentile(50),
+            'score_p75': sketches['all_scores'].percentile(75),
+            'comments_median': sketches['all_comments'].percentile(50),
+        },
+    }
+    if exact is not None:
+        with open(exact_path, 'w') as f:
+            summary['exact'] = filter_posts_streaming(exact.records(range(len(exact))), weights, f, cutoff_rule)
+        exact.close()
+    return summary
+
+def write_streaming_output(posts: Iterable[Dict], args, source: str, weights: Dict = REDDIT_WEIGHTS, cutoff_rule: Optional[Callable[[int], float]] = None) -> None:
+    """Rank with filter_posts_streaming, writing kept posts as JSONL plus a .meta.json summary"""
+    print(f"\n🔍 Streaming percentile-based ranking to {args.output}...")
+    try:
+        with open(args.output, 'w') as f:
+            if args.ranking == 'sketch':
+                summary = filter_posts_sketch(posts, weights, f, args.sketch_error, args.sketch_warmup, cutoff_rule, args.exact_output)
+            else:
+                summary = filter_posts_streaming(posts, weights, f, cutoff_rule=cutoff_rule)
+    except http_client.FetchError as e:
+        print(f"Error fetching posts: {e}")
+        sys.exit(1)
+    
+    original_count = summary['original_count']
+    filtered_count = summary['filtered_count']
+    meta = {
+        'original_count': original_count,
+        'filtered_count': filtered_count,
+        'reduction': f"{((original_count - filtered_count) / original_count * 100):.1f}%" if original_count > 0 else "0%",
+        'platform': 'reddit',
+        'source': source,
+        'filtering_method': 'statistical_percentile',
+        'cutoff_percentile_used': summary['cutoff_percentile_used'],
+        'weights_used': weights,
+        'statistics': summary['statistics'],
+        'format': 'jsonl',
+        'resources_file': args.output,
+    }
+    if args.ranking == 'sketch':
+        meta['filtering_method'] = 'streaming_sketch_percentile'
+        meta['sketch_error'] = args.sketch_error
+        if 'exact' in summary:
+            meta['exact'] = dict(summary['exact'], resources_file=args.exact_output)
+    with open(f'{args.output}.meta.json', 'w') as f:
+        json.dump(meta, f, indent=2)
+    
+    print(f"\n✅ Filtering complete!")
+    print(f"📊 Original: {original_count} posts")
+    print(f"📊 Filtered: {filtered_count} posts ({meta['reduction']} reduction)")
+    print(f"📊 Cutoff: {summary['cutoff_percentile_used']}th percentile")
+    print(f"💾 Output saved to: {args.output} (summary: {args.output}.meta.json)")
+    if 'exact' in summary:
+        print(f"🎯 Exact pass: {summary['exact']['filtered_count']} posts at the {summary['exact']['cutoff_percentile_used']}th percentile, saved to {args.exact_output}")
+
+def curate_comments(args) -> None:
+    """Comment mode: fetch a post's full comment tree and rank the comments"""
+    print(f"📊 Fetching comment tree from URL...")
+    metrics = get_metrics()
+    metrics.begin('fetch')
+    try:
+        post, comments = fetch_comment_tree(args.url, args.max_comments, args.workers)
+    except http_client.FetchError as e:
+        print(f"Error fetching comments: {e}")
+        sys.exit(1)
+    
+    print(f"✅ Found {len(comments)} comments on \"{(post.get('title') or '')[:60]}\"")
+    
+    if len(comments) == 0:
+        print("⚠️  No comments found.")
+        sys.exit(0)
+    
+    print(f"\n🔍 Filtering using percentile-based ranking...")
+    metrics.begin('ranking')
+    with profiled(args.profile):
+        filtered, all_data = filter_comments(comments, COMMENT_WEIGHTS)
+    cutoff_used = determine_cutoff_percentile(len(all_data.get('all_scores', [])))
+    
+    metrics.begin('output')
+    output = {
+        'original_count': len(comments),
+        'filtered_count': len(filtered),
+        'reduction': f"{((len(comments) - len(filtered)) / len(comments) * 100):.1f}%",
+        'platform': 'reddit',
+        'content_type': 'comments',
+        'source': args.url,
+        'post': {
+            'title': post.get('title'),
+            'score': post.get('score'),
+            'num_comments': post.get('num_comments'),
+            'subreddit': post.get('subreddit'),
+        },
+        'filtering_method': 'statistical_percentile',
+        'cutoff_percentile_used': cutoff_used,
+        'weights_used': COMMENT_WEIGHTS,
+        'statistics': {
+            'score_median': statistics.median(all_data['all_scores']) if all_data.get('all_scores') else 0,
+            'score_p75': percentile(all_data['all_scores'], 75) if all_data.get('all_scores') else 0,
+            'max_depth': max(c.get('depth') or 0 for c in comments),
+        },
+        'resources': filtered[:500],
+        'next_steps': 'Review filtered list, or request Phase 2 for deep analysis'
+    }
+    
+    with open(args.output, 'w') as f:
+        json.dump(output, f, indent=2)
+    if args.history:
+        metrics.begin('history')
+        record_output(args.history, output, filtered, len(all_data.get('all_scores', [])))
+    metrics.finish()
+    
+    print(f"\n✅ Filtering complete!")
+    print(f"📊 Original: {len(comments)} comments")
+    print(f"📊 Filtered: {len(filtered)} comments ({output['reduction']} reduction)")
+    print(f"📊 Cutoff: {cutoff_used}th percentile")
+    print(f"💾 Output saved to: {args.output}")
+    
+    if len(filtered) > 0:
+        print(f"\n🏆 Top 5 comments by composite score:")
+        for i, comment in enumerate(filtered[:5], 1):
+            print(f"{i}. {(comment['body'] or '')[:60]!r}")
+            print(f"   Score: {comment['composite_score']:.1f}/100 | Upvotes: {comment['score']} | Replies: {comment['num_replies']}")
+
+def selected_listings(args) -> Optional[List[str]]:
+    """Listings to harvest concurrently, or None to page top.json alone (raises ValueError on a bad --listings)"""
+    if args.listings:
+        listings = [spec.strip() for spec in args.listings.split(',') if spec.strip()]
+        for spec in listings:
+            parse_listing_spec(spec)
+        return listings
+    # Past one listing's cap, top.json alone would silently return fewer posts than asked for
+    if args.limit > LISTING_CAP:
+        return list(HARVEST_LISTINGS)
+    return None
+
+def fetch_posts(args) -> Iterable[Dict]:
+    """Fetch the posts selected by the CLI options (lazily for jsonl subreddit runs), exiting on errors"""
+    metrics = get_metrics()
+    listings = selected_listings(args)
     
     # Determine what we're fetching
+    metrics.begin('fetch')
     if args.url:
         print(f"📊 Fetching Reddit data from URL...")
-        data = fetch_reddit_data(args.url)
+        try:
+            data = fetch_reddit_data(args.url)
+        except http_client.FetchError as e:
+            print(f"Error fetching Reddit data: {e}")
+            sys.exit(1)
         if isinstance(data, list) and len(data) > 0:
             posts = [child['data'] for child in data[0]['data']['children']]
         else:
             posts = []
+    elif args.subreddit and args.format == 'jsonl' and not args.save_snapshot:
+        print(f"📊 Streaming posts from r/{args.subreddit}...")
+        if listings:
+            print(f"🌾 Harvesting {len(listings)} listings concurrently: {', '.join(listings)}")
+            posts = iter_harvested_posts(args.subreddit, args.limit, listings)
+        else:
+            posts = iter_subreddit_posts(args.subreddit, args.limit)
     elif args.subreddit:
         print(f"📊 Fetching posts from r/{args.subreddit}...")
-        posts = parse_subreddit_posts(args.subreddit, args.limit)
+        checkpoint = CrawlCheckpoint(args.resume_file or f'{args.output}.resume.json',
+                                     f"reddit:{args.subreddit}:{','.join(listings or ['all'])}:{args.limit}")
+        if checkpoint.resumed:
+            print(f"♻️  Resuming crawl from {checkpoint.path} ({len(checkpoint.state.get('posts', []))} posts already fetched)")
+        try:
+            if listings:
+                print(f"🌾 Harvesting {len(listings)} listings concurrently: {', '.join(listings)}")
+                posts = harvest_subreddit_posts(args.subreddit, args.limit, listings, checkpoint)
+                print(f"   {len(posts)} distinct posts after merging by ID")
+            else:
+                posts = parse_subreddit_posts(args.subreddit, args.limit, checkpoint=checkpoint)
+        except http_client.FetchError as e:
+            print(f"Error fetching posts: {e}")
+            print(f"💾 Progress saved to {checkpoint.path} - rerun the same command to resume")
+            sys.exit(1)
+        checkpoint.clear()
     else:
         print("Error: Must provide either --url or --subreddit")
         sys.exit(1)
     
+    return posts
+
+def main():
+    parser = argparse.ArgumentParser(description='Filter Reddit posts using statistical percentiles')
+    parser.add_argument('--subreddit', help='Subreddit name (without r/)')
+    parser.add_argument('--url', help='Reddit post or subreddit URL')
+    parser.add_argument('--limit', type=int, default=1000, help='Maximum posts to fetch')
+    parser.add_argument('--output', default='filtered_reddit.json', help='Output file path')
+    parser.add_argument('--format', choices=['json', 'jsonl'], default='json',
+                        help='json: one document with the top 500; jsonl: stream every kept post, one per line (bounded memory)')
+    parser.add_argument('--resume-file', help='Checkpoint for resuming an interrupted subreddit crawl (default: OUTPUT.resume.json)')
+    parser.add_argument('--comments', action='store_true', help='Rank the comments of the post at --url instead of posts')
+    parser.add_argument('--max-comments', type=int, help='Stop expanding collapsed comments after this many (default: whole thread)')
+    parser.add_argument('--workers', type=int, default=4, help='Concurrent morechildren requests in comment mode')
+    parser.add_argument('--listings', help=f'Comma-separated listings to harvest concurrently and merge by post ID, e.g. "top:all,top:year,new,hot" '
+                                           f'(default: top:all, or {",".join(HARVEST_LISTINGS)} when --limit is above {LISTING_CAP})')
+    add_cache_arguments(parser)
+    add_snapshot_arguments(parser)
+    add_sketch_arguments(parser)
+    add_dedup_arguments(parser)
+    add_history_arguments(parser)
+    add_metrics_arguments(parser)
+    
+    args = parser.parse_args()
+    if args.ranking == 'sketch' and args.format != 'jsonl':
+        parser.error('--ranking sketch emits posts as they arrive and needs --format jsonl')
+    if args.dedup != 'none' and args.format == 'jsonl':
+        parser.error('--dedup compares whole collections and needs --format json')
+    if args.history and args.format == 'jsonl':
+        parser.error('--history records whole runs and needs --format json')
+    if args.save_columns and args.format == 'jsonl':
+        parser.error('--save-columns writes whole runs and needs --format json')
+    try:
+        listings = selected_listings(args)
+        weights = apply_weight_overrides(REDDIT_WEIGHTS, args.weight)
+        cutoff_rule = cutoff_function(args, determine_cutoff_percentile)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    write_on_exit(args.metrics)
+    metrics = get_metrics()
+    
+    if args.comments:
+        if not args.url:
+            print("Error: --comments requires --url pointing at a post")
+            sys.exit(1)
+        if args.from_snapshot or args.save_snapshot or args.save_columns:
+            print("Error: snapshots are only supported for post ranking, not --comments")
+            sys.exit(1)
+        try:
+            http_client.configure_cache_from_args(args)
+        except (OSError, ValueError) as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        curate_comments(args)
+        return
+    
+    if args.from_snapshot:
+        try:
+            snapshot = load_snapshot(args.from_snapshot, 'reddit')
+        except (OSError, ValueError) as e:
+            print(f"Error loading snapshot: {e}")
+            sys.exit(1)
+        source, posts = snapshot['source'], snapshot['items']
+        print(f"📦 Re-ranking snapshot of {source} ({len(posts)} posts, fetched {snapshot['fetched_at']})")
+    else:
+        if listings:
+            http_client.configure(pool_size=len(listings))
+        try:
+            http_client.configure_cache_from_args(args)
+        except (OSError, ValueError) as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        source = args.url or f"r/{args.subreddit}"
+        posts = fetch_posts(args)
+        if args.save_snapshot:
+            save_snapshot(args.save_snapshot, 'reddit', source, [project_post(p) for p in posts])
+            print(f"💾 Snapshot saved to {args.save_snapshot}")
+    
+    if args.format == 'jsonl':
+        # Subreddit pages are fetched lazily here, so this stage also covers fetching
+        metrics.begin('ranking')
+        with profiled(args.profile):
+            write_streaming_output(posts, args, source, weights, cutoff_rule)
+        metrics.finish()
+        return
+    
     print(f"✅ Found {len(posts)} posts")
     
     if len(posts) == 0:
@@ -239,22 +1007,36 @@ def main():
     print(f"   Scores: median={statistics.median(all_scores):.0f}, p75={percentile(all_scores, 75):.0f}, p90={percentile(all_scores, 90):.0f}")
     print(f"   Comments: median={statistics.median(all_comments):.0f}, p75={percentile(all_comments, 75):.0f}")
     
+    # Collapse crossposts/reposts so each cluster is ranked once
+    ranked = posts
+    deduplication = None
+    if args.dedup != 'none':
+        print(f"\n🧬 Collapsing duplicates ({args.dedup})...")
+        metrics.begin('dedup')
+        ranked = dedup_posts(posts, args.dedup == 'near', args.dedup_threshold)
+        metrics.record_items('reddit.dedup', len(posts), len(ranked))
+        deduplication = {'mode': args.dedup, 'clusters': sum(1 for p in ranked if p.get('cluster_size')), 'removed': len(posts) - len(ranked)}
+        print(f"   {deduplication['removed']} duplicates collapsed into {deduplication['clusters']} clusters")
+    
     # Filter posts
     print(f"\n🔍 Filtering using percentile-based ranking...")
-    filtered, all_data = filter_posts(posts, REDDIT_WEIGHTS)
+    metrics.begin('ranking')
+    with profiled(args.profile):
+        filtered, all_data = filter_posts(ranked, weights, cutoff_rule=cutoff_rule)
     
-    cutoff_used = determine_cutoff_percentile(len(posts))
+    cutoff_used = cutoff_rule(len(ranked))
     
     # Prepare output
+    metrics.begin('output')
     output = {
         'original_count': len(posts),
         'filtered_count': len(filtered),
         'reduction': f"{((len(posts) - len(filtered)) / len(posts) * 100):.1f}%" if len(posts) > 0 else "0%",
         'platform': 'reddit',
-        'source': args.url or f"r/{args.subreddit}",
+        'source': source,
         'filtering_method': 'statistical_percentile',
         'cutoff_percentile_used': cutoff_used,
-        'weights_used': REDDIT_WEIGHTS,
+        'weights_used': weights,
         'statistics': {
             'score_median': statistics.median(all_data['all_scores']) if all_data.get('all_scores') else 0,
             'score_p75': percentile(all_data['all_scores'], 75) if all_data.get('all_scores') else 0,
@@ -263,16 +1045,26 @@ def main():
         'resources': filtered[:500],
         'next_steps': 'Review filtered list, or request Phase 2 for deep analysis'
     }
+    if deduplication:
+        output['deduplication'] = deduplication
     
     # Save to file
     with open(args.output, 'w') as f:
         json.dump(output, f, indent=2)
+    if args.history:
+        metrics.begin('history')
+        record_output(args.history, output, filtered, len(all_data.get('all_scores', [])))
+    if args.save_columns:
+        save_columns(args.save_columns, 'reddit', source, filtered, cutoff_percentile_used=cutoff_used, weights_used=weights)
+    metrics.finish()
     
     print(f"\n✅ Filtering complete!")
     print(f"📊 Original: {len(posts)} posts")
     print(f"📊 Filtered: {len(filtered)} posts ({output['reduction']} reduction)")
     print(f"📊 Cutoff: {cutoff_used}th percentile")
     print(f"💾 Output saved to: {args.output}")
+    if args.save_columns:
+        print(f"💾 Kept items saved as columns to: {args.save_columns}")
     
     if len(filtered) > 0:
         print(f"\n🏆 Top 5 posts by composite score:")
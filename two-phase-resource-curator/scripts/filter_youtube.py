@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+"""
+YouTube Playlist/Channel Statistical Filter
+Filters using percentile-based ranking (no hard thresholds).
+Adapts to any channel size - a 40-video tutorial series or a 5000-video channel.
+"""
+
+import sys
+import os
+import re
+import json
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import List, Dict, Iterator, Optional
+from urllib.parse import urlparse, parse_qs
+import statistics
+
+import http_client
+from history_store import add_history_arguments, record_output
+from metrics import get_metrics, add_metrics_arguments, write_on_exit, profiled
+from ranking import SortedColumn, percentile, percentile_rank
+
+# Data API base URL (override with --api-url or this variable to point at a local stub)
+YOUTUBE_API_URL = os.environ.get('YOUTUBE_API_URL', 'https://www.googleapis.com/youtube/v3').rstrip('/')
+
+# Platform-specific metric weights for YouTube
+YOUTUBE_WEIGHTS = {
+    'recency': 0.40,     # Tutorials go stale as tools change
+    'views': 0.30,       # Reach within this collection
+    'engagement': 0.30,  # (likes + comments) per view - quality beyond reach
+}
+
+# playlistItems.list and videos.list both cap at 50 per request
+PAGE_SIZE = 50
+
+def youtube_api_key(api_key: Optional[str] = None) -> Optional[str]:
+    """API key from the argument or the YOUTUBE_API_KEY environment variable"""
+    return api_key or os.environ.get('YOUTUBE_API_KEY')
+
+def api_get(endpoint: str, params: Dict, api_key: Optional[str] = None) -> Dict:
+    """Call one Data API endpoint, raising FetchError with the API's message on errors"""
+    params = dict(params)
+    key = youtube_api_key(api_key)
+    if key:
+        params['key'] = key
+    response = http_client.get(f'{YOUTUBE_API_URL}/{endpoint}', params=params)
+    
+    if response.status_code != 200:
+        try:
+            message = response.json()['error']['message']
+        except (ValueError, KeyError, TypeError):
+            message = response.text[:200]
+        raise http_client.FetchError(f"YouTube API error: {response.status_code} - {message}")
+    
+    return response.json()
+
+def parse_youtube_url(url: str) -> Dict:
+    """Extract a playlist ID, channel ID or @handle from a YouTube URL"""
+    parsed = urlparse(url)
+    query = parse_qs(parsed.query)
+    if 'list' in query:
+        return {'playlist': query['list'][0]}
+    
+    match = re.match(r'^/(channel/(?P<channel>UC[\w-]+)|(?P<handle>@[\w.-]+))', parsed.path)
+    if match and match.group('channel'):
+        return {'channel': match.group('channel')}
+    if match and match.group('handle'):
+        return {'handle': match.group('handle')}
+    raise ValueError(f"Unsupported YouTube URL (expected a playlist or channel): {url}")
+
+def get_uploads_playlist(channel: Optional[str] = None, handle: Optional[str] = None, api_key: Optional[str] = None) -> Dict:
+    """Resolve a channel (ID or @handle) to its metadata and uploads playlist"""
+    params = {'part': 'snippet,contentDetails,statistics'}
+    if channel:
+        params['id'] = channel
+    else:
+        params['forHandle'] = handle
+    
+    items = api_get('channels', params, api_key).get('items', [])
+    if not items:
+        raise http_client.FetchError(f"Channel not found: {channel or handle}")
+    
+    item = items[0]
+    return {
+        'channel_id': item['id'],
+        'title': item.get('snippet', {}).get('title'),
+        'subscribers': int(item.get('statistics', {}).get('subscriberCount', 0) or 0),
+        'playlist': item['contentDetails']['relatedPlaylists']['uploads'],
+    }
+
+def iter_playlist_video_ids(playlist_id: str, limit: int, api_key: Optional[str] = None) -> Iterator[List[str]]:
+    """Yield pages of up to 50 video IDs from a playlist (page tokens force this to be sequential)"""
+    page_token = None
+    count = 0
+    
+    while count < limit:
+        params = {'part': 'contentDetails', 'playlistId': playlist_id, 'maxResults': PAGE_SIZE}
+        if page_token:
+            params['pageToken'] = page_token
+    
+        data = api_get('playlistItems', params, api_key)
+        ids = [item['contentDetails']['videoId'] for item in data.get('items', [])][:limit - count]
+        count += len(ids)
+        if ids:
+            yield ids
+    
+        page_token = data.get('nextPageToken')
+        if not page_token:
+            return
+
+def fetch_video_details(video_ids: List[str], api_key: Optional[str] = None) -> List[Dict]:
+    """Statistics and snippets for up to 50 videos in one videos.list request"""
+    params = {'part': 'snippet,statistics,contentDetails', 'id': ','.join(video_ids), 'maxResults': PAGE_SIZE}
+    return [project_video(item) for item in api_get('videos', params, api_key).get('items', [])]
+
+def project_video(item: Dict) -> Dict:
+    """Keep only the fields used for filtering, scoring and output"""
+    snippet = item.get('snippet', {})
+    stats = item.get('statistics', {})
+    return {
+        'id': item['id'],
+        'title': snippet.get('title'),
+        'channel': snippet.get('channelTitle'),
+        'published_at': snippet.get('publishedAt'),
+        'duration': item.get('contentDetails', {}).get('duration'),
+        'live': snippet.get('liveBroadcastContent', 'none') != 'none',
+        # likeCount/commentCount are absent when hidden or disabled
+        'views': int(stats['viewCount']) if 'viewCount' in stats else None,
+        'likes': int(stats.get('likeCount', 0)),
+        'comments': int(stats.get('commentCount', 0)),
+    }
+
+def fetch_playlist_videos(playlist_id: str, limit: int = 1000, api_key: Optional[str] = None, workers: int = 4) -> List[Dict]:
+    """Fetch video metadata for a playlist
+
+    Each playlist page is handed to a videos.list request as soon as it
+    arrives, so statistics are fetched in parallel with the remaining
+    pages. N videos cost about 2 * N / 50 requests.
+    """
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as pool:
+        batches = [pool.submit(fetch_video_details, ids, api_key)
+                   for ids in iter_playlist_video_ids(playlist_id, limit, api_key)]
+        # Results keep playlist order
+        return [video for batch in batches for video in batch.result()]
+
+def calculate_recency_score(published_at: str) -> float:
+    """Calculate recency score (0-100) based on age"""
+    published = datetime.fromisoformat(published_at.replace('Z', '+00:00'))
+    days_old = (datetime.now(timezone.utc) - published).days
+    
+    if days_old <= 30:
+        return 100
+    elif days_old <= 90:
+        return 85
+    elif days_old <= 180:
+        return 70
+    elif days_old <= 365:
+        return 50
+    elif days_old <= 730:
+        return 25
+    else:
+        return max(0, 25 - (days_old - 730) / 365 * 10)
+
+def engagement_rate(video: Dict) -> float:
+    """(likes + comments) per view"""
+    views = video.get('views') or 0
+    return (video.get('likes', 0) + video.get('comments', 0)) / views if views else 0.0
+
+def calculate_composite_score(video: Dict, all_data: Dict, weights: Dict) -> tuple:
+    """Calculate composite percentile score"""
+    scores = {}
+    
+    # Views percentile
+    scores['views'] = percentile_rank(video.get('views', 0), all_data['all_views'])
+    
+    # Engagement percentile (rate, so small and large videos compare fairly)
+    scores['engagement'] = percentile_rank(engagement_rate(video), all_data['all_engagement'])
+    
+    # Recency score (absolute)
+    scores['recency'] = calculate_recency_score(video.get('published_at') or '2005-04-23T00:00:00Z')
+    
+    # Weighted composite
+    composite = sum(scores[metric] * weights[metric] for metric in weights.keys())
+    
+    return round(composite, 2), scores
+
+def determine_cutoff_percentile(collection_size: int) -> int:
+    """Determine cutoff based on collection size"""
+    if collection_size <= 100:
+        return 50
+    elif collection_size <= 500:
+        return 60
+    elif collection_size <= 1000:
+        return 70
+    elif collection_size <= 3000:
+        return 80
+    else:
+        return 85
+
+def is_valid_video(video: Dict) -> bool:
+    """Basic sanity filter: skip videos without public stats, live/upcoming streams and unwatched videos"""
+    if video.get('views') is None:
+        return False
+    if video.get('live'):
+        return False
+    if video['views'] < 1:
+        return False
+    return True
+
+def simplify_video(video: Dict, composite: float, breakdowns: Dict) -> Dict:
+    """Output record for a scored video"""
+    published = datetime.fromisoformat((video.get('published_at') or '2005-04-23T00:00:00Z').replace('Z', '+00:00'))
+    
+    return {
+        'title': video.get('title'),
+        'url': f"https://www.youtube.com/watch?v={video['id']}",
+        'views': video.get('views'),
+        'likes': video.get('likes'),
+        'comments': video.get('comments'),
+        'engagement_rate': round(engagement_rate(video), 5),
+        'duration': video.get('duration'),
+        'published_date': published.strftime('%Y-%m-%d'),
+        'days_old': (datetime.now(timezone.utc) - published).days,
+        'channel': video.get('channel'),
+        'composite_score': composite,
+        'score_breakdown': breakdowns,
+    }
+
+def filter_videos(videos: List[Dict], weights: Dict) -> tuple:
+    """Statistical filtering using percentile ranking"""
+    
+    # Basic sanity filter first
+    basic_filtered = [video for video in videos if is_valid_video(video)]
+    get_metrics().record_items('youtube.valid', len(videos), len(basic_filtered))
+    
+    if not basic_filtered:
+        return [], {}
+    
+    # Collect metrics for statistical analysis
+    all_data = {
+        'all_views': [v['views'] for v in basic_filtered],
+        'all_engagement': [engagement_rate(v) for v in basic_filtered],
+    }
+    
+    # Sort each metric column once so every rank lookup is a binary search
+    rank_data = {key: SortedColumn(values) for key, values in all_data.items()}
+    
+    # Calculate composite scores
+    scored_videos = []
+    for video in basic_filtered:
+        composite, breakdowns = calculate_composite_score(video, rank_data, weights)
+        scored_videos.append(simplify_video(video, composite, breakdowns))
+    
+    # Determine cutoff
+    cutoff_percentile = determine_cutoff_percentile(len(basic_filtered))
+    
+    # Filter by cutoff
+    filtered = [v for v in scored_videos if v['composite_score'] >= cutoff_percentile]
+    get_metrics().record_items('youtube.cutoff', len(basic_filtered), len(filtered))
+    
+    # Sort by composite score descending
+    filtered.sort(key=lambda x: x['composite_score'], reverse=True)
+    
+    return filtered, all_data
+
+def main():
+    global YOUTUBE_API_URL
+    
+    parser = argparse.ArgumentParser(description='Filter YouTube playlists/channels using statistical percentiles')
+    parser.add_argument('--url', help='YouTube playlist or channel URL (…?list=ID, /channel/UC…, /@handle)')
+    parser.add_argument('--playlist', help='Playlist ID')
+    parser.add_argument('--channel', help='Channel ID (UC…) or @handle; its uploads playlist is filtered')
+    parser.add_argument('--api-key', help='YouTube Data API key (default: YOUTUBE_API_KEY environment variable)')
+    parser.add_argument('--api-url', help=f'Data API base URL (default: {YOUTUBE_API_URL})')
+    parser.add_argument('--limit', type=int, default=1000, help='Maximum videos to fetch')
+    parser.add_argument('--workers', type=int, default=4, help='Concurrent videos.list requests')
+    parser.add_argument('--output', default='filtered_youtube.json', help='Output file path')
+    http_client.add_cache_arguments(parser)
+    add_history_arguments(parser)
+    add_metrics_arguments(parser)
+    
+    args = parser.parse_args()
+    http_client.configure(pool_size=max(args.workers + 1, 2))
+    try:
+        http_client.configure_cache_from_args(args)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    write_on_exit(args.metrics)
+    metrics = get_metrics()
+    if args.api_url:
+        YOUTUBE_API_URL = args.api_url.rstrip('/')
+    
+    # Work out which playlist to read
+    try:
+        target = parse_youtube_url(args.url) if args.url else {}
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    if args.playlist:
+        target = {'playlist': args.playlist}
+    elif args.channel:
+        target = {'handle': args.channel} if args.channel.startswith('@') else {'channel': args.channel}
+    if not target:
+        print("Error: Must provide --url, --playlist or --channel")
+        sys.exit(1)
+    
+    metrics.begin('fetch')
+    channel = None
+    try:
+        if 'playlist' in target:
+            playlist_id = target['playlist']
+        else:
+            print(f"📊 Resolving channel {target.get('channel') or target.get('handle')}...")
+            channel = get_uploads_playlist(target.get('channel'), target.get('handle'), args.api_key)
+            playlist_id = channel['playlist']
+            print(f"📺 Channel: {channel['title']} ({channel['subscribers']} subscribers)")
+    
+        print(f"📊 Fetching videos from playlist {playlist_id}...")
+        videos = fetch_playlist_videos(playlist_id, args.limit, args.api_key, args.workers)
+    except http_client.FetchError as e:
+        print(f"Error fetching videos: {e}")
+        sys.exit(1)
+    
+    print(f"✅ Found {len(videos)} videos")
+    
+    if len(videos) == 0:
+        print("⚠️  No videos found.")
+        sys.exit(0)
+    
+    # Calculate statistics
+    print(f"\n📈 Calculating statistical metrics...")
+    all_views = [v['views'] or 0 for v in videos]
+    print(f"   Views: median={statistics.median(all_views):.0f}, p75={percentile(all_views, 75):.0f}, p90={percentile(all_views, 90):.0f}")
+    
+    # Filter videos
+    print(f"\n🔍 Filtering using percentile-based ranking...")
+    metrics.begin('ranking')
+    with profiled(args.profile):
+        filtered, all_data = filter_videos(videos, YOUTUBE_WEIGHTS)
+    
+    cutoff_used = determine_cutoff_percentile(len(all_data.get('all_views', [])))
+    
+    # Prepare output
+    metrics.begin('output')
+    output = {
+        'original_count': len(videos),
+        'filtered_count': len(filtered),
+        'reduction': f"{((len(videos) - len(filtered)) / len(videos) * 100):.1f}%" if len(videos) > 0 else "0%",
+        'platform': 'youtube',
+        'source': args.url or playlist_id,
+        'playlist_id': playlist_id,
+        'channel': channel,
+        'filtering_method': 'statistical_percentile',
+        'cutoff_percentile_used': cutoff_used,
+        'weights_used': YOUTUBE_WEIGHTS,
+        'statistics': {
+            'views_median': statistics.median(all_data['all_views']) if all_data.get('all_views') else 0,
+            'views_p75': percentile(all_data['all_views'], 75) if all_data.get('all_views') else 0,
+            'engagement_median': round(statistics.median(all_data['all_engagement']), 5) if all_data.get('all_engagement') else 0,
+        },
+        'resources': filtered[:500],
+        'next_steps': 'Review filtered list, or request Phase 2 for deep analysis'
+    }
+    
+    # Save to file
+    with open(args.output, 'w') as f:
+        json.dump(output, f, indent=2)
+    if args.history:
+        metrics.begin('history')
+        record_output(args.history, output, filtered, len(all_data.get('all_views', [])))
+    metrics.finish()
+    
+    print(f"\n✅ Filtering complete!")
+    print(f"📊 Original: {len(videos)} videos")
+    print(f"📊 Filtered: {len(filtered)} videos ({output['reduction']} reduction)")
+    print(f"📊 Cutoff: {cutoff_used}th percentile")
+    print(f"💾 Output saved to: {args.output}")
+    
+    if len(filtered) > 0:
+        print(f"\n🏆 Top 5 videos by composite score:")
+        for i, video in enumerate(filtered[:5], 1):
+            print(f"{i}. {video['title'][:60]}...")
+            print(f"   Score: {video['composite_score']:.1f}/100 | Views: {video['views']} | Engagement: {video['engagement_rate']:.2%}")
+
+if __name__ == '__main__':
+    main()
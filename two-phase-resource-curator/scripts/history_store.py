@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Curation History Store
+--history DB appends every run to an indexed SQLite database: the run's
+target, time, cutoff and weights, plus every kept item with its rank,
+composite score and score breakdown (not just the 500 written to the
+output file). Questions across runs ("which files stayed in the top 15%
+of this repo for a month") become indexed lookups instead of reparsing a
+pile of output files. The query CLI answers the common ones.
+
+Usage:
+    python scripts/history_store.py history.db runs [--target owner/repo]
+    python scripts/history_store.py history.db top --target owner/repo [-n 20] [--run ID]
+    python scripts/history_store.py history.db trend --target owner/repo --item path/to/file.json
+    python scripts/history_store.py history.db stable --target owner/repo --top 15 --days 30
+"""
+
+import sys
+import json
+import sqlite3
+import argparse
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from metrics import redacted_command
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    run_at TEXT NOT NULL,
+    platform TEXT NOT NULL,
+    target TEXT NOT NULL,
+    original_count INTEGER,
+    scored_count INTEGER,
+    filtered_count INTEGER,
+    cutoff REAL,
+    weights TEXT,
+    command TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_target_time ON runs (target, run_at);
+CREATE INDEX IF NOT EXISTS runs_time ON runs (run_at);
+
+CREATE TABLE IF NOT EXISTS items (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    rank INTEGER NOT NULL,
+    item_id TEXT NOT NULL,
+    title TEXT,
+    url TEXT,
+    composite_score REAL NOT NULL,
+    breakdown TEXT,
+    PRIMARY KEY (run_id, rank)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS items_item ON items (item_id, run_id);
+"""
+
+def item_id(item: Dict) -> str:
+    """Stable identity of a kept item across runs: repository path for files, URL for posts and videos"""
+    return item.get('path') or item.get('url') or str(item.get('id'))
+
+def utc_now() -> str:
+    """Run timestamp; a fixed ISO format so text comparison is time order"""
+    return datetime.now(timezone.utc).isoformat(timespec='seconds')
+
+class HistoryStore:
+    """One history database (created on first use)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.db = sqlite3.connect(path, timeout=30)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute('PRAGMA journal_mode=WAL')  # Queries never block a run that is recording
+        self.db.execute('PRAGMA foreign_keys=ON')
+        self.db.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.db.close()
+
+    def record_run(self, platform: str, target: str, items: List[Dict], cutoff: float, weights: Dict,
+                   original_count: int, scored_count: Optional[int] = None, run_at: Optional[str] = None) -> int:
+        """Append one run and all its kept items (already sorted best first); returns the run id"""
+        with self.db:
+            cursor = self.db.execute(
+                'INSERT INTO runs (run_at, platform, target, original_count, scored_count, filtered_count, cutoff, weights, command) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (run_at or utc_now(), platform, target, original_count, scored_count, len(items), cutoff,
+                 json.dumps(weights), ' '.join(redacted_command())))
+            run_id = cursor.lastrowid
+            self.db.executemany(
+                'INSERT INTO items (run_id, rank, item_id, title, url, composite_score, breakdown) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                ((run_id, rank, item_id(item), item.get('title') or item.get('name'), item.get('html_url') or item.get('url'),
+                  item['composite_score'], json.dumps(item.get('score_breakdown')))
+                 for rank, item in enumerate(items, 1)))
+        return run_id
+
+    def runs(self, target: Optional[str] = None, limit: int = 20) -> List[Dict]:
+        """Most recent runs first"""
+        where, params = ('WHERE target = ?', [target]) if target else ('', [])
+        rows = self.db.execute(
+            f'SELECT id, run_at, platform, target, original_count, scored_count, filtered_count, cutoff FROM runs {where} '
+            'ORDER BY run_at DESC, id DESC LIMIT ?', params + [limit])
+        return [dict(row) for row in rows]
+
+    def latest_run(self, target: str) -> Optional[int]:
+        row = self.db.execute('SELECT id FROM runs WHERE target = ? ORDER BY run_at DESC, id DESC LIMIT 1', (target,)).fetchone()
+        return row['id'] if row else None
+
+    def top(self, run_id: int, n: int = 10) -> List[Dict]:
+        """The n best items of one run"""
+        rows = self.db.execute(
+            'SELECT rank, item_id, title, url, composite_score, breakdown FROM items WHERE run_id = ? AND rank <= ? ORDER BY rank',
+            (run_id, n))
+        return [dict(row, breakdown=json.loads(row['breakdown'] or 'null')) for row in rows]
+
+    def trend(self, target: str, item: str) -> List[Dict]:
+        """One item's rank and score in every run of its target (rank None: below the cutoff that run)"""
+        rows = self.db.execute(
+            'SELECT r.id AS run_id, r.run_at, r.scored_count, i.rank, i.composite_score FROM runs r '
+            'LEFT JOIN items i ON i.run_id = r.id AND i.item_id = ? '
+            'WHERE r.target = ? ORDER BY r.run_at, r.id', (item, target))
+        return [dict(row) for row in rows]
+
+    def stable(self, target: str, top_pct: float, since: str) -> tuple:
+        """Items ranked in the top top_pct% of every run of target since the given time
+
+        Returns (run_count, items). A run's top share is measured against
+        all items it scored, so only items that also passed that run's
+        cutoff can qualify.
+        """
+        run_count = self.db.execute('SELECT COUNT(*) FROM runs WHERE target = ? AND run_at >= ?', (target, since)).fetchone()[0]
+        if run_count == 0:
+            return 0, []
+        rows = self.db.execute(
+            'WITH span AS (SELECT id, COALESCE(scored_count, filtered_count) AS scored FROM runs WHERE target = ? AND run_at >= ?) '
+            'SELECT i.item_id, MAX(i.title) AS title, MAX(i.url) AS url, COUNT(*) AS runs, '
+            'MIN(i.rank) AS best_rank, MAX(i.rank) AS worst_rank, AVG(i.composite_score) AS mean_score '
+            'FROM span s JOIN items i ON i.run_id = s.id AND i.rank <= s.scored * ? / 100.0 '
+            'GROUP BY i.item_id HAVING COUNT(*) = ? ORDER BY mean_score DESC',
+            (target, since, top_pct, run_count))
+        return run_count, [dict(row) for row in rows]
+
+def record_output(path: str, output: Dict, items: List[Dict], scored_count: Optional[int] = None) -> Optional[int]:
+    """Append a filter script's run: its output document's summary plus every kept item
+
+    The output file is already written by then, so a database error is
+    reported as a warning rather than failing the run.
+    """
+    target = output.get('repository') or output['source']
+    try:
+        with HistoryStore(path) as store:
+            run_id = store.record_run(output['platform'], target, items, output['cutoff_percentile_used'],
+                                      output['weights_used'], output['original_count'], scored_count)
+    except sqlite3.Error as e:
+        print(f"⚠️  History not recorded in {path}: {e}")
+        return None
+    print(f"🗃️  Run {run_id} of {target} recorded in {path} ({len(items)} items)")
+    return run_id
+
+def add_history_arguments(parser):
+    """Add the --history option to a filter CLI"""
+    parser.add_argument('--history', metavar='DB',
+                        help='Also append this run (every kept item, scores, cutoff, weights) to a SQLite history store; query it with history_store.py')
+
+def print_rows(rows: List[Dict], columns: List[tuple]):
+    """Fixed-width table of the given (key, heading, width) columns"""
+    print('  '.join(heading.ljust(width) for _, heading, width in columns).rstrip())
+    for row in rows:
+        cells = []
+        for key, _, width in columns:
+            value = row.get(key)
+            text = '—' if value is None else f'{value:.1f}' if isinstance(value, float) else str(value)
+            cells.append(text[:width].ljust(width))
+        print('  '.join(cells).rstrip())
+
+def main():
+    parser = argparse.ArgumentParser(description='Query the curation history store written by --history')
+    parser.add_argument('db', help='History database path')
+    parser.add_argument('--json', action='store_true', help='Print JSON instead of a table')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    runs = commands.add_parser('runs', help='List recorded runs, newest first')
+    runs.add_argument('--target', help='Only runs of this target (owner/repo, r/subreddit, ...)')
+    runs.add_argument('--limit', type=int, default=20, help='Runs to list (default: 20)')
+
+    top = commands.add_parser('top', help="Top items of a target's latest run (or of --run)")
+    top.add_argument('--target', help='Target whose latest run is shown')
+    top.add_argument('--run', type=int, help='Run id (see the runs command)')
+    top.add_argument('-n', type=int, default=10, help='Items to show (default: 10)')
+
+    trend = commands.add_parser('trend', help="One item's rank and score across every run of its target")
+    trend.add_argument('--target', required=True, help='Target the item belongs to')
+    trend.add_argument('--item', required=True, help='File path (GitHub) or URL (Reddit, YouTube)')
+
+    stable = commands.add_parser('stable', help='Items that stayed in the top share of every run in a time window')
+    stable.add_argument('--target', required=True, help='Target to analyse')
+    stable.add_argument('--top', type=float, default=15, help='Top share of scored items, in percent (default: 15)')
+    stable.add_argument('--days', type=float, default=30, help='Window length in days, ending now (default: 30)')
+
+    args = parser.parse_args()
+    try:
+        store = HistoryStore(args.db)
+    except sqlite3.Error as e:
+        print(f"Error opening {args.db}: {e}")
+        sys.exit(1)
+
+    with store:
+        if args.command == 'runs':
+            result = store.runs(args.target, args.limit)
+            if not args.json:
+                print(f"🗃️  {len(result)} runs")
+                print_rows(result, [('id', 'ID', 6), ('run_at', 'RUN AT', 25), ('platform', 'PLATFORM', 8), ('target', 'TARGET', 30),
+                                    ('original_count', 'ITEMS', 7), ('filtered_count', 'KEPT', 6), ('cutoff', 'CUTOFF', 6)])
+        elif args.command == 'top':
+            if args.run is None and not args.target:
+                parser.error('top needs --target or --run')
+            run_id = args.run if args.run is not None else store.latest_run(args.target)
+            if run_id is None:
+                print(f"⚠️  No runs recorded for {args.target}")
+                sys.exit(1)
+            result = store.top(run_id, args.n)
+            if not args.json:
+                print(f"🏆 Top {len(result)} items of run {run_id}")
+                print_rows(result, [('rank', 'RANK', 5), ('composite_score', 'SCORE', 6), ('item_id', 'ITEM', 70)])
+        elif args.command == 'trend':
+            result = store.trend(args.target, args.item)
+            if not args.json:
+                print(f"📈 {args.item} in {len(result)} runs of {args.target} (— = below the cutoff)")
+                print_rows(result, [('run_id', 'RUN', 6), ('run_at', 'RUN AT', 25), ('rank', 'RANK', 6),
+                                    ('scored_count', 'OF', 7), ('composite_score', 'SCORE', 6)])
+        else:
+            since = (datetime.now(timezone.utc) - timedelta(days=args.days)).isoformat(timespec='seconds')
+            run_count, result = store.stable(args.target, args.top, since)
+            if not args.json:
+                print(f"📌 {len(result)} items in the top {args.top:g}% of all {run_count} runs of {args.target} in the last {args.days:g} days")
+                print_rows(result, [('best_rank', 'BEST', 5), ('worst_rank', 'WORST', 5), ('mean_score', 'SCORE', 6), ('item_id', 'ITEM', 70)])
+        if args.json:
+            print(json.dumps(result, indent=2))
+
+if __name__ == '__main__':
+    main()
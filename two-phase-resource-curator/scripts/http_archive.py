@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+HTTP Record / Replay
+--record DIR captures every response the filters receive (including those
+served from the response cache) into a gzip-compressed JSON Lines archive.
+--replay DIR serves them back in the recorded order with no network access,
+so a bad curation can be debugged, and a change profiled or compared, on
+identical inputs. Replayed responses arrive instantly, after a fixed
+--replay-latency, or after the latency measured while recording.
+"""
+
+import os
+import gzip
+import json
+import time
+import base64
+import hashlib
+import threading
+from collections import defaultdict, deque
+from datetime import datetime, timezone
+from typing import Dict, Mapping, Optional, Union
+from urllib.parse import urlencode
+
+from metrics import redacted_command
+
+ARCHIVE_FORMAT = 'two-phase-curator-http-archive'
+ARCHIVE_VERSION = 1
+RESPONSES_FILE = 'responses.jsonl.gz'
+MANIFEST_FILE = 'manifest.json'
+
+# Credentials passed as query parameters (YouTube's API key) stay out of the archive
+SECRET_PARAMS = {'key', 'access_token', 'client_secret'}
+
+# Bodies are stored decoded, and hop-by-hop or session headers mean nothing on replay
+DROPPED_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding', 'connection', 'set-cookie'}
+
+def request_key(url: str, params: Optional[Dict] = None, headers: Optional[Mapping] = None, body: Optional[str] = None) -> str:
+    """Replay key: URL, sorted params, the Accept header and a hash of any POST body (never credentials)"""
+    key = url
+    query = sorted((str(k), str(v)) for k, v in (params or {}).items() if k not in SECRET_PARAMS)
+    if query:
+        key += '?' + urlencode(query)
+    accept = (headers or {}).get('Accept')
+    if accept:
+        key += ' ' + accept
+    if body is not None:
+        key += ' #' + hashlib.sha256(body.encode()).hexdigest()[:16]
+    return key
+
+def parse_latency(value: str) -> Union[float, str]:
+    """--replay-latency value: seconds per request, or 'recorded'"""
+    if value == 'recorded':
+        return value
+    try:
+        seconds = float(value)
+    except ValueError:
+        raise ValueError(f"Invalid --replay-latency '{value}' (expected seconds or 'recorded')")
+    if seconds < 0:
+        raise ValueError("--replay-latency cannot be negative")
+    return seconds
+
+class HttpArchive:
+    """One recording directory, open for either recording or replaying"""
+
+    def __init__(self, directory: str, mode: str, latency: Union[float, str, None] = None):
+        if mode not in ('record', 'replay'):
+            raise ValueError(f"Unknown archive mode '{mode}'")
+        self.directory = directory
+        self.mode = mode
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.count = 0
+        self.stream = None
+        self.entries = defaultdict(deque)
+        if mode == 'record':
+            os.makedirs(directory, exist_ok=True)
+            self.stream = gzip.open(os.path.join(directory, RESPONSES_FILE), 'wt', encoding='utf-8')
+            self._write_manifest(None)  # Rewritten with the count on close; an interrupted recording stays replayable
+        else:
+            self._load()
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == 'replay'
+
+    def _load(self):
+        with open(os.path.join(self.directory, MANIFEST_FILE)) as f:
+            manifest = json.load(f)
+        if manifest.get('format') != ARCHIVE_FORMAT:
+            raise ValueError(f"{self.directory} is not a curator HTTP archive")
+        with gzip.open(os.path.join(self.directory, RESPONSES_FILE), 'rt', encoding='utf-8') as f:
+            try:
+                for line in f:
+                    entry = json.loads(line)
+                    self.entries[entry['key']].append(entry)
+                    self.count += 1
+            except (EOFError, json.JSONDecodeError):
+                pass  # A recording cut off mid-write still replays everything before the cut
+
+    def record(self, url: str, params: Optional[Dict], headers: Optional[Mapping], status: int,
+               response_headers: Mapping, body: bytes, elapsed: float = 0.0, request_body: Optional[str] = None):
+        """Append one response"""
+        entry = {
+            'key': request_key(url, params, headers, request_body),
+            'url': url,
+            'status': status,
+            'headers': {k: v for k, v in response_headers.items() if k.lower() not in DROPPED_HEADERS},
+            'elapsed': round(elapsed, 4),
+        }
+        try:
+            entry['text'] = body.decode('utf-8')
+        except UnicodeDecodeError:
+            entry['base64'] = base64.b64encode(body).decode('ascii')
+        line = json.dumps(entry, separators=(',', ':')) + '\n'
+        with self.lock:
+            self.stream.write(line)
+            self.count += 1
+
+    def replay(self, url: str, params: Optional[Dict] = None, headers: Optional[Mapping] = None, request_body: Optional[str] = None) -> Dict:
+        """The next recorded response for this request, as {status, headers, body, url}
+
+        Repeats of one request are served in recorded order; once they run
+        out the last one is served again. Raises KeyError for a request
+        that was never recorded.
+        """
+        key = request_key(url, params, headers, request_body)
+        with self.lock:
+            queue = self.entries.get(key)
+            if not queue:
+                raise KeyError(key)
+            entry = queue.popleft() if len(queue) > 1 else queue[0]
+        delay = entry.get('elapsed', 0.0) if self.latency == 'recorded' else (self.latency or 0.0)
+        if delay > 0:
+            time.sleep(delay)
+        body = entry['text'].encode('utf-8') if 'text' in entry else base64.b64decode(entry['base64'])
+        return {'status': entry['status'], 'headers': entry['headers'], 'body': body, 'url': entry['url']}
+
+    def close(self):
+        """Finish a recording: flush the archive and write the manifest"""
+        with self.lock:
+            if self.stream is None:
+                return
+            self.stream.close()
+            self.stream = None
+            self._write_manifest(self.count)
+
+    def _write_manifest(self, responses: Optional[int]):
+        manifest = {
+            'format': ARCHIVE_FORMAT,
+            'version': ARCHIVE_VERSION,
+            'recorded_at': datetime.now(timezone.utc).isoformat(),
+            'command': redacted_command(),
+            'responses': responses,
+        }
+        with open(os.path.join(self.directory, MANIFEST_FILE), 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+def add_archive_arguments(parser):
+    """Add --record / --replay / --replay-latency options"""
+    parser.add_argument('--record', metavar='DIR', help='Record every HTTP response into DIR for later --replay')
+    parser.add_argument('--replay', metavar='DIR', help='Serve HTTP responses from a --record archive instead of the network')
+    parser.add_argument('--replay-latency', default='0', help="Replay: seconds to wait per response, or 'recorded' for the measured latency (default: 0)")
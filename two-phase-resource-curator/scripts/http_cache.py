@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Persistent HTTP Response Cache
+SQLite-backed cache for GET responses, keyed by URL + params + Accept + auth scope.
+Fresh entries (younger than the TTL) are served without touching the network;
+stale entries are revalidated with If-None-Match / If-Modified-Since, so an
+unchanged resource costs a 304 (which GitHub doesn't count against the rate limit).
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Dict, Mapping, Optional
+
+from http_archive import add_archive_arguments
+
+DEFAULT_CACHE_DIR = os.path.join(
+    os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'), 'two-phase-curator'
+)
+DEFAULT_TTL = 3600                     # Serve without revalidating for 1 hour
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024  # LRU-evict beyond 512 MB of stored bodies
+
+class ResponseCache:
+    """ETag/Last-Modified aware response cache with TTL and size-based LRU eviction"""
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, ttl: float = DEFAULT_TTL, max_bytes: int = DEFAULT_MAX_BYTES):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, 'http_cache.sqlite3')
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                status INTEGER NOT NULL,
+                headers TEXT NOT NULL,
+                body BLOB NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                stored_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                size INTEGER NOT NULL
+            )
+        ''')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses (accessed_at)')
+        self.conn.commit()
+        self.total_bytes = self.conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        with self.lock:
+            self._evict()
+            self.conn.commit()
+
+    @staticmethod
+    def make_key(url: str, params: Optional[Dict] = None, headers: Optional[Dict] = None) -> str:
+        """Cache key from URL, sorted params, the Accept header and a hash of the credentials (never the raw token)"""
+        auth = (headers or {}).get('Authorization', '')
+        scope = hashlib.sha256(auth.encode()).hexdigest()[:16] if auth else 'anonymous'
+        query = json.dumps(sorted((str(k), str(v)) for k, v in (params or {}).items()))
+        key = f'{url}\n{query}\n{scope}'
+        accept = (headers or {}).get('Accept')
+        if accept:
+            # Same URL, different representation (e.g. GitHub's raw vs JSON media types)
+            key += f'\n{accept}'
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    def lookup(self, key: str, ttl: Optional[float] = None) -> Optional[Dict]:
+        """Return the stored entry for key (fresh or stale), or None; ttl overrides the cache's TTL"""
+        with self.lock:
+            row = self.conn.execute(
+                'SELECT url, status, headers, body, etag, last_modified, stored_at FROM responses WHERE key = ?',
+                (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self.conn.execute('UPDATE responses SET accessed_at = ? WHERE key = ?', (time.time(), key))
+            self.conn.commit()
+
+        url, status, headers, body, etag, last_modified, stored_at = row
+        return {
+            'url': url,
+            'status': status,
+            'headers': json.loads(headers),
+            'body': zlib.decompress(body),
+            'etag': etag,
+            'last_modified': last_modified,
+            'fresh': time.time() - stored_at < (self.ttl if ttl is None else ttl),
+            'revalidatable': bool(etag or last_modified),
+        }
+
+    def conditional_headers(self, entry: Optional[Dict]) -> Dict:
+        """Validators to send with a revalidation request"""
+        headers = {}
+        if entry:
+            if entry['etag']:
+                headers['If-None-Match'] = entry['etag']
+            if entry['last_modified']:
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def store(self, key: str, url: str, status: int, headers: Mapping, body: bytes):
+        """Insert or replace an entry, then evict least-recently-used entries over the size cap"""
+        compressed = zlib.compress(body)
+        now = time.time()
+        with self.lock:
+            old = self.conn.execute('SELECT size FROM responses WHERE key = ?', (key,)).fetchone()
+            self.conn.execute(
+                'INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (key, url, status, json.dumps(dict(headers)), compressed,
+                 headers.get('ETag'), headers.get('Last-Modified'),
+                 now, now, len(compressed))
+            )
+            self.total_bytes += len(compressed) - (old[0] if old else 0)
+            self._evict()
+            self.conn.commit()
+
+    def refresh(self, key: str):
+        """Mark an entry fresh again after a 304 Not Modified"""
+        now = time.time()
+        with self.lock:
+            self.conn.execute('UPDATE responses SET stored_at = ?, accessed_at = ? WHERE key = ?', (now, now, key))
+            self.conn.commit()
+
+    def _evict(self):
+        """Drop least-recently-used entries until the cache fits in max_bytes (lock held)"""
+        while self.total_bytes > self.max_bytes:
+            rows = self.conn.execute(
+                'SELECT key, size FROM responses ORDER BY accessed_at LIMIT 64'
+            ).fetchall()
+            if not rows:
+                self.total_bytes = 0
+                break
+            for key, size in rows:
+                self.conn.execute('DELETE FROM responses WHERE key = ?', (key,))
+                self.total_bytes -= size
+                if self.total_bytes <= self.max_bytes:
+                    break
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+def add_cache_arguments(parser):
+    """Add --cache-dir / --cache-ttl / --no-cache (and --record / --replay) options to a filter CLI"""
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help=f'HTTP response cache directory (default: {DEFAULT_CACHE_DIR})')
+    parser.add_argument('--cache-ttl', type=float, default=DEFAULT_TTL, help='Seconds a cached response is served without revalidation')
+    parser.add_argument('--no-cache', action='store_true', help='Disable the persistent HTTP response cache')
+    add_archive_arguments(parser)
@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""
+Shared HTTP Client
+One pooled keep-alive session for every API call, plus an optional global
+request budget shared by all worker threads, rate-limit-aware pacing with
+jittered retries, an optional persistent response cache (see http_cache.py),
+and record/replay of all traffic (see http_archive.py).
+"""
+
+import atexit
+import json
+import random
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from http_cache import ResponseCache, add_cache_arguments  # Re-exported: the cache and --record/--replay options for CLIs importing only http_client
+from http_archive import HttpArchive, parse_latency
+from metrics import get_metrics
+
+DEFAULT_POOL_SIZE = 16
+
+# Retry policy for 429 / rate-limited 403 / 5xx / connection errors
+MAX_RETRIES = 5
+BACKOFF_BASE = 1.0     # Seconds; doubles every attempt (full jitter)
+BACKOFF_CAP = 60.0
+MAX_WAIT = 900.0       # Longest single wait for a rate-limit reset before giving up
+PACE_FRACTION = 0.10   # Start spreading requests once <10% of the limit remains
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Set by abandon_waits(): every pending and future wait gives up at once
+_abandoned = threading.Event()
+
+class FetchError(Exception):
+    """A request kept failing after all retries"""
+
+class RateLimitError(FetchError):
+    """Rate limit exhausted and the reset is too far away to wait for"""
+
+    def __init__(self, message: str, retry_at: Optional[float] = None):
+        super().__init__(message)
+        self.retry_at = retry_at
+
+class RateLimitTracker:
+    """Per-host view of X-RateLimit-* / Retry-After headers, used to pace requests"""
+
+    def __init__(self):
+        self.hosts = {}
+        self.lock = threading.Lock()
+
+    def update(self, host: str, response: requests.Response):
+        """Record the rate-limit headers of a response"""
+        headers = response.headers
+        now = time.time()
+        with self.lock:
+            state = self.hosts.setdefault(host, {'remaining': None, 'limit': None, 'reset': 0.0, 'blocked_until': 0.0})
+            if headers.get('X-RateLimit-Remaining') is not None:
+                state['remaining'] = float(headers['X-RateLimit-Remaining'])
+            if headers.get('X-RateLimit-Limit') is not None:
+                state['limit'] = float(headers['X-RateLimit-Limit'])
+            elif state['remaining'] is not None and state['limit'] is None:
+                # Reddit sends used + remaining instead of a limit
+                state['limit'] = state['remaining'] + float(headers.get('X-RateLimit-Used') or 0)
+            if headers.get('X-RateLimit-Reset') is not None:
+                reset = float(headers['X-RateLimit-Reset'])
+                # GitHub sends an epoch timestamp, Reddit sends seconds until reset
+                state['reset'] = reset if reset > 1e9 else now + reset
+            retry_after = retry_after_seconds(response)
+            if retry_after is not None:
+                state['blocked_until'] = max(state['blocked_until'], now + retry_after)
+
+    def reserve(self, host: str) -> float:
+        """Claim one request slot; returns how long to wait before sending it"""
+        now = time.time()
+        with self.lock:
+            state = self.hosts.get(host)
+            if state is None:
+                return 0.0
+            if state['blocked_until'] > now:
+                return state['blocked_until'] - now
+            remaining = state['remaining']
+            if remaining is None or state['reset'] <= now:
+                return 0.0
+            state['remaining'] = remaining - 1
+            if remaining <= 0:
+                return state['reset'] - now
+            limit = state['limit'] or remaining
+            if remaining <= max(1.0, limit * PACE_FRACTION):
+                # Spread what is left evenly over the rest of the window
+                return (state['reset'] - now) / remaining
+            return 0.0
+
+def retry_after_seconds(response: requests.Response) -> Optional[float]:
+    """Parse a numeric Retry-After header"""
+    value = response.headers.get('Retry-After')
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+def is_rate_limited(response: requests.Response) -> bool:
+    """429, or a 403 that GitHub uses for primary/secondary rate limits"""
+    if response.status_code == 429:
+        return True
+    if response.status_code == 403:
+        return response.headers.get('X-RateLimit-Remaining') == '0' or 'Retry-After' in response.headers
+    return False
+
+def backoff_delay(attempt: int) -> float:
+    """Exponential backoff with full jitter"""
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+class RateBudget:
+    """Global requests-per-second budget shared across threads"""
+
+    def __init__(self, rate: Optional[float] = None):
+        self.interval = 1.0 / rate if rate else 0.0
+        self.next_slot = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until the next request slot is available"""
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            get_metrics().record_wait('budget', slot - now)
+            if _abandoned.wait(slot - now):
+                raise FetchError("Request abandoned")
+
+_session = None
+_session_lock = threading.Lock()
+_budget = RateBudget()
+_pool_size = DEFAULT_POOL_SIZE
+_cache = None
+_limits = RateLimitTracker()
+_archive = None
+
+def configure(pool_size: Optional[int] = None, rate: Optional[float] = None):
+    """Set connection pool size and global request rate (requests/second)"""
+    global _session, _budget, _pool_size
+    with _session_lock:
+        if pool_size and pool_size != _pool_size:
+            _pool_size = pool_size
+            if _session is not None:
+                _session.close()
+            _session = None
+        _budget = RateBudget(rate)
+
+def get_session() -> requests.Session:
+    """Return the shared keep-alive session (created on first use)"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=_pool_size, pool_maxsize=_pool_size)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _session = session
+        return _session
+
+def enable_cache(cache_dir: str, ttl: Optional[float] = None, max_bytes: Optional[int] = None):
+    """Route GET requests through a persistent response cache"""
+    global _cache
+    options = {}
+    if ttl is not None:
+        options['ttl'] = ttl
+    if max_bytes is not None:
+        options['max_bytes'] = max_bytes
+    _cache = ResponseCache(cache_dir, **options)
+
+def disable_cache():
+    """Stop caching responses"""
+    global _cache
+    if _cache is not None:
+        _cache.close()
+    _cache = None
+
+def enable_archive(directory: str, mode: str, latency=None):
+    """Record every response into directory, or replay them from it ('record' / 'replay')"""
+    global _archive
+    disable_archive()
+    _archive = HttpArchive(directory, mode, latency)
+    atexit.register(_archive.close)
+
+def disable_archive():
+    """Stop recording or replaying (finishing a recording)"""
+    global _archive
+    if _archive is not None:
+        _archive.close()
+    _archive = None
+
+def cached_response(entry: Dict) -> requests.Response:
+    """Rebuild a requests.Response from a cache or archive entry"""
+    response = requests.Response()
+    response.status_code = entry['status']
+    response.headers = CaseInsensitiveDict(entry['headers'])
+    response._content = entry['body']
+    response.url = entry['url']
+    response.encoding = 'utf-8'
+    return response
+
+def wait(delay: float, url: str, reason: str = 'rate_limit'):
+    """Sleep for a rate-limit or backoff delay, or give up if it is too long"""
+    if delay > MAX_WAIT:
+        raise RateLimitError(f"Rate limited on {url}; retry in {delay:.0f}s", retry_at=time.time() + delay)
+    if delay > 0:
+        get_metrics().record_wait(reason, delay)
+        if _abandoned.wait(delay):
+            raise FetchError(f"Gave up waiting to request {url}")
+
+def abandon_waits():
+    """Make threads sleeping in a rate-limit, backoff or budget wait give up now
+
+    For a run that has already failed: its worker threads would otherwise
+    keep the process alive for up to MAX_WAIT before it can exit.
+    """
+    _abandoned.set()
+
+def replayed_response(archive: HttpArchive, url: str, headers: Optional[Dict], params: Optional[Dict], body: Optional[str] = None) -> requests.Response:
+    """Serve a request from the replay archive; never touches the network"""
+    try:
+        entry = archive.replay(url, params, headers, body)
+    except KeyError:
+        raise FetchError(f"{url} was not recorded in {archive.directory}")
+    get_metrics().record_cache('replayed')
+    return cached_response(entry)
+
+def record(archive: Optional[HttpArchive], url: str, headers: Optional[Dict], params: Optional[Dict], response: requests.Response,
+           body: Optional[str] = None) -> requests.Response:
+    """Append a response to the recording, if one is running"""
+    if archive is not None:
+        archive.record(url, params, headers, response.status_code, response.headers, response.content, response.elapsed.total_seconds(), body)
+    return response
+
+def send(url: str, headers: Optional[Dict] = None, params: Optional[Dict] = None) -> requests.Response:
+    """Send one GET with rate-limit pacing and jittered retries (no response cache)"""
+    archive = _archive
+    if archive is not None and archive.replaying:
+        return replayed_response(archive, url, headers, params)
+    return record(archive, url, headers, params, _send(url, headers, params))
+
+def post(url: str, payload: Dict, headers: Optional[Dict] = None) -> requests.Response:
+    """POST a JSON payload (GraphQL) with the same pacing, retries and record/replay as send; never cached"""
+    body = json.dumps(payload, sort_keys=True, separators=(',', ':'))
+    archive = _archive
+    if archive is not None and archive.replaying:
+        return replayed_response(archive, url, headers, None, body)
+    return record(archive, url, headers, None, _send(url, dict(headers or {}, **{'Content-Type': 'application/json'}), body=body), body)
+
+def rate_limit_bucket(url: str) -> str:
+    """Rate-limit pacing key: the host, with GraphQL kept apart (GitHub budgets it separately)"""
+    parts = urlparse(url)
+    return parts.netloc + '/graphql' if parts.path.endswith('/graphql') else parts.netloc
+
+def _send(url: str, headers: Optional[Dict] = None, params: Optional[Dict] = None, body: Optional[str] = None) -> requests.Response:
+    host = rate_limit_bucket(url)
+    metrics = get_metrics()
+    for attempt in range(MAX_RETRIES + 1):
+        if attempt:
+            metrics.record_retry()
+        wait(_limits.reserve(host), url)
+        _budget.acquire()
+        try:
+            response = get_session().request('GET' if body is None else 'POST', url, headers=headers, params=params, data=body)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            if attempt == MAX_RETRIES:
+                raise FetchError(f"Request to {url} failed: {e}") from e
+            wait(backoff_delay(attempt), url, 'backoff')
+            continue
+
+        metrics.record_response(response.status_code, len(response.content))
+        _limits.update(host, response)
+        rate_limited = is_rate_limited(response)
+        if not rate_limited and response.status_code not in RETRY_STATUSES:
+            return response
+        if attempt == MAX_RETRIES:
+            break
+
+        delay = backoff_delay(attempt)
+        if rate_limited:
+            delay = max(delay, _limits.reserve(host))
+        wait(delay, url, 'rate_limit' if rate_limited else 'backoff')
+
+    if rate_limited:
+        raise RateLimitError(f"Rate limited on {url} after {MAX_RETRIES} retries")
+    raise FetchError(f"{url} kept failing: {response.status_code}")
+
+def get(url: str, headers: Optional[Dict] = None, params: Optional[Dict] = None, max_age: Optional[float] = None) -> requests.Response:
+    """GET through the shared session, respecting rate limits, the request budget and cache
+
+    max_age overrides the cache TTL for this request; 0 never serves a cached
+    copy without revalidating it (for listings that change by the minute).
+    """
+    archive = _archive
+    if archive is not None and archive.replaying:
+        return replayed_response(archive, url, headers, params)
+    return record(archive, url, headers, params, _get(url, headers, params, max_age))
+
+def _get(url: str, headers: Optional[Dict] = None, params: Optional[Dict] = None, max_age: Optional[float] = None) -> requests.Response:
+    cache = _cache
+    if cache is None:
+        return _send(url, headers, params)
+
+    key = cache.make_key(url, params, headers)
+    entry = cache.lookup(key, max_age)
+    if entry and entry['fresh']:
+        get_metrics().record_cache('fresh')
+        return cached_response(entry)
+
+    # Stale or missing: revalidate when we hold validators, else refetch
+    request_headers = dict(headers or {})
+    if entry and entry['revalidatable']:
+        request_headers.update(cache.conditional_headers(entry))
+
+    response = _send(url, request_headers, params)
+
+    if response.status_code == 304 and entry:
+        get_metrics().record_cache('revalidated')
+        cache.refresh(key)
+        return cached_response(entry)
+
+    if response.status_code == 200:
+        get_metrics().record_cache('miss')
+        cache.store(key, url, response.status_code, response.headers, response.content)
+    else:
+        get_metrics().record_cache('uncacheable')
+
+    return response
+
+def configure_cache_from_args(args):
+    """Enable or disable the response cache and record/replay from parsed CLI options
+
+    Raises ValueError for conflicting or invalid options, OSError for an unreadable archive.
+    """
+    if args.record and args.replay:
+        raise ValueError("--record and --replay cannot be combined")
+    if args.no_cache or args.replay:
+        disable_cache()
+    else:
+        enable_cache(args.cache_dir, ttl=args.cache_ttl)
+    if args.record:
+        enable_archive(args.record, 'record')
+    elif args.replay:
+        enable_archive(args.replay, 'replay', parse_latency(args.replay_latency))
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Run Metrics
+Process-wide instrumentation for a curation run: wall time per stage, HTTP
+request counts, bytes, status codes, cache hits and time spent waiting on
+rate limits, plus item counts before and after each filter. Collection is
+always on (a few counter updates per request); --metrics writes it as JSON.
+"""
+
+import sys
+import json
+import time
+import atexit
+import cProfile
+import pstats
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+# Options whose values are credentials and must not be written to reports
+SECRET_OPTIONS = ('--token', '--api-key')
+
+def redacted_command(argv: Optional[List[str]] = None) -> List[str]:
+    """The command line (default sys.argv) with the values of SECRET_OPTIONS masked
+
+    Covers '--token VALUE', '--token=VALUE' and argparse's abbreviations
+    such as '--tok VALUE'.
+    """
+    argv = sys.argv if argv is None else argv
+    redacted = []
+    mask_next = False
+    for arg in argv:
+        if mask_next:
+            redacted.append('***')
+            mask_next = False
+            continue
+        option, sep, _ = arg.partition('=')
+        if len(option) > 2 and option.startswith('--') and any(secret.startswith(option) for secret in SECRET_OPTIONS):
+            if sep:
+                arg = f'{option}=***'
+            else:
+                mask_next = True
+        redacted.append(arg)
+    return redacted
+
+class RunMetrics:
+    """Thread-safe counters and a lap timer for the stages of one run"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started_at = datetime.now(timezone.utc).isoformat()
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.current = None
+        self.items = {}
+        self.requests = 0
+        self.bytes = 0
+        self.retries = 0
+        self.status_codes = Counter()
+        self.cache = Counter()
+        self.waits = Counter()
+
+    def begin(self, stage: str):
+        """Start timing a stage, ending the previous one"""
+        now = time.perf_counter()
+        with self.lock:
+            self._close(now)
+            self.current = (stage, now)
+
+    def finish(self):
+        """End the current stage"""
+        with self.lock:
+            self._close(time.perf_counter())
+
+    def _close(self, now: float):
+        if self.current is not None:
+            stage, started = self.current
+            self.stages[stage] = self.stages.get(stage, 0.0) + now - started
+            self.current = None
+
+    def record_items(self, name: str, before: int, after: int):
+        """Item counts going into and surviving a filter step"""
+        with self.lock:
+            self.items[name] = {'in': before, 'out': after}
+
+    def record_response(self, status: int, size: int):
+        """One request that went over the network"""
+        with self.lock:
+            self.requests += 1
+            self.bytes += size
+            self.status_codes[status] += 1
+
+    def record_retry(self):
+        with self.lock:
+            self.retries += 1
+
+    def record_cache(self, outcome: str):
+        """Cache outcome: 'fresh' (no request), 'revalidated' (304), 'miss' (fetched and stored), 'uncacheable' or 'replayed' (--replay)"""
+        with self.lock:
+            self.cache[outcome] += 1
+
+    def record_wait(self, reason: str, seconds: float):
+        """Time slept for 'rate_limit', 'backoff' or 'budget' reasons"""
+        if seconds > 0:
+            with self.lock:
+                self.waits[reason] += seconds
+
+    def to_dict(self) -> Dict:
+        now = time.perf_counter()
+        with self.lock:
+            stages = dict(self.stages)
+            if self.current is not None:
+                # Count a still-running stage up to now without ending it
+                stage, started = self.current
+                stages[stage] = stages.get(stage, 0.0) + now - started
+            return {
+                'started_at': self.started_at,
+                'command': redacted_command(),
+                'total_seconds': round(now - self.started, 4),
+                'stages': {stage: round(seconds, 4) for stage, seconds in stages.items()},
+                'items': dict(self.items),
+                'http': {
+                    'requests': self.requests,
+                    'bytes': self.bytes,
+                    'retries': self.retries,
+                    'status_codes': {str(status): count for status, count in sorted(self.status_codes.items())},
+                    'cache': dict(self.cache),
+                    'wait_seconds': {reason: round(seconds, 3) for reason, seconds in self.waits.items()},
+                },
+            }
+
+    def write(self, path: str):
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+_metrics = RunMetrics()
+
+def get_metrics() -> RunMetrics:
+    """The metrics of the current process"""
+    return _metrics
+
+def write_on_exit(path: Optional[str]):
+    """Write the metrics report to path when the process exits (including sys.exit on errors)"""
+    if path:
+        atexit.register(_metrics.write, path)
+
+@contextmanager
+def profiled(path: Optional[str], top: int = 15):
+    """Run the enclosed block under cProfile, dumping stats to path (no-op without a path)"""
+    if not path:
+        yield
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+        print(f"\n⏱️  Profile saved to {path} (top {top} by cumulative time):")
+        pstats.Stats(profiler).sort_stats('cumulative').print_stats(top)
+
+def add_metrics_arguments(parser):
+    """Add --metrics / --profile options to a filter CLI"""
+    parser.add_argument('--metrics', help='Write per-stage timings, HTTP and item counts to this JSON file')
+    parser.add_argument('--profile', help='Profile the ranking stage with cProfile and save the stats to this file')
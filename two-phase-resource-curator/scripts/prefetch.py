@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Phase 2 Content Prefetch
+Downloads the raw contents of Phase 1 survivors concurrently, best-ranked
+first, into a content-addressed store keyed by git blob sha, so Phase 2
+starts with every file local and a blob seen in any earlier run (or any
+other repository) is never downloaded twice. Each resource is annotated
+with its local path and cheap content signals (bytes, lines, language,
+binary).
+
+Usage:
+    python scripts/prefetch.py filtered_github.json [--prefetch-store DIR] [--prefetch-workers 8]
+"""
+
+import os
+import sys
+import json
+import argparse
+import hashlib
+import tempfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, Optional
+
+from http_cache import DEFAULT_CACHE_DIR
+from metrics import get_metrics, add_metrics_arguments, write_on_exit
+from snapshot import lazy_import
+
+http_client = lazy_import('http_client')
+
+DEFAULT_STORE_DIR = os.path.join(DEFAULT_CACHE_DIR, 'blobs')
+DEFAULT_MAX_BYTES = 1024 * 1024  # Phase 2 reads files, not datasets
+
+# Extension -> language, for the file types curated collections are made of
+LANGUAGES = {
+    '.json': 'json', '.py': 'python', '.js': 'javascript', '.mjs': 'javascript', '.ts': 'typescript',
+    '.tsx': 'typescript', '.jsx': 'javascript', '.go': 'go', '.rs': 'rust', '.java': 'java',
+    '.rb': 'ruby', '.php': 'php', '.sh': 'shell', '.bash': 'shell', '.ps1': 'powershell',
+    '.sql': 'sql', '.yml': 'yaml', '.yaml': 'yaml', '.toml': 'toml', '.xml': 'xml',
+    '.html': 'html', '.css': 'css', '.md': 'markdown', '.ipynb': 'notebook', '.c': 'c',
+    '.h': 'c', '.cpp': 'cpp', '.cs': 'csharp', '.kt': 'kotlin', '.swift': 'swift',
+}
+
+class BlobStore:
+    """Content-addressed file store: one file per git blob sha, written atomically
+
+    When a listing's sha does not match the downloaded content (the branch
+    moved, or the file is an LFS pointer), an alias maps the listed sha to
+    the stored one, so the next run finds it without downloading again.
+    """
+
+    def __init__(self, root: str = DEFAULT_STORE_DIR):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, sha: str) -> str:
+        return os.path.join(self.root, sha[:2], sha[2:])
+
+    def has(self, sha: str) -> bool:
+        return os.path.exists(self.path(sha))
+
+    def read(self, sha: str) -> bytes:
+        with open(self.path(sha), 'rb') as f:
+            return f.read()
+
+    def put(self, sha: str, data: bytes) -> str:
+        """Store data under sha (temp file + rename, so readers never see a partial blob)"""
+        return self._write(self.path(sha), data)
+
+    def alias(self, listed_sha: str, sha: str):
+        """Record that content listed as listed_sha is stored under sha"""
+        self._write(os.path.join(self.root, 'aliases', listed_sha), sha.encode())
+
+    def resolve(self, sha: str) -> str:
+        """The sha the content listed as sha is stored under (sha itself unless aliased)"""
+        try:
+            with open(os.path.join(self.root, 'aliases', sha)) as f:
+                return f.read()
+        except FileNotFoundError:
+            return sha
+
+    def _write(self, path: str, data: bytes) -> str:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+        return path
+
+def git_blob_sha(data: bytes) -> str:
+    """The sha git (and the GitHub API) reports for a file with these contents"""
+    return hashlib.sha1(b'blob %d\0' % len(data) + data).hexdigest()
+
+def content_signals(data: bytes, name: str) -> Dict:
+    """Cheap signals Phase 2 can triage on before reading a file"""
+    binary = b'\0' in data[:8192]
+    if not binary:
+        try:
+            data.decode('utf-8')
+        except UnicodeDecodeError:
+            binary = True
+    return {
+        'bytes': len(data),
+        'lines': 0 if binary else data.count(b'\n') + (1 if data and not data.endswith(b'\n') else 0),
+        'language': LANGUAGES.get(os.path.splitext(name.lower())[1]),
+        'binary': binary,
+    }
+
+def prefetch_resource(resource: Dict, store: BlobStore, headers: Optional[Dict] = None, max_bytes: int = DEFAULT_MAX_BYTES) -> Dict:
+    """Make one resource's contents local; returns the annotation for resource['prefetch']"""
+    sha = resource.get('sha')
+    name = resource.get('name') or resource.get('path', '')
+    stored_sha = store.resolve(sha) if sha else None
+    if stored_sha and store.has(stored_sha):
+        annotation = {'status': 'stored', 'local_path': store.path(stored_sha), **content_signals(store.read(stored_sha), name)}
+        if stored_sha != sha:
+            annotation['sha_mismatch'] = stored_sha
+        return annotation
+    if not resource.get('download_url'):
+        return {'status': 'no_url'}
+    if resource.get('size', 0) > max_bytes:
+        return {'status': 'too_large', 'bytes': resource.get('size')}
+
+    try:
+        response = http_client.send(resource['download_url'], headers=headers)
+    except http_client.FetchError as e:
+        return {'status': 'error', 'error': str(e)}
+    if response.status_code != 200:
+        return {'status': 'error', 'error': f"HTTP {response.status_code}"}
+    data = response.content
+    if len(data) > max_bytes:
+        return {'status': 'too_large', 'bytes': len(data)}
+
+    # Key by the real content: a mismatch means the branch moved or the file is an LFS pointer
+    actual_sha = git_blob_sha(data)
+    path = store.put(actual_sha, data)
+    annotation = {'status': 'downloaded', 'local_path': path, **content_signals(data, name)}
+    if sha and actual_sha != sha:
+        store.alias(sha, actual_sha)
+        annotation['sha_mismatch'] = actual_sha
+    return annotation
+
+def prefetch_resources(resources: Iterable[Dict], store: BlobStore, headers: Optional[Dict] = None, workers: int = 8, max_bytes: int = DEFAULT_MAX_BYTES) -> Iterator[Dict]:
+    """Annotate resources with resource['prefetch'], yielding them in input order
+
+    Downloads are submitted in input (rank) order, so the best resources are
+    local first, with at most a few batches in flight at once: memory stays
+    bounded for long JSONL outputs too. Resources sharing a blob sha share
+    one download.
+    """
+    window = max(workers, 1) * 4
+    pending = deque()
+    by_sha = {}
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+        for resource in resources:
+            sha = resource.get('sha')
+            future = by_sha.get(sha) if sha else None
+            if future is None:
+                future = executor.submit(prefetch_resource, resource, store, headers, max_bytes)
+                if sha:
+                    by_sha[sha] = future
+            pending.append((resource, future))
+            if len(pending) >= window:
+                resource, future = pending.popleft()
+                resource['prefetch'] = future.result()
+                yield resource
+        while pending:
+            resource, future = pending.popleft()
+            resource['prefetch'] = future.result()
+            yield resource
+
+def prefetch_output(path: str, store: BlobStore, headers: Optional[Dict] = None, workers: int = 8, max_bytes: int = DEFAULT_MAX_BYTES,
+                    output_format: Optional[str] = None) -> Dict:
+    """Prefetch every resource in a filter output file, rewriting it with annotations
+
+    output_format is 'json' or 'jsonl'; by default it is guessed from the
+    extension (.jsonl or not).
+    """
+    statuses = {}
+
+    def counted(resources: Iterable[Dict]) -> Iterator[Dict]:
+        for resource in prefetch_resources(resources, store, headers, workers, max_bytes):
+            status = resource['prefetch']['status']
+            statuses[status] = statuses.get(status, 0) + 1
+            yield resource
+
+    if (output_format or ('jsonl' if path.endswith('.jsonl') else 'json')) == 'jsonl':
+        directory = os.path.dirname(os.path.abspath(path))
+        with open(path) as src, tempfile.NamedTemporaryFile('w', dir=directory, delete=False) as dst:
+            for resource in counted(json.loads(line) for line in src if line.strip()):
+                dst.write(json.dumps(resource) + '\n')
+        os.replace(dst.name, path)
+    else:
+        with open(path) as f:
+            output = json.load(f)
+        output['resources'] = list(counted(output.get('resources', [])))
+        output['prefetch_store'] = store.root
+        with open(path, 'w') as f:
+            json.dump(output, f, indent=2)
+    return statuses
+
+def run_prefetch(path: str, args, headers: Optional[Dict] = None) -> Dict:
+    """Prefetch an output file using the --prefetch-* options, with progress output"""
+    print(f"\n📥 Prefetching kept files into {args.prefetch_store} ({args.prefetch_workers} workers)...")
+    get_metrics().begin('prefetch')
+    statuses = prefetch_output(path, BlobStore(args.prefetch_store), headers, args.prefetch_workers, args.prefetch_max_bytes, args.format)
+    print("✅ Prefetch complete: " + ', '.join(f"{count} {status}" for status, count in sorted(statuses.items())))
+    return statuses
+
+def add_prefetch_arguments(parser):
+    """Add store / pool / size-cap options for content prefetch"""
+    parser.add_argument('--prefetch-store', default=DEFAULT_STORE_DIR, help=f'Content-addressed blob store (default: {DEFAULT_STORE_DIR})')
+    parser.add_argument('--prefetch-workers', type=int, default=8, help='Concurrent content downloads')
+    parser.add_argument('--prefetch-max-bytes', type=int, default=DEFAULT_MAX_BYTES, help='Skip files larger than this (default: 1 MiB)')
+
+def main():
+    parser = argparse.ArgumentParser(description='Download the contents of Phase 1 survivors for Phase 2 analysis')
+    parser.add_argument('output', help='filter_github.py output (.json or .jsonl), annotated in place')
+    parser.add_argument('--token', help='GitHub API token (for private repositories)')
+    parser.add_argument('--format', choices=['json', 'jsonl'], help='Format of the output file (default: jsonl for .jsonl files, else json)')
+    add_prefetch_arguments(parser)
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+    http_client.configure(pool_size=max(args.prefetch_workers, 1))
+    write_on_exit(args.metrics)
+
+    from filter_github import github_headers  # deferred: filter_github imports this module
+    try:
+        run_prefetch(args.output, args, github_headers(args.token))
+    except json.JSONDecodeError as e:
+        print(f"Error: could not parse {args.output} ({e}); pass --format json or --format jsonl to match the file")
+        sys.exit(1)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    get_metrics().finish()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Shared Percentile Ranking Engine
+Sort-once percentile ranking used by all platform filters.
+Each metric column is sorted once (O(n log n)); every rank lookup is then a
+binary search instead of a full scan of the dataset.
+"""
+
+from bisect import bisect_left, bisect_right
+from typing import List, Sequence, Union
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional (used by dedup when present); ranking itself is pure Python
+    np = None
+
+def percentile(data: List[float], p: int) -> float:
+    """Calculate percentile of dataset"""
+    if not data:
+        return 0
+    sorted_data = sorted(data)
+    index = (len(sorted_data) - 1) * p / 100
+    floor = int(index)
+    ceil = floor + 1
+    if ceil >= len(sorted_data):
+        return sorted_data[-1]
+    return sorted_data[floor] + (sorted_data[ceil] - sorted_data[floor]) * (index - floor)
+
+class SortedColumn:
+    """One metric column, sorted once for O(log n) mid-rank percentile lookups"""
+
+    def __init__(self, values: Sequence[float]):
+        self.sorted_values = sorted(values)
+
+    def __len__(self) -> int:
+        return len(self.sorted_values)
+
+    def rank(self, value: float) -> float:
+        """Percentile (0-100) of value: count_below + 0.5 * count_equal"""
+        if not self.sorted_values or value is None:
+            return 0
+        count_below = bisect_left(self.sorted_values, value)
+        count_equal = bisect_right(self.sorted_values, value) - count_below
+        return ((count_below + 0.5 * count_equal) / len(self.sorted_values)) * 100
+
+def percentile_rank(value: float, data: Union[List[float], SortedColumn]) -> float:
+    """Calculate what percentile a value is in dataset (0-100)
+
+    data may also be anything with SortedColumn's rank() method, such as a
+    sketch.QuantileSketch for approximate streaming ranking.
+    """
+    if hasattr(data, 'rank'):
+        return data.rank(value)
+    if not data or value is None:
+        return 0
+    count_below = sum(1 for x in data if x < value)
+    count_equal = sum(1 for x in data if x == value)
+    return ((count_below + 0.5 * count_equal) / len(data)) * 100
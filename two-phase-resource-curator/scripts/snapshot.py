@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Collection Snapshots
+Saves the raw fetched collection (--save-snapshot) so it can be re-scored
+and re-filtered offline (--from-snapshot) with different weights or cutoffs,
+without re-downloading anything. Offline runs never import the network
+stack: filter scripts load http_client through lazy_import. A path ending
+in .cols selects the memory-mapped columnar format (see column_snapshot.py).
+"""
+
+import sys
+import gzip
+import json
+import importlib
+import types
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+from column_snapshot import is_column_path, load_columns, save_columns
+
+SNAPSHOT_FORMAT = 'two-phase-curator-snapshot'
+SNAPSHOT_VERSION = 1
+
+class LazyModule(types.ModuleType):
+    """Stand-in that imports the real module on first attribute access
+
+    importlib.import_module takes the per-module import lock, so worker
+    threads touching the module first all get the fully loaded module
+    (importlib.util.LazyLoader is not thread-safe before Python 3.12).
+    """
+
+    def __getattr__(self, attr):
+        return getattr(importlib.import_module(self.__name__), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(importlib.import_module(self.__name__), attr, value)
+
+def lazy_import(name: str):
+    """Import a module on first attribute access instead of now"""
+    if name in sys.modules:
+        return sys.modules[name]
+    return LazyModule(name)
+
+def open_snapshot(path: str, mode: str):
+    """Open a snapshot file, gzip-compressed when the name ends in .gz"""
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+def save_snapshot(path: str, platform: str, source: str, items: List[Dict], **extra):
+    """Write the raw collection plus whatever metadata ranking needs (e.g. repo_metadata)"""
+    if is_column_path(path):
+        save_columns(path, platform, source, items, **extra)
+        return
+    snapshot = {
+        'format': SNAPSHOT_FORMAT,
+        'version': SNAPSHOT_VERSION,
+        'platform': platform,
+        'source': source,
+        'fetched_at': datetime.now(timezone.utc).isoformat(),
+        **extra,
+        'items': items,
+    }
+    with open_snapshot(path, 'w') as f:
+        json.dump(snapshot, f, separators=(',', ':'))
+
+def load_snapshot(path: str, platform: str) -> Dict:
+    """Read a snapshot written by save_snapshot for the given platform"""
+    if is_column_path(path):
+        columns = load_columns(path)
+        snapshot = {key: value for key, value in columns.manifest.items() if key != 'columns'}
+        snapshot['format'] = SNAPSHOT_FORMAT
+        snapshot['items'] = columns.records()
+    else:
+        with open_snapshot(path, 'r') as f:
+            snapshot = json.load(f)
+    if snapshot.get('format') != SNAPSHOT_FORMAT:
+        raise ValueError(f"{path} is not a curator snapshot")
+    if snapshot.get('platform') != platform:
+        raise ValueError(f"{path} is a {snapshot.get('platform')} snapshot, not {platform}")
+    return snapshot
+
+def apply_weight_overrides(weights: Dict, overrides: Optional[List[str]]) -> Dict:
+    """Return weights with NAME=VALUE overrides applied (unknown metric names are errors)"""
+    result = dict(weights)
+    for override in overrides or []:
+        name, sep, value = override.partition('=')
+        if not sep or name not in weights:
+            raise ValueError(f"Invalid --weight '{override}' (expected one of {', '.join(weights)} as NAME=VALUE)")
+        try:
+            result[name] = float(value)
+        except ValueError:
+            raise ValueError(f"Invalid --weight '{override}': {value!r} is not a number")
+    return result
+
+def parse_cutoff_tiers(spec: str) -> Callable[[int], int]:
+    """Turn 'SIZE:PCT,...,inf:PCT' into a determine_cutoff_percentile replacement"""
+    tiers = []
+    for part in spec.split(','):
+        size, sep, cutoff = part.strip().partition(':')
+        if not sep:
+            raise ValueError(f"Invalid cutoff tier '{part}' (expected SIZE:PERCENTILE)")
+        tiers.append((float(size), int(cutoff)))
+    tiers.sort()
+
+    def determine_cutoff_percentile(collection_size: int) -> int:
+        for max_size, cutoff in tiers:
+            if collection_size <= max_size:
+                return cutoff
+        return tiers[-1][1]
+
+    return determine_cutoff_percentile
+
+def cutoff_function(args, default: Callable[[int], int]) -> Callable[[int], int]:
+    """The cutoff rule selected by --cutoff / --cutoff-tiers, or the platform default"""
+    if args.cutoff is not None:
+        return lambda collection_size: args.cutoff
+    if args.cutoff_tiers:
+        return parse_cutoff_tiers(args.cutoff_tiers)
+    return default
+
+def add_snapshot_arguments(parser):
+    """Add snapshot and re-ranking options to a filter CLI"""
+    parser.add_argument('--save-snapshot', help='Also save the raw fetched collection here (.json, .json.gz, or a .cols directory of memory-mappable columns) for offline re-ranking')
+    parser.add_argument('--save-columns', metavar='DIR.cols', help='Also save every kept item with its composite score and breakdown as memory-mappable columns')
+    parser.add_argument('--from-snapshot', help='Re-rank a saved snapshot offline instead of fetching (no network access)')
+    parser.add_argument('--weight', action='append', metavar='NAME=VALUE', help='Override one metric weight (repeatable)')
+    parser.add_argument('--cutoff', type=float, help='Fixed cutoff percentile instead of the size-adaptive tiers')
+    parser.add_argument('--cutoff-tiers', help='Custom size-adaptive tiers, e.g. "100:50,500:60,1000:70,inf:80"')
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the GitHub and Reddit APIs, for the tests.
+
+Serves one repository (Contents API, Git Trees API, metadata, raw file
+contents) and one subreddit's listings from in-memory data, with ETags,
+per-path failure injection and a log of every request path.
+"""
+
+import json
+import hashlib
+import threading
+import time
+from collections import Counter
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Dict, List, Optional
+from urllib.parse import urlparse, parse_qs
+
+def build_repo(depth: int = 3, width: int = 3, files: int = 4) -> Dict:
+    """Nested {name: dict (directory) | int (file size)} repository"""
+    node = {f'f{i}.json': 600 + 37 * i + 11 * depth for i in range(files)}
+    node['README.md'] = 1200
+    node['test_helper.py'] = 900  # Skipped by name
+    if depth > 0:
+        for j in range(width):
+            node[f'd{j}'] = build_repo(depth - 1, width, files)
+    return node
+
+def build_posts(count: int = 300, now: Optional[float] = None) -> List[Dict]:
+    """Posts with distinct scores, sorted best first like top.json"""
+    now = now or time.time()
+    return [{
+        'id': f'p{i}',
+        'name': f't3_p{i}',
+        'title': f'Post number {i}',
+        'permalink': f'/r/x/comments/p{i}/',
+        'url': f'https://example.com/{i}',
+        'author': f'user{i % 7}',
+        'subreddit': 'x',
+        'score': 5000 - 13 * i,
+        'num_comments': (i * 37) % 250,
+        'upvote_ratio': 0.6 + (i % 4) / 10,
+        'created_utc': now - 3600 * (i * 29 % 500),
+    } for i in range(count)]
+
+class MockAPI:
+    """Threaded HTTP server; point GITHUB_API_URL / REDDIT_BASE_URL at .url"""
+
+    def __init__(self, repo: Optional[Dict] = None, posts: Optional[List[Dict]] = None):
+        self.repo = repo if repo is not None else build_repo()
+        self.posts = posts if posts is not None else build_posts()
+        self.metadata = {'stargazers_count': 120, 'forks_count': 9, 'default_branch': 'main',
+                         'updated_at': '2026-10-01T00:00:00Z', 'description': 'mock'}
+        self.files = {}            # path -> text served at /raw/PATH (default: unique words)
+        self.listing_cap = 1000    # Posts any one listing pages through, like Reddit
+        self.stalled = set()       # Listings answering with no posts but a cursor
+        self.tree_limit = None     # Recursive trees with more entries come back truncated
+        self.failures = Counter()  # path or query fragment -> number of 503s still to send
+        self.requests = []
+        self.statuses = Counter()
+        self.lock = threading.Lock()
+        self.trees = {}
+        self.root_sha = self._index(self.repo)
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self.url = f'http://127.0.0.1:{self.server.server_port}'
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def reindex(self):
+        """Recompute tree SHAs after changing self.repo or self.files"""
+        self.trees.clear()
+        self.root_sha = self._index(self.repo)
+
+    def count(self, fragment: str) -> int:
+        """Requests whose path contains fragment"""
+        with self.lock:
+            return sum(1 for path in self.requests if fragment in path)
+
+    def _index(self, node: Dict, prefix: str = '') -> str:
+        entries = []
+        for name, value in sorted(node.items()):
+            if isinstance(value, dict):
+                entries.append({'path': name, 'type': 'tree', 'mode': '040000', 'sha': self._index(value, prefix + name + '/')})
+            else:
+                sha = self.blob_sha(prefix + name)
+                entries.append({'path': name, 'type': 'blob', 'mode': '100644', 'sha': sha, 'size': value})
+        sha = hashlib.sha1(json.dumps(entries).encode()).hexdigest()
+        self.trees[sha] = entries
+        return sha
+
+    def _flatten(self, sha: str, prefix: str = '') -> List[Dict]:
+        entries = []
+        for entry in self.trees[sha]:
+            entries.append(dict(entry, path=prefix + entry['path']))
+            if entry['type'] == 'tree':
+                entries.extend(self._flatten(entry['sha'], prefix + entry['path'] + '/'))
+        return entries
+
+    def _contents(self, path: str) -> Optional[List[Dict]]:
+        node = self.repo
+        for part in filter(None, path.split('/')):
+            node = node.get(part)
+            if not isinstance(node, dict):
+                return None
+        prefix = path.strip('/') + '/' if path.strip('/') else ''
+        listing = []
+        for name, value in sorted(node.items()):
+            if isinstance(value, dict):
+                listing.append({'name': name, 'path': prefix + name, 'type': 'dir'})
+            else:
+                listing.append({'name': name, 'path': prefix + name, 'type': 'file', 'size': value,
+                                'sha': self.blob_sha(prefix + name),
+                                'download_url': f'{self.url}/raw/{prefix}{name}'})
+        return listing
+
+    def file_text(self, path: str) -> str:
+        """Contents of a file: self.files[path], else words no other file shares"""
+        if path in self.files:
+            return self.files[path]
+        return ' '.join(f'{path}-{i}' for i in range(200))
+
+    def blob_sha(self, path: str) -> str:
+        """Git blob sha of a file's contents, as GitHub reports it"""
+        data = self.file_text(path).encode()
+        return hashlib.sha1(b'blob %d\0' % len(data) + data).hexdigest()
+
+    def _tree(self, sha: str, recursive: bool) -> Optional[Dict]:
+        sha = self.root_sha if sha in ('HEAD', 'main') else sha
+        if sha not in self.trees:
+            return None
+        if not recursive:
+            return {'sha': sha, 'tree': self.trees[sha], 'truncated': False}
+        entries = self._flatten(sha)
+        if self.tree_limit is not None and len(entries) > self.tree_limit:
+            return {'sha': sha, 'tree': entries[:self.tree_limit], 'truncated': True}
+        return {'sha': sha, 'tree': entries, 'truncated': False}
+
+    def _listing(self, listing: str, query: Dict) -> Dict:
+        if listing in self.stalled:
+            return {'data': {'children': [], 'after': query.get('after', ['t3_stalled'])[0]}}
+        if listing == 'new':
+            posts = sorted(self.posts, key=lambda post: -post['created_utc'])
+        else:
+            posts = sorted(self.posts, key=lambda post: -post['score'])
+        posts = posts[:self.listing_cap]
+        limit = int(query.get('limit', ['25'])[0])
+        after = query.get('after', [None])[0]
+        start = [post['name'] for post in posts].index(after) + 1 if after else 0
+        page = posts[start:start + limit]
+        more = start + limit < len(posts)
+        return {'data': {'children': [{'kind': 't3', 'data': post} for post in page],
+                         'after': page[-1]['name'] if page and more else None}}
+
+    def respond(self, path: str, query: Dict) -> tuple:
+        """(status, body object) for a request path"""
+        if path.startswith('/r/'):
+            listing = path.rsplit('/', 1)[1].split('.')[0]
+            if listing == 'info':
+                wanted = set(query.get('id', [''])[0].split(','))
+                return 200, {'data': {'children': [{'kind': 't3', 'data': post} for post in self.posts if post['name'] in wanted]}}
+            return 200, self._listing(listing, query)
+        if path.startswith('/api/info'):
+            wanted = set(query.get('id', [''])[0].split(','))
+            return 200, {'data': {'children': [{'kind': 't3', 'data': post} for post in self.posts if post['name'] in wanted]}}
+        parts = path.split('/')
+        if len(parts) == 4 and parts[1] == 'repos':
+            return 200, self.metadata
+        if '/contents' in path:
+            listing = self._contents(path.split('/contents', 1)[1])
+            return (200, listing) if listing is not None else (404, {'message': 'Not Found'})
+        if '/git/trees/' in path:
+            tree = self._tree(path.rsplit('/', 1)[1], bool(query.get('recursive')))
+            return (200, tree) if tree is not None else (404, {'message': 'Not Found'})
+        return 404, {'message': 'Not Found'}
+
+    def _handler(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def send(self, status: int, body: bytes = b'', headers: Optional[Dict] = None):
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                with api.lock:
+                    api.requests.append(parsed.path)
+                    failing = next((key for key, left in api.failures.items()
+                                    if left > 0 and (key == parsed.path or key in parsed.query)), None)
+                    if failing:
+                        api.failures[failing] -= 1
+                if failing:
+                    with api.lock:
+                        api.statuses[503] += 1
+                    return self.send(503)
+                if parsed.path.startswith('/raw/'):
+                    status, body = 200, api.file_text(parsed.path[len('/raw/'):]).encode()
+                else:
+                    status, obj = api.respond(parsed.path, parse_qs(parsed.query))
+                    body = json.dumps(obj).encode()
+                etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+                if status == 200 and self.headers.get('If-None-Match') == etag:
+                    status, body = 304, b''
+                with api.lock:
+                    api.statuses[status] += 1
+                if status == 304:
+                    return self.send(304, headers={'ETag': etag})
+                self.send(status, body, {'Content-Type': 'application/json', 'ETag': etag})
+
+        return Handler
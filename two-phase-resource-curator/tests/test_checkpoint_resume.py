@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Retries and checkpoint resume against a local mock API: a crawl that
+fails and is rerun must return exactly what an uninterrupted crawl does.
+
+Run from the skill directory:
+    python -m unittest discover tests
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import filter_github
+import filter_reddit
+import http_client
+from checkpoint import CrawlCheckpoint
+from filter_github import get_repo_files, get_repo_files_concurrent
+from filter_reddit import parse_subreddit_posts
+from mock_api import MockAPI
+
+# Enough consecutive 503s to exhaust every retry
+GIVE_UP = http_client.MAX_RETRIES + 1
+
+class MockResumeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.api = MockAPI()
+        self.originals = (filter_github.GITHUB_API_URL, filter_reddit.REDDIT_BASE_URL, http_client.BACKOFF_BASE)
+        filter_github.GITHUB_API_URL = self.api.url
+        filter_reddit.REDDIT_BASE_URL = self.api.url
+        http_client.BACKOFF_BASE = 0.0
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'crawl.resume.json')
+
+    def tearDown(self):
+        filter_github.GITHUB_API_URL, filter_reddit.REDDIT_BASE_URL, http_client.BACKOFF_BASE = self.originals
+        self.directory.cleanup()
+        self.api.close()
+
+class RedditResume(MockResumeTest):
+
+    def ids(self, posts: list) -> list:
+        return [post['id'] for post in posts]
+
+    def test_transient_errors_are_retried(self):
+        self.api.failures['/r/x/top.json'] = http_client.MAX_RETRIES
+        posts = parse_subreddit_posts('x', 250)
+        self.assertEqual(self.ids(posts), self.ids(self.api.posts[:250]))
+        self.assertEqual(self.api.statuses[503], http_client.MAX_RETRIES)
+
+    def test_resume_after_first_page_failure(self):
+        self.api.failures['/r/x/top.json'] = GIVE_UP
+        with self.assertRaises(http_client.FetchError):
+            parse_subreddit_posts('x', 250, checkpoint=CrawlCheckpoint(self.path, 'r/x'))
+
+        checkpoint = CrawlCheckpoint(self.path, 'r/x')
+        self.assertTrue(checkpoint.resumed)
+        posts = parse_subreddit_posts('x', 250, checkpoint=checkpoint)
+        self.assertEqual(self.ids(posts), self.ids(self.api.posts[:250]))
+
+    def test_resume_mid_listing(self):
+        self.api.failures['after=t3_p199'] = GIVE_UP
+        with self.assertRaises(http_client.FetchError):
+            parse_subreddit_posts('x', 1000, checkpoint=CrawlCheckpoint(self.path, 'r/x', save_every=1))
+        fetched = self.api.count('/r/x/top.json')
+
+        posts = parse_subreddit_posts('x', 1000, checkpoint=CrawlCheckpoint(self.path, 'r/x'))
+        self.assertEqual(self.ids(posts), self.ids(self.api.posts))
+        # Only the failed (last) page is fetched again
+        self.assertEqual(self.api.count('/r/x/top.json') - fetched, 1)
+
+class GitHubResume(MockResumeTest):
+
+    def test_resume_concurrent_crawl(self):
+        expected = get_repo_files('o', 'r', max_depth=4)
+        listed = self.api.count('/contents')
+
+        self.api.failures['/repos/o/r/contents/d2/d1'] = GIVE_UP
+        with self.assertRaises(http_client.FetchError):
+            get_repo_files_concurrent('o', 'r', max_depth=4, checkpoint=CrawlCheckpoint(self.path, 'o/r'))
+
+        before = self.api.count('/contents')
+        files = get_repo_files_concurrent('o', 'r', max_depth=4, checkpoint=CrawlCheckpoint(self.path, 'o/r'))
+        self.assertEqual(files, expected)
+        # The rerun fetches what was still pending, not the whole tree again
+        self.assertLess(self.api.count('/contents') - before, listed)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Duplicate collapsing against a local mock API.
+
+Run from the skill directory:
+    python -m unittest discover tests
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from dedup import NUM_PERM, cluster
+from mock_api import MockAPI
+
+SCRIPTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts')
+
+def near_copy(text: str) -> str:
+    """text with its last word changed"""
+    return text.rsplit(' ', 1)[0] + ' changed'
+
+def run_cli(api: MockAPI, output: str, script: str, *options) -> dict:
+    """Run a filter CLI against the mock API and load its output"""
+    command = [sys.executable, os.path.join(SCRIPTS, script), '--no-cache', '--output', output, *options]
+    env = dict(os.environ, GITHUB_API_URL=api.url, REDDIT_BASE_URL=api.url)
+    subprocess.run(command, env=env, check=True, stdout=subprocess.DEVNULL)
+    with open(output) as f:
+        return json.load(f)
+
+class ClusterJoinsEveryGroup(unittest.TestCase):
+
+    def test_item_matching_two_groups_joins_both(self):
+        # {0, 1} and {2, 3} share exact keys. Item 4 differs from 1 in 12 of the
+        # 64 positions and from 3 in 4, while 1 and 3 differ in 16 (below 0.8).
+        # All differences sit in the first two LSH bands, so in every other band
+        # 1, 3 and 4 share a bucket and 4 must be compared with both.
+        item_1 = (0,) * NUM_PERM
+        item_4 = tuple(1 if i in range(0, 6) or i in range(8, 14) else 0 for i in range(NUM_PERM))
+        item_3 = tuple(2 if i in (6, 7, 14, 15) else value for i, value in enumerate(item_4))
+        keys = [['a'], ['a'], ['b'], ['b'], []]
+        self.assertEqual(cluster(5, keys, [(), item_1, (), item_3, item_4], 0.8), [[0, 1, 2, 3, 4]])
+
+    def test_dissimilar_items_stay_apart(self):
+        signatures = [tuple(range(NUM_PERM)), tuple(range(NUM_PERM, 2 * NUM_PERM)), ()]
+        self.assertEqual(cluster(3, [[], [], []], signatures, 0.8), [[0], [1], [2]])
+
+class RedditNearDuplicates(unittest.TestCase):
+
+    def setUp(self):
+        self.api = MockAPI()
+        self.directory = tempfile.TemporaryDirectory()
+        self.output = os.path.join(self.directory.name, 'out.json')
+
+    def tearDown(self):
+        self.directory.cleanup()
+        self.api.close()
+
+    def test_reposted_body_with_new_title_is_collapsed(self):
+        body = ' '.join(f'step {i} of the workflow does thing {i * 7}' for i in range(40))
+        first, repost = self.api.posts[3], self.api.posts[8]
+        first.update(is_self=True, selftext=body, title='My automation setup')
+        repost.update(is_self=True, selftext=near_copy(body), title='Sharing this again: how I automate')
+        output = run_cli(self.api, self.output, 'filter_reddit.py', '--subreddit', 'x', '--limit', '300', '--dedup', 'near')
+
+        clusters = {resource['url']: resource['duplicates'] for resource in output['resources'] if resource.get('cluster_size')}
+        self.assertEqual(clusters, {f"https://reddit.com{first['permalink']}": [repost['permalink']]})
+
+class NearDedupAfterRanking(unittest.TestCase):
+
+    def setUp(self):
+        self.api = MockAPI()
+        self.directory = tempfile.TemporaryDirectory()
+        self.output = os.path.join(self.directory.name, 'out.json')
+
+    def tearDown(self):
+        self.directory.cleanup()
+        self.api.close()
+
+    def curate(self, *options) -> dict:
+        return run_cli(self.api, self.output, 'filter_github.py', '--url', 'https://github.com/o/r', '--listing', 'contents',
+                       '--prefetch-store', os.path.join(self.directory.name, 'store'), *options)
+
+    def test_only_kept_files_are_downloaded(self):
+        text = self.api.file_text('d0/f3.json')
+        self.api.files['d1/f3.json'] = near_copy(text)
+        output = self.curate('--dedup', 'near')
+
+        resources = output['resources']
+        self.assertLess(self.api.count('/raw/'), output['original_count'])
+        self.assertEqual(self.api.count('/raw/'), len(resources) + output['deduplication']['removed'])
+        self.assertFalse(any('prefetch' in resource for resource in resources))
+
+        clusters = {resource['path']: resource['duplicates'] for resource in resources if resource.get('cluster_size')}
+        self.assertEqual(clusters, {'d0/f3.json': ['d1/f3.json']})
+
+if __name__ == '__main__':
+    unittest.main()
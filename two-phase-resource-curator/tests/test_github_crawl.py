@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+GitHub crawls against a local mock of the Contents and Git Trees APIs.
+
+Run from the skill directory:
+    python -m unittest discover tests
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import filter_github
+from filter_github import get_repo_files, get_repo_files_concurrent, get_repo_tree
+from mock_api import MockAPI
+
+class MockGitHubTest(unittest.TestCase):
+
+    def setUp(self):
+        self.api = MockAPI()
+        self.original_url = filter_github.GITHUB_API_URL
+        filter_github.GITHUB_API_URL = self.api.url
+
+    def tearDown(self):
+        filter_github.GITHUB_API_URL = self.original_url
+        self.api.close()
+
+    def paths(self, entries: list) -> list:
+        return sorted((entry['path'], entry['type'], entry['sha']) for entry in entries)
+
+class TruncatedTreeFallback(MockGitHubTest):
+
+    def test_truncated_tree_equals_full_tree(self):
+        full = get_repo_tree('o', 'r')
+        self.assertEqual(self.api.count('/git/trees/'), 1)
+
+        # Root and first-level subtrees are truncated, deeper ones are not
+        self.api.tree_limit = 30
+        split = get_repo_tree('o', 'r')
+        self.assertGreater(self.api.count('/git/trees/'), 2)
+        self.assertEqual(self.paths(split), self.paths(full))
+
+class ConcurrentCrawl(MockGitHubTest):
+
+    def test_concurrent_equals_serial(self):
+        for max_depth in (1, 2, 4):
+            with self.subTest(max_depth=max_depth):
+                serial = get_repo_files('o', 'r', max_depth=max_depth)
+                concurrent = get_repo_files_concurrent('o', 'r', max_depth=max_depth, max_workers=6)
+                self.assertTrue(serial)
+                self.assertEqual(concurrent, serial)
+
+    def test_subdirectory_crawl(self):
+        serial = get_repo_files('o', 'r', 'd1/d0', max_depth=3)
+        self.assertEqual(get_repo_files_concurrent('o', 'r', 'd1/d0', max_depth=3), serial)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Multi-listing Reddit harvests against a local mock API.
+
+Run from the skill directory:
+    python -m unittest discover tests
+"""
+
+import argparse
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import filter_reddit
+from batch_curate import fetch_target
+from filter_reddit import harvest_subreddit_posts, iter_harvested_posts
+from mock_api import MockAPI, build_posts
+
+class MockRedditTest(unittest.TestCase):
+
+    def setUp(self):
+        self.api = MockAPI(posts=build_posts(1300))
+        self.original_url = filter_reddit.REDDIT_BASE_URL
+        filter_reddit.REDDIT_BASE_URL = self.api.url
+
+    def tearDown(self):
+        filter_reddit.REDDIT_BASE_URL = self.original_url
+        self.api.close()
+
+class BatchTargetsBeyondCap(MockRedditTest):
+
+    def test_limit_above_cap_harvests_several_listings(self):
+        options = argparse.Namespace(token=None, limit=1300, max_depth=None, listings=None)
+        fetched = fetch_target({'platform': 'reddit', 'source': 'r/x', 'subreddit': 'x'}, options)
+        # top.json alone stops at 1000; new.json reaches posts beyond it
+        self.assertGreater(len({post['id'] for post in fetched['items']}), 1000)
+        self.assertGreater(self.api.count('/r/x/new.json'), 0)
+
+    def test_limit_within_cap_pages_top_alone(self):
+        options = argparse.Namespace(token=None, limit=300, max_depth=None, listings=None)
+        fetched = fetch_target({'platform': 'reddit', 'source': 'r/x', 'subreddit': 'x'}, options)
+        self.assertEqual([post['id'] for post in fetched['items']], [post['id'] for post in self.api.posts[:300]])
+        self.assertEqual(self.api.count('/r/x/new.json'), 0)
+
+class EmptyPageEndsListing(MockRedditTest):
+
+    def test_empty_page_with_cursor_does_not_hold_later_listings(self):
+        self.api.stalled.add('hot')
+        streamed = [post['id'] for post in iter_harvested_posts('x', 1300, ['hot', 'new'])]
+        collected = [post['id'] for post in harvest_subreddit_posts('x', 1300, ['hot', 'new'])]
+        self.assertEqual(len(streamed), 1000)
+        self.assertEqual(streamed, collected)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Response cache behaviour against a local mock API.
+
+Run from the skill directory:
+    python -m unittest discover tests
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import http_client
+from http_cache import ResponseCache
+from mock_api import MockAPI
+
+class CacheRevalidation(unittest.TestCase):
+
+    def setUp(self):
+        self.api = MockAPI()
+        self.url = f'{self.api.url}/repos/o/r'
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        http_client.disable_cache()
+        self.directory.cleanup()
+        self.api.close()
+
+    def test_stale_entry_is_revalidated_with_304(self):
+        http_client.enable_cache(self.directory.name, ttl=0)
+        first = http_client.get(self.url)
+        second = http_client.get(self.url)
+        self.assertEqual(self.api.statuses[200], 1)
+        self.assertEqual(self.api.statuses[304], 1)
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.json(), first.json())
+
+        # A changed resource gets a new ETag, so the stale copy is replaced
+        self.api.metadata['stargazers_count'] += 1
+        third = http_client.get(self.url)
+        self.assertEqual(self.api.statuses[200], 2)
+        self.assertEqual(third.json()['stargazers_count'], first.json()['stargazers_count'] + 1)
+
+    def test_fresh_entry_skips_network_unless_max_age_is_zero(self):
+        http_client.enable_cache(self.directory.name, ttl=3600)
+        http_client.get(self.url)
+        http_client.get(self.url)
+        self.assertEqual(self.api.count('/repos/o/r'), 1)
+
+        http_client.get(self.url, max_age=0)
+        self.assertEqual(self.api.count('/repos/o/r'), 2)
+        self.assertEqual(self.api.statuses[304], 1)
+
+    def test_key_includes_accept_header(self):
+        json_key = ResponseCache.make_key(self.url, headers={'Accept': 'application/vnd.github.v3+json'})
+        raw_key = ResponseCache.make_key(self.url, headers={'Accept': 'application/vnd.github.raw'})
+        self.assertNotEqual(json_key, raw_key)
+        self.assertEqual(ResponseCache.make_key(self.url), ResponseCache.make_key(self.url, headers={}))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Snapshot round trips: JSON, gzip and columnar (.cols) snapshots load back
+the items they saved.
+
+Run from the skill directory:
+    python -m unittest discover tests
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+
+import column_snapshot
+from snapshot import load_snapshot, save_snapshot
+
+ITEMS = [
+    {'name': 'a.json', 'size': 1200, 'score': 4, 'ratio': 0.5, 'fresh': True,
+     'tags': ['x', 'y'], 'meta': {'sha': 'abc', 'depth': 1}, 'note': None},
+    {'name': 'b.json', 'size': 0, 'score': 2.75, 'ratio': 1, 'fresh': False,
+     'tags': [], 'meta': {'sha': 'def'}},
+    {'name': 'ünïcode', 'size': 7, 'score': -3, 'ratio': None, 'fresh': True,
+     'tags': None, 'meta': {'sha': '', 'depth': 3}, 'note': 'kept', 'big': 2 ** 60},
+    {'name': '', 'size': 3, 'score': 1e-3, 'fresh': False, 'meta': {}, 'big': 0.5},
+]
+
+class SnapshotRoundTrip(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def round_trip(self, name):
+        path = os.path.join(self.directory.name, name)
+        save_snapshot(path, 'github', 'o/r', ITEMS, repo_metadata={'stars': 5})
+        snapshot = load_snapshot(path, 'github')
+        self.assertEqual(snapshot['source'], 'o/r')
+        self.assertEqual(snapshot['repo_metadata'], {'stars': 5})
+        return snapshot['items']
+
+    def assertSameItems(self, items):
+        self.assertEqual(items, ITEMS)
+        for loaded, saved in zip(items, ITEMS):
+            for field, value in saved.items():
+                self.assertIs(type(loaded[field]), type(value), f"{saved['name']!r}.{field}")
+
+    def test_json(self):
+        self.assertSameItems(self.round_trip('snap.json'))
+
+    def test_gzip(self):
+        self.assertSameItems(self.round_trip('snap.json.gz'))
+
+    def test_columns(self):
+        self.assertSameItems(self.round_trip('snap.cols'))
+
+    def test_columns_without_numpy(self):
+        numpy = column_snapshot.np
+        column_snapshot.np = None
+        try:
+            self.assertSameItems(self.round_trip('snap.cols'))
+        finally:
+            column_snapshot.np = numpy
+
+    def test_wrong_platform_is_refused(self):
+        path = os.path.join(self.directory.name, 'snap.cols')
+        save_snapshot(path, 'github', 'o/r', ITEMS)
+        with self.assertRaises(ValueError):
+            load_snapshot(path, 'reddit')
+
+if __name__ == '__main__':
+    unittest.main()